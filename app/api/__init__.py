@@ -4,5 +4,7 @@ API エンドポイント関連のモジュール
 """
 
 from .youtube import router as youtube_router
+from .livechat_ws import router as livechat_ws_router
+from .metrics import router as metrics_router
 
-__all__ = ["youtube_router"]
+__all__ = ["youtube_router", "livechat_ws_router", "metrics_router"]
@@ -0,0 +1,169 @@
+import asyncio
+import json
+from typing import Dict, List, Tuple
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.models.youtube import LiveChatMessageItem
+from app.services.youtube import youtube_service
+from app.services.poller import poller_manager, Subscription
+from app.utils.metrics import ACTIVE_STREAMS
+from app.utils.queues import DropOldestQueue
+from app.utils.validators import validate_youtube_video_id
+from app.config import WS_SEND_QUEUE_SIZE, WS_MAX_BATCH, WS_MAX_SUBSCRIPTIONS
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/api/youtube",
+    tags=["youtube"],
+)
+
+
+@router.websocket("/livechat/ws")
+async def youtube_livechat_ws(websocket: WebSocket):
+    """1接続で複数の動画のライブチャットを購読するWebSocket
+
+    クライアント → サーバー:
+        {"action": "subscribe", "video_id": "..."}
+        {"action": "unsubscribe", "video_id": "..."}
+    サーバー → クライアント:
+        {"type": "messages", "dropped": n, "batches": [{"video_id": "...", "items": [...]}]}
+        {"type": "subscribed" | "unsubscribed" | "end" | "error", "video_id": "...", ...}
+    """
+    await websocket.accept()
+    connection = LiveChatConnection(websocket)
+    await connection.run()
+
+
+class LiveChatConnection:
+    """WebSocket 1接続分の購読と送信キューを管理"""
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue = DropOldestQueue(WS_SEND_QUEUE_SIZE)
+        self.subscriptions: Dict[str, Tuple[Subscription, asyncio.Task]] = {}
+        self._reported_dropped = 0
+
+    async def run(self):
+        """受信ループ（切断まで）"""
+        sender = asyncio.create_task(self._send_loop())
+        logger.info("🔌 WebSocket connected")
+        active = ACTIVE_STREAMS.labels("websocket")
+        active.inc()
+        try:
+            while True:
+                try:
+                    data = await self.websocket.receive_json()
+                except json.JSONDecodeError:
+                    self._send_control("error", None, detail="JSONの形式が不正です。")
+                    continue
+                await self._handle(data)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            active.dec()
+            sender.cancel()
+            for video_id in list(self.subscriptions):
+                await self._unsubscribe(video_id, notify=False)
+            logger.info("🔌 WebSocket disconnected")
+
+    async def _handle(self, data):
+        action = data.get("action") if isinstance(data, dict) else None
+        video_id = data.get("video_id") if isinstance(data, dict) else None
+
+        if action not in ("subscribe", "unsubscribe"):
+            self._send_control("error", video_id, detail="未対応のactionです。")
+        elif not isinstance(video_id, str) or not validate_youtube_video_id(video_id):
+            self._send_control("error", video_id, detail="無効な動画IDです。")
+        elif action == "subscribe":
+            await self._subscribe(video_id)
+        else:
+            await self._unsubscribe(video_id)
+
+    async def _subscribe(self, video_id: str):
+        if video_id in self.subscriptions:
+            self._send_control("subscribed", video_id)
+            return
+        if len(self.subscriptions) >= WS_MAX_SUBSCRIPTIONS:
+            self._send_control(
+                "error",
+                video_id,
+                detail=f"購読できる動画は{WS_MAX_SUBSCRIPTIONS}件までです。",
+            )
+            return
+
+        try:
+            live_chat_id = await youtube_service.get_live_chat_id(video_id)
+        except Exception as e:
+            logger.error(f"💥 Error - video_id: {video_id}, error: {str(e)}")
+            self._send_control(
+                "error", video_id, detail="YouTube APIでエラーが発生しました。"
+            )
+            return
+        if not live_chat_id:
+            self._send_control(
+                "error",
+                video_id,
+                detail="ライブ配信が見つからないか、ライブチャットが無効です。",
+            )
+            return
+
+        subscription = poller_manager.subscribe(live_chat_id)
+        pump = asyncio.create_task(self._pump(video_id, subscription))
+        self.subscriptions[video_id] = (subscription, pump)
+        self._send_control("subscribed", video_id)
+        logger.info(f"➕ WebSocket subscribed - video_id: {video_id}")
+
+    async def _unsubscribe(self, video_id: str, notify: bool = True):
+        entry = self.subscriptions.pop(video_id, None)
+        if entry is not None:
+            subscription, pump = entry
+            pump.cancel()
+            await poller_manager.unsubscribe(subscription)
+        if notify:
+            self._send_control("unsubscribed", video_id)
+
+    async def _pump(self, video_id: str, subscription: Subscription):
+        """購読したメッセージを送信キューへ積む"""
+        async for items in subscription:
+            for _, item in items:
+                self.queue.put((video_id, item))
+        if subscription.poller.ended:
+            self._send_control("end", video_id)
+
+    def _send_control(self, event_type: str, video_id, **extra):
+        self.queue.put_control(
+            json.dumps({"type": event_type, "video_id": video_id, **extra})
+        )
+
+    async def _send_loop(self):
+        """キューに溜まったメッセージを動画ごとにまとめて1フレームで送信"""
+        try:
+            while True:
+                batch = await self.queue.get_batch(WS_MAX_BATCH)
+                items: List[Tuple[str, LiveChatMessageItem]] = []
+                for is_control, entry in batch:
+                    if not is_control:
+                        items.append(entry)
+                        continue
+                    if items:
+                        await self.websocket.send_text(self._messages_frame(items))
+                        items = []
+                    await self.websocket.send_text(entry)
+                if items:
+                    await self.websocket.send_text(self._messages_frame(items))
+        except (WebSocketDisconnect, RuntimeError) as e:
+            logger.debug(f"WebSocket send loop stopped: {e}")
+
+    def _messages_frame(self, items: List[Tuple[str, LiveChatMessageItem]]) -> str:
+        grouped: Dict[str, List[str]] = {}
+        for video_id, item in items:
+            grouped.setdefault(video_id, []).append(item.model_dump_json())
+
+        dropped = self.queue.dropped - self._reported_dropped
+        self._reported_dropped = self.queue.dropped
+        batches = ",".join(
+            f'{{"video_id":{json.dumps(video_id)},"items":[{",".join(payloads)}]}}'
+            for video_id, payloads in grouped.items()
+        )
+        return f'{{"type":"messages","dropped":{dropped},"batches":[{batches}]}}'
@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Response
+from app.services.youtube import youtube_service
+from app.services.poller import poller_manager
+from app.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN
+from app.utils.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter(tags=["metrics"])
+
+_CIRCUIT_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def _cache_lookups():
+    """キャッシュごとのヒット・ミス数（既存の統計値を出力時に読む）"""
+    caches = {
+        "live_chat_id": youtube_service.live_chat_id_cache,
+        "upstream_etag": youtube_service.client.etag_cache,
+    }
+    if youtube_service.page_cache is not None:
+        caches["chat_page"] = youtube_service.page_cache
+    values = {}
+    for name, cache in caches.items():
+        values[(name, "hit")] = cache.hits
+        values[(name, "miss")] = cache.misses
+    return values
+
+
+def _subscribers():
+    return {
+        (): sum(stats["subscribers"] for stats in poller_manager.stats().values())
+    }
+
+
+def _circuit_states():
+    return {
+        (endpoint,): _CIRCUIT_STATE_VALUES[stats["state"]]
+        for endpoint, stats in youtube_service.circuit_breakers.stats().items()
+    }
+
+
+REGISTRY.callback(
+    "livechat_cache_lookups",
+    "Cache lookups by cache and result",
+    "counter",
+    ("cache", "result"),
+    _cache_lookups,
+)
+REGISTRY.callback(
+    "livechat_pollers",
+    "Live chats being polled for streaming subscribers",
+    "gauge",
+    (),
+    lambda: {(): len(poller_manager.pollers)},
+)
+REGISTRY.callback(
+    "livechat_subscribers",
+    "Streaming subscriptions across all pollers",
+    "gauge",
+    (),
+    _subscribers,
+)
+REGISTRY.callback(
+    "livechat_singleflight_shared",
+    "Requests that joined an in-flight upstream call",
+    "counter",
+    (),
+    lambda: {(): youtube_service.singleflight.shared},
+)
+REGISTRY.callback(
+    "livechat_circuit_breaker_state",
+    "Circuit breaker state per endpoint (0=closed, 1=half-open, 2=open)",
+    "gauge",
+    ("endpoint",),
+    _circuit_states,
+)
+REGISTRY.callback(
+    "livechat_upstream_concurrency_limit",
+    "Current adaptive concurrency limit for upstream calls",
+    "gauge",
+    (),
+    lambda: {(): youtube_service.concurrency.limit},
+)
+REGISTRY.callback(
+    "livechat_upstream_inflight",
+    "Upstream calls in flight",
+    "gauge",
+    (),
+    lambda: {(): youtube_service.concurrency.inflight},
+)
+REGISTRY.callback(
+    "livechat_retry_budget_exhausted",
+    "Retries refused because the retry budget was empty",
+    "counter",
+    (),
+    lambda: {(): youtube_service.client.retry_budget.exhausted},
+)
+REGISTRY.callback(
+    "livechat_pool_waited_requests",
+    "Upstream requests that waited for a pooled connection",
+    "counter",
+    (),
+    lambda: {(): youtube_service.client.pool_waited},
+)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 形式のメトリクス"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -1,10 +1,37 @@
-from fastapi import APIRouter, HTTPException
-from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import AsyncIterator, Callable, List, Optional
 from app.services.youtube import youtube_service
+from app.services.poller import poller_manager, Subscription
+from app.services.archive import ArchivedMessage, ChatArchiver, to_micros
+from app.services.message_filter import MessageFilter
+from app.services.export import ChatExporter, export_chat
+from app.config import (
+    DEBUG,
+    SSE_HEARTBEAT_INTERVAL,
+    SSE_RETRY_MILLIS,
+    SSE_MAX_BATCH,
+    EXPORT_CHUNK_SIZE,
+    REQUEST_DEADLINE,
+)
 from app.models.youtube import LiveChatMessageListResponse
-from app.models.request import LiveChatRequest
+from app.models.request import (
+    LiveChatRequest,
+    LiveChatBatchRequest,
+    LiveChatBatchResult,
+    LiveChatBatchResponse,
+    LiveChatHistoryResponse,
+)
 from app.utils.validators import validate_youtube_video_id, sanitize_page_token
-from app.utils.exceptions import handle_youtube_api_error
+from app.utils.deadline import set_deadline
+from app.utils.etag import format_etag, etag_matches
+from app.utils.exceptions import handle_youtube_api_error, PollTooEarlyError
+from app.utils.metrics import ACTIVE_STREAMS
+from app.utils.responses import PydanticJSONResponse
+from app.utils.tracing import TRACER
+import asyncio
+import json
 import logging
 import time
 
@@ -16,15 +43,364 @@ router = APIRouter(
 )
 
 
-@router.post("/livechat", response_model=LiveChatMessageListResponse)
-def youtube_livechat_post(request: LiveChatRequest):
+async def request_deadline(
+    x_request_timeout: Optional[float] = Header(None, gt=0),
+):
+    """リクエストの期限を設定（X-Request-Timeout で REQUEST_DEADLINE より短くできる）
+
+    期限はサービス・HTTPクライアントに引き継がれ、上流の呼び出しとリトライの合計時間を制限する。
+    """
+    timeout = REQUEST_DEADLINE
+    if x_request_timeout is not None:
+        timeout = min(timeout, x_request_timeout)
+    set_deadline(timeout)
+
+
+@router.post(
+    "/livechat",
+    response_model=LiveChatMessageListResponse,
+    response_class=PydanticJSONResponse,
+    dependencies=[Depends(request_deadline)],
+)
+async def youtube_livechat_post(
+    request: LiveChatRequest,
+    if_none_match: Optional[str] = Header(None),
+):
     """POSTメソッドでのライブチャット取得（バリデーション強化版）"""
-    return _get_livechat(request.video_id, request.page_token)
+    message_filter = _build_filter(
+        lambda: MessageFilter(
+            request.fields, request.types, request.author_ids, request.q
+        )
+    )
+    data = await _get_livechat(request.video_id, request.page_token)
+    return _conditional_response(data, if_none_match, message_filter)
+
+
+@router.get(
+    "/livechat",
+    response_model=LiveChatMessageListResponse,
+    response_class=PydanticJSONResponse,
+    dependencies=[Depends(request_deadline)],
+)
+async def youtube_livechat_get(
+    video_id: str,
+    page_token: Optional[str] = None,
+    fields: Optional[str] = None,
+    type: Optional[str] = None,
+    author_id: Optional[str] = None,
+    q: Optional[str] = Query(None, max_length=100),
+    if_none_match: Optional[str] = Header(None),
+):
+    """GETメソッドでのライブチャット取得（後方互換性のため）
+
+    fields（カンマ区切り）で返すフィールドを、type・author_id（カンマ区切り）・q でメッセージを絞り込める。
+    """
+    _validate_video_id_param(video_id)
+    message_filter = _build_filter(
+        lambda: MessageFilter.from_query(fields, type, author_id, q)
+    )
+
+    cleaned_page_token = sanitize_page_token(page_token)
+    data = await _get_livechat(video_id, cleaned_page_token)
+    return _conditional_response(data, if_none_match, message_filter)
+
+
+@router.post(
+    "/livechat/batch",
+    response_model=LiveChatBatchResponse,
+    response_class=PydanticJSONResponse,
+    dependencies=[Depends(request_deadline)],
+)
+async def youtube_livechat_batch(request: LiveChatBatchRequest):
+    """複数動画のライブチャットIDを一括取得（必要ならメッセージも）"""
+    start_time = time.time()
+    logger.info(f"📦 Livechat batch request - videos: {len(request.video_ids)}")
+
+    try:
+        chat_ids = await youtube_service.get_live_chat_ids(request.video_ids)
+    except Exception as e:
+        logger.error(f"💥 Error - batch: {request.video_ids}, error: {str(e)}")
+        raise handle_youtube_api_error(e)
+
+    results = {
+        video_id: LiveChatBatchResult(live_chat_id=chat_ids.get(video_id))
+        for video_id in request.video_ids
+    }
+    for result in results.values():
+        if not result.live_chat_id:
+            result.error = "ライブ配信が見つからないか、ライブチャットが無効です。"
+
+    if request.include_messages:
+        targets = [r for r in results.values() if r.live_chat_id]
+        pages = await asyncio.gather(
+            *(youtube_service.get_chat_messages(r.live_chat_id) for r in targets),
+            return_exceptions=True,
+        )
+        for result, page in zip(targets, pages):
+            if isinstance(page, Exception):
+                result.error = handle_youtube_api_error(page).detail
+            else:
+                result.messages = page
+
+    elapsed = time.time() - start_time
+    logger.info(f"✅ Batch success - videos: {len(results)}, time: {elapsed:.2f}s")
+    return PydanticJSONResponse(LiveChatBatchResponse(results=results))
+
+
+@router.get("/livechat/stream")
+async def youtube_livechat_stream(
+    request: Request,
+    video_id: str,
+    last_event_id: Optional[str] = None,
+    fields: Optional[str] = None,
+    type: Optional[str] = None,
+    author_id: Optional[str] = None,
+    q: Optional[str] = Query(None, max_length=100),
+):
+    """Server-Sent Events でライブチャットを配信
+
+    再接続時は Last-Event-ID ヘッダー（またはクエリ）のメッセージIDの次から再開する。
+    絞り込み・射影のパラメータは GET /livechat と同じ。
+    """
+    _validate_video_id_param(video_id)
+    message_filter = _build_filter(
+        lambda: MessageFilter.from_query(fields, type, author_id, q)
+    )
+    resume_id = request.headers.get("last-event-id") or last_event_id
+
+    live_chat_id = await _resolve_live_chat_id(video_id)
+    subscription = poller_manager.subscribe(live_chat_id, resume_id)
+    logger.info(f"📡 SSE stream opened - video_id: {video_id}, resume: {resume_id}")
+
+    return StreamingResponse(
+        _sse_events(subscription, message_filter),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/livechat/history", response_model=LiveChatHistoryResponse)
+async def youtube_livechat_history(
+    video_id: Optional[str] = None,
+    live_chat_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after_id: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=1000),
+):
+    """アーカイブ済みのチャット履歴を取得（YouTube APIのクォータを使わない）
+
+    since 以上 until 未満の publishedAt のメッセージを古い順に返す。
+    続きは next_after_id を after_id に指定して取得する。
+    """
+    archiver = _require_archiver()
+    live_chat_id = await _archived_live_chat_id(archiver, video_id, live_chat_id)
+
+    try:
+        result = await archiver.read(
+            live_chat_id,
+            since=to_micros(since) if since else None,
+            until=to_micros(until) if until else None,
+            after_id=after_id,
+            limit=limit,
+        )
+    except KeyError:
+        raise HTTPException(
+            status_code=404, detail="after_id のメッセージがアーカイブにありません。"
+        )
+    if result is None:
+        raise HTTPException(status_code=404, detail="アーカイブが見つかりません。")
+
+    records, has_more = result
+    logger.info(
+        f"🗃️ History request - chat: {live_chat_id}, messages: {len(records)}, more: {has_more}"
+    )
+    return Response(
+        content=_history_body(live_chat_id, records, has_more),
+        media_type="application/json",
+    )
+
+
+@router.get("/livechat/search", response_model=LiveChatHistoryResponse)
+async def youtube_livechat_search(
+    q: Optional[str] = Query(None, max_length=100),
+    author_id: Optional[str] = None,
+    video_id: Optional[str] = None,
+    live_chat_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after_id: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=1000),
+):
+    """アーカイブ済みのメッセージを本文・作者名（q）と作者のチャンネルIDで検索
+
+    q の語を全て含むメッセージを古い順に返す（日本語は部分一致、英数字は単語単位）。
+    """
+    if not (q and q.strip()) and not author_id:
+        raise HTTPException(
+            status_code=400, detail="q か author_id を指定してください。"
+        )
+
+    archiver = _require_archiver()
+    live_chat_id = await _archived_live_chat_id(archiver, video_id, live_chat_id)
+
+    try:
+        result = await archiver.search(
+            live_chat_id,
+            query=q,
+            author_id=author_id,
+            since=to_micros(since) if since else None,
+            until=to_micros(until) if until else None,
+            after_id=after_id,
+            limit=limit,
+        )
+    except KeyError:
+        raise HTTPException(
+            status_code=404, detail="after_id のメッセージがアーカイブにありません。"
+        )
+    if result is None:
+        raise HTTPException(status_code=404, detail="アーカイブが見つかりません。")
+
+    records, has_more = result
+    logger.info(
+        f"🔎 Search request - chat: {live_chat_id}, q: {q}, author: {author_id}, hits: {len(records)}"
+    )
+    return Response(
+        content=_history_body(live_chat_id, records, has_more),
+        media_type="application/json",
+    )
+
 
+@router.get("/livechat/export")
+async def youtube_livechat_export(
+    video_id: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    fields: Optional[str] = None,
+    type: Optional[str] = None,
+    author_id: Optional[str] = None,
+    q: Optional[str] = Query(None, max_length=100),
+):
+    """チャット全体を NDJSON / CSV でストリーミング出力
 
-@router.get("/livechat", response_model=LiveChatMessageListResponse)
-def youtube_livechat_get(video_id: str, page_token: Optional[str] = None):
-    """GETメソッドでのライブチャット取得（後方互換性のため）"""
+    アーカイブがあればディスクから、なければ nextPageToken をたどって最新まで取得する。
+    fields は NDJSON では射影、CSV では列の指定になる。
+    """
+    _validate_video_id_param(video_id)
+    message_filter = _build_filter(
+        lambda: MessageFilter.from_query(fields, type, author_id, q)
+    )
+    exporter = ChatExporter(format, message_filter)
+
+    archiver = youtube_service.archiver
+    live_chat_id = (
+        archiver.live_chat_id_for(video_id) if archiver is not None else None
+    ) or await _resolve_live_chat_id(video_id)
+
+    return StreamingResponse(
+        export_chat(youtube_service, live_chat_id, exporter, EXPORT_CHUNK_SIZE),
+        media_type=exporter.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="livechat-{video_id}.{format}"'
+        },
+    )
+
+
+def _require_debug():
+    """診断用エンドポイントは開発・ステージング限定（それ以外は404）"""
+    if not DEBUG:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@router.get("/quota", include_in_schema=DEBUG)
+async def youtube_quota():
+    """YouTube APIのクォータ消費状況（エンドポイント・動画・クライアント別、リセット時点の予測）"""
+    _require_debug()
+    return youtube_service.quota_stats()
+
+
+@router.get("/upstream", include_in_schema=DEBUG)
+async def youtube_upstream():
+    """YouTube APIへの呼び出しの状況（プールの空き待ち、サーキットブレーカーなど）"""
+    _require_debug()
+    return youtube_service.upstream_stats()
+
+
+def _require_archiver() -> ChatArchiver:
+    """アーカイブを取得（無効なら404）"""
+    archiver = youtube_service.archiver
+    if archiver is None:
+        raise HTTPException(status_code=404, detail="チャットアーカイブは無効です。")
+    return archiver
+
+
+async def _archived_live_chat_id(
+    archiver: ChatArchiver, video_id: Optional[str], live_chat_id: Optional[str]
+) -> str:
+    """クエリの liveChatId（なければ動画IDから、保存済みの対応を優先して解決）"""
+    if live_chat_id is not None:
+        return live_chat_id
+    if video_id is None:
+        raise HTTPException(
+            status_code=400, detail="video_id か live_chat_id を指定してください。"
+        )
+    _validate_video_id_param(video_id)
+    return archiver.live_chat_id_for(video_id) or await _resolve_live_chat_id(
+        video_id
+    )
+
+
+def _history_body(
+    live_chat_id: str, records: List[ArchivedMessage], has_more: bool
+) -> bytes:
+    """保存済みのJSONをそのまま並べてレスポンス本文を作る"""
+    next_after_id = records[-1].id if records else None
+    return b"".join(
+        (
+            b'{"live_chat_id":',
+            json.dumps(live_chat_id).encode(),
+            b',"items":[',
+            b",".join(record.payload for record in records),
+            b'],"next_after_id":',
+            json.dumps(next_after_id).encode(),
+            b',"has_more":',
+            b"true" if has_more else b"false",
+            b"}",
+        )
+    )
+
+
+def _conditional_response(
+    data: LiveChatMessageListResponse,
+    if_none_match: Optional[str],
+    message_filter: MessageFilter,
+) -> Response:
+    """ETagを付与し、クライアントのETagと一致すれば304を返す
+
+    モデルは検証済みなので、response_model による再検証を通さずにそのまま直列化する。
+    """
+    etag = format_etag(message_filter.etag(data.etag))
+    if etag_matches(if_none_match, etag):
+        logger.debug(f"🔁 Not modified - etag: {etag}")
+        return Response(status_code=304, headers={"ETag": etag})
+
+    return PydanticJSONResponse(
+        message_filter.apply_page(data),
+        include=message_filter.page_include,
+        headers={"ETag": etag},
+    )
+
+
+def _build_filter(factory: Callable[[], MessageFilter]) -> MessageFilter:
+    """絞り込み条件を作成（不正なフィールド指定は400）"""
+    try:
+        return factory()
+    except ValueError as e:
+        logger.warning(f"🚫 Invalid filter: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _validate_video_id_param(video_id: str):
+    """クエリパラメータの動画IDを検証"""
     if not validate_youtube_video_id(video_id):
         logger.warning(f"🚫 Invalid video_id: {video_id}")
         raise HTTPException(
@@ -32,38 +408,94 @@ def youtube_livechat_get(video_id: str, page_token: Optional[str] = None):
             detail="無効な動画IDです。11文字の英数字・ハイフン・アンダースコアのみ使用してください。",
         )
 
-    cleaned_page_token = sanitize_page_token(page_token)
-    return _get_livechat(video_id, cleaned_page_token)
 
+async def _resolve_live_chat_id(video_id: str) -> str:
+    """動画IDからライブチャットIDを取得（見つからなければ404）"""
+    try:
+        live_chat_id = await youtube_service.get_live_chat_id(video_id)
+    except Exception as e:
+        logger.error(f"💥 Error - video_id: {video_id}, error: {str(e)}")
+        raise handle_youtube_api_error(e)
+
+    if not live_chat_id:
+        logger.warning(f"❌ Live chat not found for video: {video_id}")
+        raise HTTPException(
+            status_code=404,
+            detail="ライブ配信が見つからないか、ライブチャットが無効です。",
+        )
+    return live_chat_id
+
+
+async def _sse_events(
+    subscription: Subscription, message_filter: MessageFilter
+) -> AsyncIterator[str]:
+    """購読したメッセージをSSE形式で送出（一定時間新着がなければハートビート）
+
+    購読者は自分の読み取り位置を持つため、遅いクライアントは自分の分だけ遅れ、
+    リングバッファから溢れた分は dropped イベントで通知して読み飛ばす。
+    """
+    active = ACTIVE_STREAMS.labels("sse")
+    active.inc()
+    try:
+        yield f"retry: {SSE_RETRY_MILLIS}\n\n"
+        dropped = 0
+        while not subscription.ended:
+            items = await subscription.get(
+                timeout=SSE_HEARTBEAT_INTERVAL, limit=SSE_MAX_BATCH
+            )
+            if subscription.dropped != dropped:
+                count = subscription.dropped - dropped
+                yield f'event: dropped\ndata: {{"count": {count}}}\n\n'
+                dropped = subscription.dropped
+            if not items:
+                if not subscription.ended:
+                    yield ": heartbeat\n\n"
+                continue
 
-def _get_livechat(
+            events = "".join(
+                f"id: {item.id}\nevent: message\ndata: {message_filter.dump_item(item)}\n\n"
+                for _, item in items
+                if message_filter.matches(item)
+            )
+            if events:
+                yield events
+
+        if subscription.poller.ended:
+            yield "event: end\ndata: {}\n\n"
+    finally:
+        active.dec()
+        await poller_manager.unsubscribe(subscription)
+        logger.info(f"📴 SSE stream closed - chat: {subscription.live_chat_id}")
+
+
+async def _get_livechat(
     video_id: str, page_token: Optional[str]
 ) -> LiveChatMessageListResponse:
     """ライブチャット取得の共通処理"""
-    start_time = time.time()
-    logger.info(f"📹 Livechat request - video_id: {video_id}")
+    with TRACER.span("livechat.get", video_id=video_id) as span:
+        start_time = time.time()
+        logger.info(f"📹 Livechat request - video_id: {video_id}")
 
-    try:
-        live_chat_id = youtube_service.get_live_chat_id(video_id)
-        if not live_chat_id:
-            logger.warning(f"❌ Live chat not found for video: {video_id}")
-            raise HTTPException(
-                status_code=404,
-                detail="ライブ配信が見つからないか、ライブチャットが無効です。",
-            )
+        live_chat_id = await _resolve_live_chat_id(video_id)
+        span.set_attribute("live_chat_id", live_chat_id)
 
-        data = youtube_service.get_chat_messages(live_chat_id, page_token)
+        try:
+            data = await youtube_service.get_chat_messages(live_chat_id, page_token)
 
-        elapsed = time.time() - start_time
-        message_count = len(data.items) if hasattr(data, "items") else 0
-        logger.info(
-            f"✅ Success - video_id: {video_id}, messages: {message_count}, time: {elapsed:.2f}s"
-        )
+            elapsed = time.time() - start_time
+            message_count = len(data.items) if hasattr(data, "items") else 0
+            span.set_attribute("messages", message_count)
+            logger.info(
+                f"✅ Success - video_id: {video_id}, messages: {message_count}, time: {elapsed:.2f}s"
+            )
 
-        return data
+            return data
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"💥 Error - video_id: {video_id}, error: {str(e)}")
-        raise handle_youtube_api_error(e)
+        except HTTPException:
+            raise
+        except PollTooEarlyError as e:
+            logger.info(f"⏳ Too early - video_id: {video_id}, retry: {e.retry_after:.2f}s")
+            raise handle_youtube_api_error(e)
+        except Exception as e:
+            logger.error(f"💥 Error - video_id: {video_id}, error: {str(e)}")
+            raise handle_youtube_api_error(e)
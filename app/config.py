@@ -4,8 +4,16 @@ from dotenv import load_dotenv
 load_dotenv()
 
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-if not YOUTUBE_API_KEY:
+# 複数のAPIキー（カンマ区切り、"キー:1日のクォータ" でキーごとのクォータも指定できる）
+YOUTUBE_API_KEYS = [
+    key.strip() for key in os.getenv("YOUTUBE_API_KEYS", "").split(",") if key.strip()
+]
+if not YOUTUBE_API_KEYS and YOUTUBE_API_KEY:
+    YOUTUBE_API_KEYS = [YOUTUBE_API_KEY]
+if not YOUTUBE_API_KEYS:
     raise ValueError("YOUTUBE_API_KEY is not set in environment variables")
+if not YOUTUBE_API_KEY:
+    YOUTUBE_API_KEY = YOUTUBE_API_KEYS[0].partition(":")[0]
 
 # 環境設定
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
@@ -32,6 +40,135 @@ RATE_LIMIT_REQUESTS_PER_SECOND = float(
 )
 RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", DEFAULT_MAX_RETRIES))
 RATE_LIMIT_BASE_DELAY = float(os.getenv("RATE_LIMIT_BASE_DELAY", DEFAULT_BASE_DELAY))
+# トークンバケットの容量（バースト許容量）
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "5"))
+# wait: 待機してから処理 / reject: 待たずに429を返す
+RATE_LIMIT_MODE = os.getenv("RATE_LIMIT_MODE", "wait").lower()
+# wait モードでの最大待機秒数（超える場合は429）
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "30"))
+
+# 上流の条件付きリクエスト（If-None-Match）用のETagキャッシュ設定
+UPSTREAM_ETAG_CACHE_MAX_SIZE = int(os.getenv("UPSTREAM_ETAG_CACHE_MAX_SIZE", "256"))
+UPSTREAM_ETAG_CACHE_TTL = float(os.getenv("UPSTREAM_ETAG_CACHE_TTL", "600"))
+
+# リクエストの期限（秒、上流の呼び出しとリトライの合計時間の上限）
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "20"))
+# リトライはリクエスト数のこの割合まで（それに加えて毎秒この回数まで）
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.1"))
+RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "0.2"))
+
+# 上流（googleapis.com）へのコネクションプール設定
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+# アイドルなコネクションを保持する秒数
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+# プールの空きを待つ最大秒数
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "5"))
+# HTTP/2（1本のコネクションで多重化、h2 パッケージが必要）
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+# 起動時に確立しておくコネクション数（環境別、0で無効）
+DEFAULT_WARMUP_CONNECTIONS = {"production": "4", "staging": "2"}.get(ENVIRONMENT, "0")
+HTTP_WARMUP_CONNECTIONS = int(
+    os.getenv("HTTP_WARMUP_CONNECTIONS", DEFAULT_WARMUP_CONNECTIONS)
+)
+HTTP_WARMUP_URL = os.getenv(
+    "HTTP_WARMUP_URL", "https://www.googleapis.com/youtube/v3/"
+)
+HTTP_WARMUP_TIMEOUT = float(os.getenv("HTTP_WARMUP_TIMEOUT", "5"))
+
+# Prometheus 形式のメトリクス（/metrics）
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# トレース（スパンを1行のJSONでログに出す、traceparent ヘッダーで呼び出し元・上流と引き継ぐ）
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+# 呼び出し元から traceparent を受け取らなかったリクエストを記録する割合
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+
+# サーキットブレーカー設定（エンドポイントごと）
+# 連続で何回失敗したら open にするか
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(
+    os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5")
+)
+# open にしてから試行を再開するまでの秒数
+CIRCUIT_BREAKER_RECOVERY_TIMEOUT = float(
+    os.getenv("CIRCUIT_BREAKER_RECOVERY_TIMEOUT", "30")
+)
+# open の間、上流ETagキャッシュに残っている直近のレスポンスを返す
+CIRCUIT_BREAKER_SERVE_STALE = (
+    os.getenv("CIRCUIT_BREAKER_SERVE_STALE", "true").lower() == "true"
+)
+
+# 上流への同時実行数の上限（AIMDで調整）
+CONCURRENCY_LIMIT_INITIAL = int(os.getenv("CONCURRENCY_LIMIT_INITIAL", "10"))
+CONCURRENCY_LIMIT_MIN = int(os.getenv("CONCURRENCY_LIMIT_MIN", "1"))
+CONCURRENCY_LIMIT_MAX = int(os.getenv("CONCURRENCY_LIMIT_MAX", "50"))
+# これより遅い応答は失敗と同じく上限を下げる（秒）
+CONCURRENCY_LATENCY_THRESHOLD = float(
+    os.getenv("CONCURRENCY_LATENCY_THRESHOLD", "2.0")
+)
+# 上限に達している時に空きを待つ最大秒数（超えると503）
+CONCURRENCY_MAX_WAIT = float(os.getenv("CONCURRENCY_MAX_WAIT", "5"))
+# 上限を下げるのはこの秒数に1回まで（同時に失敗した呼び出しで何度も下げない）
+CONCURRENCY_DECREASE_WINDOW = float(os.getenv("CONCURRENCY_DECREASE_WINDOW", "1.0"))
+
+# ライブチャットIDキャッシュ設定
+LIVE_CHAT_ID_CACHE_TTL = float(os.getenv("LIVE_CHAT_ID_CACHE_TTL", "300"))
+LIVE_CHAT_ID_CACHE_NEGATIVE_TTL = float(
+    os.getenv("LIVE_CHAT_ID_CACHE_NEGATIVE_TTL", "30")
+)
+LIVE_CHAT_ID_CACHE_MAX_SIZE = int(os.getenv("LIVE_CHAT_ID_CACHE_MAX_SIZE", "1024"))
+# 単発の問い合わせをまとめる待ち時間（秒、0で無効）
+LIVE_CHAT_ID_BATCH_WINDOW = float(os.getenv("LIVE_CHAT_ID_BATCH_WINDOW", "0.005"))
+
+# チャットページキャッシュ設定
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+# "memory" またはバックエンドクラスのパス（例: "mypackage.cache:RedisPageCache"）
+PAGE_CACHE_BACKEND = os.getenv("PAGE_CACHE_BACKEND", "memory")
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "300"))
+
+# チャットごとのポーリング間隔管理（pollingIntervalMillis より早いポーリングを抑止）
+CHAT_POLL_SCHEDULER_ENABLED = (
+    os.getenv("CHAT_POLL_SCHEDULER_ENABLED", "true").lower() == "true"
+)
+
+# チャットアーカイブ設定（取得したメッセージをディスクに保存）
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "false").lower() == "true"
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "data/archive")
+ARCHIVE_SEGMENT_MAX_BYTES = int(
+    os.getenv("ARCHIVE_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024))
+)
+# 疎なインデックスのブロックサイズ（件）
+ARCHIVE_INDEX_INTERVAL = int(os.getenv("ARCHIVE_INDEX_INTERVAL", "64"))
+# 開いておくアーカイブの最大数（超えたら最近使っていないものから閉じる）
+ARCHIVE_MAX_OPEN = int(os.getenv("ARCHIVE_MAX_OPEN", "64"))
+
+# エクスポートでアーカイブから一度に読むメッセージ数
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+# サーバー側ポーラー設定
+POLLER_BUFFER_SIZE = int(os.getenv("POLLER_BUFFER_SIZE", "2000"))
+POLLER_MIN_INTERVAL = float(os.getenv("POLLER_MIN_INTERVAL", "1.0"))
+POLLER_ERROR_BACKOFF = float(os.getenv("POLLER_ERROR_BACKOFF", "5.0"))
+# 最後の購読者が抜けてからポーラーとバッファを残す秒数（Last-Event-ID での再接続用、0ですぐ停止）
+POLLER_IDLE_GRACE = float(os.getenv("POLLER_IDLE_GRACE", "30"))
+
+# SSEストリーミング設定
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+SSE_RETRY_MILLIS = int(os.getenv("SSE_RETRY_MILLIS", "3000"))
+SSE_MAX_BATCH = int(os.getenv("SSE_MAX_BATCH", "200"))
+
+# WebSocket設定
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "1000"))
+WS_MAX_BATCH = int(os.getenv("WS_MAX_BATCH", "200"))
+WS_MAX_SUBSCRIPTIONS = int(os.getenv("WS_MAX_SUBSCRIPTIONS", "20"))
+
+# レスポンス圧縮設定（zstd / br は zstandard / brotli がインストールされている場合のみ）
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
 
 # ログレベル設定（環境別）
 LOG_LEVEL = os.getenv("LOG_LEVEL", DEFAULT_LOG_LEVEL)
@@ -55,3 +192,18 @@ API_TITLE = f"Live Chat API ({ENVIRONMENT.capitalize()})"
 API_VERSION = "1.0.0"
 if ENVIRONMENT != "production":
     API_VERSION += f"-{ENVIRONMENT}"
+
+# APIキーのクォータ設定
+# キーごとの1日のクォータ（ユニット）
+YOUTUBE_API_DAILY_QUOTA = int(os.getenv("YOUTUBE_API_DAILY_QUOTA", "10000"))
+# クォータがリセットされるタイムゾーン（YouTube Data API は太平洋時間の0時）
+QUOTA_RESET_TIMEZONE = os.getenv("QUOTA_RESET_TIMEZONE", "America/Los_Angeles")
+# クライアント（X-Client-Id、なければ接続元アドレス）ごとの1日の予算（ユニット、0で無制限）
+QUOTA_CLIENT_DAILY_BUDGET = int(os.getenv("QUOTA_CLIENT_DAILY_BUDGET", "0"))
+# 残りクォータがこの割合を下回ったら優先度 low / normal のリクエストを断る
+# （normal は既定の優先度なので、既定では最後まで使えるように 0）
+QUOTA_RESERVE_LOW = float(os.getenv("QUOTA_RESERVE_LOW", "0.3"))
+QUOTA_RESERVE_NORMAL = float(os.getenv("QUOTA_RESERVE_NORMAL", "0"))
+# X-Client-Id と X-Priority: high を信頼するか（認証済みのゲートウェイが付ける場合だけ true にする）
+# false なら予算は接続元アドレスごとに数え、X-Priority は normal より上げられない
+TRUST_CLIENT_HEADERS = os.getenv("TRUST_CLIENT_HEADERS", "false").lower() == "true"
@@ -2,14 +2,37 @@ import os
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
 from datetime import datetime
-from app.api import youtube_router
+from app.api import youtube_router, livechat_ws_router, metrics_router
+from app.services.youtube import youtube_service
+from app.services.poller import poller_manager
 from app.models.request import HealthCheckResponse
 from app.utils.logger import setup_logger
 from app.utils.exceptions import YouTubeAPIError, ValidationError
-from app.config import CORS_ORIGINS, ENVIRONMENT, DEBUG, API_TITLE, API_VERSION
+from app.utils.compression import CompressionMiddleware, available_encodings
+from app.utils.metrics import MetricsMiddleware
+from app.utils.request_context import RequestContextMiddleware
+from app.utils.tracing import TracingMiddleware
+from app.config import (
+    CORS_ORIGINS,
+    ENVIRONMENT,
+    DEBUG,
+    API_TITLE,
+    API_VERSION,
+    COMPRESSION_ENABLED,
+    COMPRESSION_MINIMUM_SIZE,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_ZSTD_LEVEL,
+    HTTP_WARMUP_CONNECTIONS,
+    HTTP_WARMUP_URL,
+    HTTP_WARMUP_TIMEOUT,
+    METRICS_ENABLED,
+    TRACING_ENABLED,
+)
 import logging
 
 # ログ設定を最初に実行
@@ -24,8 +47,17 @@ async def lifespan(app: FastAPI):
     logger.info(f"🚀 Live Chat API starting up in {ENVIRONMENT} mode...")
     logger.info(f"🌐 CORS origins: {CORS_ORIGINS}")
     logger.info(f"🐛 Debug mode: {DEBUG}")
+    if COMPRESSION_ENABLED:
+        logger.info(f"🗜️ Compression: {', '.join(available_encodings())}")
+    if HTTP_WARMUP_CONNECTIONS > 0:
+        # 最初のリクエストでTLSハンドシェイクを待たないように上流への接続を張っておく
+        await youtube_service.client.warmup(
+            HTTP_WARMUP_URL, HTTP_WARMUP_CONNECTIONS, timeout=HTTP_WARMUP_TIMEOUT
+        )
     yield
     # Shutdown
+    await poller_manager.shutdown()
+    await youtube_service.close()
     logger.info("👋 Live Chat API shutting down...")
 
 
@@ -51,7 +83,10 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     else:
         return JSONResponse(
             status_code=422,
-            content={"detail": "入力値にエラーがあるよ〜", "errors": exc.errors()},
+            content={
+                "detail": "入力値にエラーがあるよ〜",
+                "errors": jsonable_encoder(exc.errors()),
+            },
         )
 
 
@@ -77,7 +112,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# レスポンス圧縮（Accept-Encoding に応じて zstd / br / gzip）
+if COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=COMPRESSION_MINIMUM_SIZE,
+        encodings=available_encodings(
+            gzip_level=COMPRESSION_GZIP_LEVEL,
+            brotli_quality=COMPRESSION_BROTLI_QUALITY,
+            zstd_level=COMPRESSION_ZSTD_LEVEL,
+        ),
+    )
+
+# クライアントIDと優先度（クォータの計上・予算の判定に使う）
+app.add_middleware(RequestContextMiddleware)
+
+# リクエストごとのトレース（traceparent ヘッダーで呼び出し元のトレースを引き継ぐ）
+if TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+
+# ルートごとのレスポンス時間（最も外側で計測する）
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(youtube_router)
+app.include_router(livechat_ws_router)
+if METRICS_ENABLED:
+    app.include_router(metrics_router)
 
 
 @app.get("/health", response_model=HealthCheckResponse)
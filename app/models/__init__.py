@@ -1,4 +1,15 @@
 from .youtube import LiveChatMessageListResponse
-from .request import LiveChatRequest
+from .request import (
+    LiveChatRequest,
+    LiveChatBatchRequest,
+    LiveChatBatchResponse,
+    LiveChatHistoryResponse,
+)
 
-__all__ = ["LiveChatMessageListResponse", "LiveChatRequest"]
+__all__ = [
+    "LiveChatMessageListResponse",
+    "LiveChatRequest",
+    "LiveChatBatchRequest",
+    "LiveChatBatchResponse",
+    "LiveChatHistoryResponse",
+]
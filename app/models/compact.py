@@ -0,0 +1,140 @@
+import sys
+from typing import Dict, Generic, Hashable, List, Tuple, TypeVar
+from app.models.youtube import AuthorDetails, LiveChatMessageItem, Snippet
+
+T = TypeVar("T", bound=Hashable)
+
+# (authorChannelId, channelId, displayName, profileImageUrl, isVerified)
+AuthorKey = Tuple[str, str, str, str, bool]
+# (kind, liveChatId, type)
+ContextKey = Tuple[str, str, str]
+
+
+class InternTable(Generic[T]):
+    """値を重複なく保持し、整数の番号で参照するテーブル"""
+
+    def __init__(self):
+        self._values: List[T] = []
+        self._index: Dict[T, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __getitem__(self, index: int) -> T:
+        return self._values[index]
+
+    def intern(self, value: T) -> int:
+        """値の番号を返す（未登録なら追加）"""
+        index = self._index.get(value)
+        if index is None:
+            index = len(self._values)
+            self._values.append(value)
+            self._index[value] = index
+        return index
+
+
+class CompactMessage:
+    """バッファ保持用の軽量なチャットメッセージ
+
+    作者情報と (kind, liveChatId, type) は CompactMessageCodec のテーブルの番号で持ち、
+    メッセージごとに異なる値だけを保持する。
+    """
+
+    __slots__ = (
+        "id",
+        "etag",
+        "published_at",
+        "text",
+        "author",
+        "context",
+        "has_display_content",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        etag: str,
+        published_at: str,
+        text: str,
+        author: int,
+        context: int,
+        has_display_content: bool,
+    ):
+        self.id = id
+        self.etag = etag
+        self.published_at = published_at
+        self.text = text
+        self.author = author
+        self.context = context
+        self.has_display_content = has_display_content
+
+    def __repr__(self) -> str:
+        return f"CompactMessage(id={self.id!r}, author={self.author}, text={self.text!r})"
+
+
+class CompactMessageCodec:
+    """LiveChatMessageItem と CompactMessage を相互に変換する
+
+    同じ作者・チャットの値は1つだけ保持する（変換は公開モデルの全フィールドについて可逆）。
+    テーブルは縮まないため、チャットやバッファ単位でインスタンスを分けて使う。
+    """
+
+    def __init__(self):
+        self.authors: InternTable[AuthorKey] = InternTable()
+        self.contexts: InternTable[ContextKey] = InternTable()
+
+    def pack(self, item: LiveChatMessageItem) -> CompactMessage:
+        """公開モデルを軽量な表現に変換"""
+        snippet = item.snippet
+        details = item.authorDetails
+        author = self.authors.intern(
+            (
+                sys.intern(snippet.authorChannelId),
+                sys.intern(details.channelId),
+                details.displayName,
+                details.profileImageUrl,
+                details.isVerified,
+            )
+        )
+        context = self.contexts.intern(
+            (
+                sys.intern(item.kind),
+                sys.intern(snippet.liveChatId),
+                sys.intern(snippet.type),
+            )
+        )
+        return CompactMessage(
+            item.id,
+            item.etag,
+            snippet.publishedAt,
+            snippet.displayMessage,
+            author,
+            context,
+            snippet.hasDisplayContent,
+        )
+
+    def unpack(self, message: CompactMessage) -> LiveChatMessageItem:
+        """軽量な表現を公開モデルに戻す（値は検証済みなので再検証しない）"""
+        author_channel_id, channel_id, display_name, image_url, verified = (
+            self.authors[message.author]
+        )
+        kind, live_chat_id, message_type = self.contexts[message.context]
+        return LiveChatMessageItem.model_construct(
+            kind=kind,
+            etag=message.etag,
+            id=message.id,
+            snippet=Snippet.model_construct(
+                type=message_type,
+                liveChatId=live_chat_id,
+                authorChannelId=author_channel_id,
+                publishedAt=message.published_at,
+                hasDisplayContent=message.has_display_content,
+                displayMessage=message.text,
+            ),
+            authorDetails=AuthorDetails.model_construct(
+                channelId=channel_id,
+                displayName=display_name,
+                profileImageUrl=image_url,
+                isVerified=verified,
+            ),
+        )
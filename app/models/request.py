@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, field_validator
 import re
-from typing import Optional
+from typing import Dict, List, Optional
+from app.models.youtube import LiveChatMessageItem, LiveChatMessageListResponse
 
 
 class LiveChatRequest(BaseModel):
@@ -18,6 +19,26 @@ class LiveChatRequest(BaseModel):
         None, description="ページネーション用トークン", max_length=200
     )
 
+    fields: Optional[List[str]] = Field(
+        None,
+        description="返すメッセージのフィールド（例: snippet.displayMessage）",
+        examples=[["id", "snippet.displayMessage", "authorDetails.displayName"]],
+    )
+
+    types: Optional[List[str]] = Field(
+        None,
+        description="snippet.type で絞り込み",
+        examples=[["superChatEvent", "superStickerEvent"]],
+    )
+
+    author_ids: Optional[List[str]] = Field(
+        None, description="作者のチャンネルIDで絞り込み"
+    )
+
+    q: Optional[str] = Field(
+        None, description="本文に含まれるキーワードで絞り込み", max_length=100
+    )
+
     @field_validator("video_id")
     @classmethod
     def validate_video_id(cls, v):
@@ -48,6 +69,57 @@ class LiveChatRequest(BaseModel):
         return v.strip()
 
 
+class LiveChatBatchRequest(BaseModel):
+    """複数動画のライブチャット一括取得リクエスト"""
+
+    video_ids: List[str] = Field(
+        ...,
+        description="YouTubeの動画IDのリスト",
+        examples=[["dQw4w9WgXcQ", "jNQXAC9IVRw"]],
+        min_length=1,
+        max_length=50,
+    )
+
+    include_messages: bool = Field(
+        False, description="チャットメッセージの最新ページも取得するか"
+    )
+
+    @field_validator("video_ids")
+    @classmethod
+    def validate_video_ids(cls, v):
+        pattern = r"^[a-zA-Z0-9_-]{11}$"
+        invalid = [video_id for video_id in v if not re.match(pattern, video_id)]
+        if invalid:
+            raise ValueError(f"video_idsの形式が間違ってるよ〜: {invalid}")
+
+        return list(dict.fromkeys(v))
+
+
+class LiveChatBatchResult(BaseModel):
+    """動画ごとの一括取得結果"""
+
+    live_chat_id: Optional[str] = None
+    messages: Optional[LiveChatMessageListResponse] = None
+    error: Optional[str] = None
+
+
+class LiveChatBatchResponse(BaseModel):
+    """複数動画のライブチャット一括取得レスポンス"""
+
+    results: Dict[str, LiveChatBatchResult]
+
+
+class LiveChatHistoryResponse(BaseModel):
+    """アーカイブ済みチャット履歴のレスポンス"""
+
+    live_chat_id: str
+    items: List[LiveChatMessageItem]
+    next_after_id: Optional[str] = Field(
+        None, description="続きを取得する時に after_id に指定するメッセージID"
+    )
+    has_more: bool = False
+
+
 class HealthCheckResponse(BaseModel):
     """ヘルスチェックのレスポンスモデル"""
 
@@ -4,5 +4,11 @@
 """
 
 from .youtube import YouTubeService, youtube_service
+from .poller import LiveChatPollerManager, poller_manager
 
-__all__ = ["YouTubeService", "youtube_service"]
+__all__ = [
+    "YouTubeService",
+    "youtube_service",
+    "LiveChatPollerManager",
+    "poller_manager",
+]
@@ -0,0 +1,752 @@
+import asyncio
+import hashlib
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import (
+    AsyncIterator,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from app.models.youtube import LiveChatMessageItem
+from app.services.search import ChatSearchIndex, matches, parse_query
+import logging
+
+logger = logging.getLogger(__name__)
+
+# レコードヘッダー: 本文の長さ, publishedAt（UNIX時刻のマイクロ秒）, メッセージIDの長さ
+RECORD_HEADER = struct.Struct("<IqH")
+SEGMENT_SUFFIX = ".seg"
+VIDEO_MAP_FILE = "videos.tsv"
+SEARCH_INDEX_FILE = "search.idx"
+# セグメントのインデックスを保存するファイル（セグメントのパス + この接尾辞）
+INDEX_SUFFIX = ".idx"
+# インデックスファイルのヘッダー: 形式, 対象のファイルサイズ, 件数, ブロックの件数,
+# publishedAt の最大値, 各配列の長さ（ブロック先頭オフセット, 最小, 最大, メッセージIDのキー）
+INDEX_HEADER = struct.Struct("<4sQQIq4Q")
+INDEX_MAGIC = b"SIX1"
+
+_SAFE_DIR_NAME = re.compile(r"[A-Za-z0-9_-]{1,128}")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_micros(value: datetime) -> int:
+    """datetime を UNIX時刻のマイクロ秒に変換（タイムゾーンなしはUTC扱い）"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def parse_published_at(value: str) -> int:
+    """publishedAt（ISO 8601）を UNIX時刻のマイクロ秒に変換（解釈できなければ0）"""
+    try:
+        return to_micros(datetime.fromisoformat(value.replace("Z", "+00:00")))
+    except ValueError:
+        return 0
+
+
+class ArchivedMessage(NamedTuple):
+    """アーカイブから読み出したメッセージ（payload は公開モデルのJSON）"""
+
+    published_at: int
+    id: str
+    payload: bytes
+
+
+class ArchiveSegment:
+    """長さ付きレコードを追記していくセグメントファイル
+
+    index_interval 件ごとのブロック単位で先頭オフセットと publishedAt の範囲を持つ疎なインデックスと、
+    メッセージIDのハッシュ（crc32）から引くレコード番号を全件分持つ。
+    インデックスは閉じる時に別ファイルへ保存し、次に開く時はその後に追記された分だけ走査する。
+    """
+
+    def __init__(self, path: str, index_interval: int, previous_max: int = 0):
+        self.path = path
+        self.index_interval = index_interval
+        self._previous_max = previous_max
+        self._reset_index()
+        self._file = None
+
+    def _reset_index(self):
+        self.size = 0
+        self.count = 0
+        self.block_offsets = array("Q")
+        self.block_min = array("q")
+        # ブロック末尾までの publishedAt の最大値（前のセグメントも含めて単調増加）
+        self.block_max = array("q")
+        self.max_published_at = self._previous_max
+        # (crc32 << 32) | レコード番号 の昇順（bisect で引く）
+        self.id_keys = array("Q")
+        # id_keys にまだ入れていない分（crc32 → レコード番号）
+        self._new_ids: Dict[int, List[int]] = {}
+        self._saved_count = 0
+
+    def _index(self, offset: int, published_at: int, message_id: str):
+        if self.count % self.index_interval == 0:
+            self.block_offsets.append(offset)
+            self.block_min.append(published_at)
+            self.block_max.append(max(self.max_published_at, published_at))
+        else:
+            self.block_min[-1] = min(self.block_min[-1], published_at)
+        self.max_published_at = max(self.max_published_at, published_at)
+        self.block_max[-1] = self.max_published_at
+        self._new_ids.setdefault(zlib.crc32(message_id.encode()), []).append(self.count)
+        self.count += 1
+
+    def load(self):
+        """既存ファイルを開く（保存したインデックスがあれば読み込み、その後に追記された分だけ走査する）
+
+        書き込み途中で終わった末尾のレコードは切り詰める。
+        """
+        if not self._load_index():
+            self._reset_index()
+        for offset, record in self._scan(self.size):
+            self._index(offset, record.published_at, record.id)
+
+        file_size = os.path.getsize(self.path)
+        if self.size < file_size:
+            logger.warning(
+                f"✂️ Truncating torn archive record: {self.path} ({file_size - self.size} bytes)"
+            )
+            with open(self.path, "r+b") as f:
+                f.truncate(self.size)
+
+    def _load_index(self) -> bool:
+        """保存したインデックスを読み込む（なければ・使えなければ False）"""
+        try:
+            with open(self.path + INDEX_SUFFIX, "rb") as f:
+                magic, size, count, interval, max_published_at, *lengths = (
+                    INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+                )
+                if (
+                    magic != INDEX_MAGIC
+                    or interval != self.index_interval
+                    or size > os.path.getsize(self.path)
+                ):
+                    return False
+                arrays = (array("Q"), array("q"), array("q"), array("Q"))
+                for values, length in zip(arrays, lengths):
+                    values.fromfile(f, length)
+        except (OSError, EOFError, struct.error):
+            return False
+        self.block_offsets, self.block_min, self.block_max, self.id_keys = arrays
+        self.size, self.count, self.max_published_at = size, count, max_published_at
+        self._new_ids = {}
+        self._saved_count = count
+        return True
+
+    def save_index(self):
+        """インデックスをファイルに保存（前回の保存から増えていなければ何もしない）"""
+        if self.count == self._saved_count:
+            return
+        self._merge_ids()
+        path = self.path + INDEX_SUFFIX
+        try:
+            with open(path + ".tmp", "wb") as f:
+                f.write(
+                    INDEX_HEADER.pack(
+                        INDEX_MAGIC,
+                        self.size,
+                        self.count,
+                        self.index_interval,
+                        self.max_published_at,
+                        len(self.block_offsets),
+                        len(self.block_min),
+                        len(self.block_max),
+                        len(self.id_keys),
+                    )
+                )
+                for values in (
+                    self.block_offsets,
+                    self.block_min,
+                    self.block_max,
+                    self.id_keys,
+                ):
+                    values.tofile(f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            logger.warning(f"⚠️ Failed to save archive index {path}: {e}")
+            return
+        self._saved_count = self.count
+
+    def _merge_ids(self):
+        """追記分のメッセージIDを id_keys に入れて並べ直す"""
+        if not self._new_ids:
+            return
+        keys = list(self.id_keys)
+        keys.extend(
+            (id_hash << 32) | position
+            for id_hash, positions in self._new_ids.items()
+            for position in positions
+        )
+        keys.sort()
+        self.id_keys = array("Q", keys)
+        self._new_ids = {}
+
+    def append(self, published_at: int, message_id: str, payload: bytes):
+        """レコードを追記"""
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        id_bytes = message_id.encode()
+        record = (
+            RECORD_HEADER.pack(len(payload), published_at, len(id_bytes))
+            + id_bytes
+            + payload
+        )
+        self._file.write(record)
+        self._index(self.size, published_at, message_id)
+        self.size += len(record)
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.save_index()
+
+    def find(self, message_id: str) -> Optional[int]:
+        """メッセージIDのレコード番号（セグメント内）を取得"""
+        target = zlib.crc32(message_id.encode())
+        low = bisect_left(self.id_keys, target << 32)
+        high = bisect_left(self.id_keys, (target + 1) << 32, low)
+        positions = [key & 0xFFFFFFFF for key in self.id_keys[low:high]]
+        positions.extend(self._new_ids.get(target, ()))
+        # ハッシュが衝突していることがあるので本物のIDを確かめる（新しいものから）
+        for position in reversed(positions):
+            for _, record in self.read_from(position):
+                if record.id == message_id:
+                    return position
+                break
+        return None
+
+    def start_for(self, since: int) -> int:
+        """publishedAt が since 以降のメッセージを含みうる最初のレコード番号"""
+        block = bisect_left(self.block_max, since)
+        return min(block * self.index_interval, self.count)
+
+    def read_from(self, position: int) -> Iterator[Tuple[int, ArchivedMessage]]:
+        """position 番目以降のレコードを (レコード番号, レコード) で順に返す"""
+        block = position // self.index_interval
+        if block >= len(self.block_offsets):
+            return
+        index = block * self.index_interval
+        for _, record in self._scan(self.block_offsets[block]):
+            if index >= position:
+                yield index, record
+            index += 1
+
+    def read_positions(self, positions: Sequence[int]) -> List[ArchivedMessage]:
+        """指定したレコード番号（昇順）のレコードをまとめて読む"""
+        records = []
+        with self._view() as (view, file_size):
+            for position in positions:
+                block = position // self.index_interval
+                index = block * self.index_interval
+                for _, record in self._records(
+                    view, file_size, self.block_offsets[block]
+                ):
+                    if index == position:
+                        records.append(record)
+                        break
+                    index += 1
+        return records
+
+    @contextmanager
+    def _view(self):
+        """ファイル全体をメモリマップする（空なら None）"""
+        self.flush()
+        with open(self.path, "rb") as f:
+            file_size = os.fstat(f.fileno()).st_size
+            if file_size == 0:
+                yield None, 0
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                yield view, file_size
+
+    @staticmethod
+    def _records(
+        view: mmap.mmap, file_size: int, offset: int
+    ) -> Iterator[Tuple[int, ArchivedMessage]]:
+        position = offset
+        while position + RECORD_HEADER.size <= file_size:
+            length, published_at, id_length = RECORD_HEADER.unpack_from(view, position)
+            start = position + RECORD_HEADER.size
+            end = start + id_length + length
+            if end > file_size:
+                return
+            message_id = view[start : start + id_length].decode()
+            payload = view[start + id_length : end]
+            yield end, ArchivedMessage(published_at, message_id, payload)
+            position = end
+
+    def _scan(self, offset: int) -> Iterator[Tuple[int, ArchivedMessage]]:
+        """メモリマップしたファイルを offset から読む（(レコード先頭, レコード) を返す）"""
+        with self._view() as (view, file_size):
+            position = offset
+            if view is not None:
+                for end, record in self._records(view, file_size, offset):
+                    yield position, record
+                    position = end
+            self.size = max(self.size, position)
+
+
+class ChatArchive:
+    """1つの liveChatId のアーカイブ（セグメントファイルの並び）"""
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int,
+        index_interval: int,
+        recent_ids: int = 10000,
+    ):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.index_interval = index_interval
+        self.segments: List[ArchiveSegment] = []
+        # 重複保存を防ぐための直近のメッセージID
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        # 最初の検索時に読み込む転置インデックス（以降は追記時に更新、閉じる時に保存）
+        self._search_index: Optional[ChatSearchIndex] = None
+        self._search_saved = 0
+        self._recent_limit = recent_ids
+        # 使用中の操作の数（使用中のアーカイブは閉じない）
+        self.users = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @property
+    def count(self) -> int:
+        return sum(segment.count for segment in self.segments)
+
+    def _load(self):
+        names = sorted(
+            name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX)
+        )
+        for name in names:
+            self._new_segment(os.path.join(self.directory, name)).load()
+
+        # 重複保存の防止に使う直近のメッセージIDは末尾から読む
+        ids: List[str] = []
+        for segment in reversed(self.segments):
+            remaining = self._recent_limit - len(ids)
+            if remaining <= 0:
+                break
+            start = max(0, segment.count - remaining)
+            ids[:0] = [record.id for _, record in segment.read_from(start)]
+        for message_id in ids:
+            self._remember(message_id)
+
+    def _new_segment(self, path: str) -> ArchiveSegment:
+        previous_max = self.segments[-1].max_published_at if self.segments else 0
+        segment = ArchiveSegment(path, self.index_interval, previous_max)
+        self.segments.append(segment)
+        return segment
+
+    def _remember(self, message_id: str):
+        self._recent[message_id] = None
+        if len(self._recent) > self._recent_limit:
+            self._recent.popitem(last=False)
+
+    def append(self, items: List[LiveChatMessageItem]) -> int:
+        """未保存のメッセージを追記して件数を返す"""
+        with self._lock:
+            added = 0
+            for item in items:
+                if item.id in self._recent:
+                    continue
+                segment = self.segments[-1] if self.segments else None
+                if segment is None or segment.size >= self.segment_max_bytes:
+                    if segment is not None:
+                        segment.close()
+                    path = os.path.join(
+                        self.directory, f"{self.count:012d}{SEGMENT_SUFFIX}"
+                    )
+                    segment = self._new_segment(path)
+                published_at = parse_published_at(item.snippet.publishedAt)
+                if self._search_index is not None:
+                    self._search_index.add(
+                        self.count,
+                        published_at,
+                        item.snippet.displayMessage,
+                        item.authorDetails.displayName,
+                        item.snippet.authorChannelId,
+                    )
+                segment.append(published_at, item.id, item.model_dump_json().encode())
+                self._remember(item.id)
+                added += 1
+            if self.segments:
+                self.segments[-1].flush()
+            return added
+
+    def read(
+        self,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        after_id: Optional[str] = None,
+        limit: int = 200,
+    ) -> Tuple[List[ArchivedMessage], bool]:
+        """条件に合うメッセージを古い順に最大 limit 件返す（続きがあるかも返す）
+
+        after_id がアーカイブにない場合は KeyError。
+        """
+        with self._lock:
+            start_segment, start_position = 0, 0
+            if after_id is not None:
+                found = self._find(after_id)
+                if found is None:
+                    raise KeyError(after_id)
+                start_segment, start_position = found[0], found[1] + 1
+
+            results: List[ArchivedMessage] = []
+            for segment_index in range(start_segment, len(self.segments)):
+                segment = self.segments[segment_index]
+                position = start_position if segment_index == start_segment else 0
+                if since is not None:
+                    if segment.max_published_at < since:
+                        continue
+                    position = max(position, segment.start_for(since))
+
+                for index, record in segment.read_from(position):
+                    if until is not None and index % self.index_interval == 0:
+                        # ブロック内の全メッセージが until 以降ならそれ以降は読まない
+                        if segment.block_min[index // self.index_interval] >= until:
+                            return results, False
+                    if since is not None and record.published_at < since:
+                        continue
+                    if until is not None and record.published_at >= until:
+                        continue
+                    if len(results) >= limit:
+                        return results, True
+                    results.append(record)
+            return results, False
+
+    def read_chunk(self, start: int, limit: int) -> List[ArchivedMessage]:
+        """通し番号 start から最大 limit 件を順に読む（全件を順に読み出す用）"""
+        with self._lock:
+            starts = self._segment_starts()
+            records: List[ArchivedMessage] = []
+            segment_index = max(0, bisect_right(starts, start) - 1)
+            for segment, first in zip(
+                self.segments[segment_index:], starts[segment_index:]
+            ):
+                for _, record in segment.read_from(max(0, start - first)):
+                    if len(records) >= limit:
+                        return records
+                    records.append(record)
+            return records
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        author_id: Optional[str] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        after_id: Optional[str] = None,
+        limit: int = 200,
+    ) -> Tuple[List[ArchivedMessage], bool]:
+        """本文・作者名の検索語と作者IDで絞り込んだメッセージを古い順に返す
+
+        検索語は全て含むもの（AND）が対象。after_id がアーカイブにない場合は KeyError。
+        """
+        tokens, runs = parse_query(query or "")
+        with self._lock:
+            index = self._ensure_search_index()
+            start = 0
+            if after_id is not None:
+                found = self._find(after_id)
+                if found is None:
+                    raise KeyError(after_id)
+                start = self._segment_starts()[found[0]] + found[1] + 1
+
+            docs = index.candidates(tokens, author_id, since, until, start)
+            results: List[ArchivedMessage] = []
+            chunk = limit + 1
+            for i in range(0, len(docs), chunk):
+                for record in self._read_docs(docs[i : i + chunk]):
+                    if runs and not self._record_matches(record, runs):
+                        continue
+                    if len(results) >= limit:
+                        return results, True
+                    results.append(record)
+            return results, False
+
+    @staticmethod
+    def _record_matches(record: ArchivedMessage, runs: List[str]) -> bool:
+        item = LiveChatMessageItem.model_validate_json(record.payload)
+        return matches(runs, item.snippet.displayMessage, item.authorDetails.displayName)
+
+    def _ensure_search_index(self) -> ChatSearchIndex:
+        if self._search_index is None:
+            path = os.path.join(self.directory, SEARCH_INDEX_FILE)
+            index = ChatSearchIndex.load(path)
+            if index is None or len(index) > self.count:
+                index = ChatSearchIndex()
+            self._search_saved = len(index)
+            # 保存した後に追記された分だけ本文を解析して追加する
+            start = len(index)
+            for segment, first in zip(self.segments, self._segment_starts()):
+                if first + segment.count <= start:
+                    continue
+                for position, record in segment.read_from(max(0, start - first)):
+                    item = LiveChatMessageItem.model_validate_json(record.payload)
+                    index.add(
+                        first + position,
+                        record.published_at,
+                        item.snippet.displayMessage,
+                        item.authorDetails.displayName,
+                        item.snippet.authorChannelId,
+                    )
+            self._search_index = index
+            logger.info(
+                f"🔎 Search index ready: {self.directory} ({len(index)} messages, {len(index) - start} parsed)"
+            )
+        return self._search_index
+
+    def _save_search_index(self):
+        index = self._search_index
+        if index is None or len(index) == self._search_saved:
+            return
+        path = os.path.join(self.directory, SEARCH_INDEX_FILE)
+        try:
+            index.save(path)
+        except OSError as e:
+            logger.warning(f"⚠️ Failed to save search index {path}: {e}")
+            return
+        self._search_saved = len(index)
+
+    def _segment_starts(self) -> List[int]:
+        """各セグメントの先頭メッセージの通し番号"""
+        starts, total = [], 0
+        for segment in self.segments:
+            starts.append(total)
+            total += segment.count
+        return starts
+
+    def _read_docs(self, docs: List[int]) -> List[ArchivedMessage]:
+        """通し番号（昇順）のメッセージを読む"""
+        starts = self._segment_starts()
+        records: List[ArchivedMessage] = []
+        i = 0
+        while i < len(docs):
+            segment_index = bisect_right(starts, docs[i]) - 1
+            end = starts[segment_index] + self.segments[segment_index].count
+            j = bisect_left(docs, end, i)
+            positions = [doc - starts[segment_index] for doc in docs[i:j]]
+            records.extend(self.segments[segment_index].read_positions(positions))
+            i = j
+        return records
+
+    def _find(self, message_id: str) -> Optional[Tuple[int, int]]:
+        for segment_index in range(len(self.segments) - 1, -1, -1):
+            position = self.segments[segment_index].find(message_id)
+            if position is not None:
+                return segment_index, position
+        return None
+
+    def close(self):
+        """ファイルを閉じてインデックスを保存（次に開く時に全体を読み直さないため）"""
+        with self._lock:
+            for segment in self.segments:
+                segment.close()
+            self._save_search_index()
+
+
+class ChatArchiver:
+    """取得したチャットメッセージを liveChatId ごとにディスクへ保存する
+
+    ファイル操作はスレッドで実行し、イベントループを止めない。
+    動画ID → liveChatId の対応も保存し、配信終了後もAPIを使わずに履歴を引ける。
+    開いておくアーカイブは max_open 件までで、超えたら最近使っていないものから閉じる
+    （閉じる時に保存したインデックスから次に使う時に開き直す）。
+    """
+
+    def __init__(
+        self,
+        root: str,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+        index_interval: int = 64,
+        max_open: int = 64,
+    ):
+        self.root = root
+        self.segment_max_bytes = segment_max_bytes
+        self.index_interval = index_interval
+        self.max_open = max_open
+        self._archives: "OrderedDict[str, ChatArchive]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._videos = self._load_video_map()
+        # まだファイルに書いていない動画ID → liveChatId の対応（書く順番を保つ）
+        self._pending_links: List[str] = []
+        self._video_file_lock = threading.Lock()
+        logger.info(f"🗃️ Chat archive enabled: {root}")
+
+    def _chat_dir(self, live_chat_id: str) -> str:
+        if _SAFE_DIR_NAME.fullmatch(live_chat_id):
+            name = live_chat_id
+        else:
+            name = hashlib.sha1(live_chat_id.encode()).hexdigest()
+        return os.path.join(self.root, name)
+
+    def _acquire(self, live_chat_id: str, create: bool) -> Optional[ChatArchive]:
+        """アーカイブを開いて使用中にする（なければ None、create なら作成）"""
+        with self._lock:
+            archive = self._archives.get(live_chat_id)
+            if archive is None:
+                directory = self._chat_dir(live_chat_id)
+                if not create and not os.path.isdir(directory):
+                    return None
+                archive = ChatArchive(
+                    directory, self.segment_max_bytes, self.index_interval
+                )
+                self._archives[live_chat_id] = archive
+            else:
+                self._archives.move_to_end(live_chat_id)
+            archive.users += 1
+            self._evict()
+            return archive
+
+    def _release(self, archive: ChatArchive):
+        with self._lock:
+            archive.users -= 1
+            self._evict()
+
+    def _evict(self):
+        """max_open を超えた分を最近使っていないものから閉じる（使用中のものは残す）"""
+        excess = len(self._archives) - self.max_open
+        if excess <= 0:
+            return
+        idle = [
+            live_chat_id
+            for live_chat_id, archive in self._archives.items()
+            if archive.users == 0
+        ][:excess]
+        for live_chat_id in idle:
+            self._archives.pop(live_chat_id).close()
+            logger.debug(f"🗃️ Archive closed (idle): {live_chat_id}")
+
+    @asynccontextmanager
+    async def _open(
+        self, live_chat_id: str, create: bool = False
+    ) -> AsyncIterator[Optional[ChatArchive]]:
+        archive = await asyncio.to_thread(self._acquire, live_chat_id, create)
+        try:
+            yield archive
+        finally:
+            if archive is not None:
+                await asyncio.to_thread(self._release, archive)
+
+    def _load_video_map(self) -> Dict[str, str]:
+        path = os.path.join(self.root, VIDEO_MAP_FILE)
+        videos: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    video_id, _, live_chat_id = line.rstrip("\n").partition("\t")
+                    if live_chat_id:
+                        videos[video_id] = live_chat_id
+        return videos
+
+    async def link_video(self, video_id: str, live_chat_id: str):
+        """動画ID → liveChatId の対応を保存（ファイルへの書き込みはスレッドで行う）"""
+        with self._lock:
+            if self._videos.get(video_id) == live_chat_id:
+                return
+            self._videos[video_id] = live_chat_id
+            self._pending_links.append(f"{video_id}\t{live_chat_id}\n")
+        await asyncio.to_thread(self._write_video_links)
+
+    def _write_video_links(self):
+        # 取り出しと書き込みを同じロックの中で行い、追加した順にファイルへ書く
+        with self._video_file_lock:
+            with self._lock:
+                lines, self._pending_links = self._pending_links, []
+            if lines:
+                with open(
+                    os.path.join(self.root, VIDEO_MAP_FILE), "a", encoding="utf-8"
+                ) as f:
+                    f.writelines(lines)
+
+    def live_chat_id_for(self, video_id: str) -> Optional[str]:
+        """保存済みの動画IDの liveChatId"""
+        return self._videos.get(video_id)
+
+    def has_archive(self, live_chat_id: str) -> bool:
+        return os.path.isdir(self._chat_dir(live_chat_id))
+
+    async def append(self, live_chat_id: str, items: List[LiveChatMessageItem]) -> int:
+        """メッセージを保存（保存済みのものは無視）"""
+        if not items:
+            return 0
+        async with self._open(live_chat_id, create=True) as archive:
+            added = await asyncio.to_thread(archive.append, items)
+        if added:
+            logger.debug(f"🗃️ Archived {added} messages (chat: {live_chat_id})")
+        return added
+
+    async def read(
+        self,
+        live_chat_id: str,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        after_id: Optional[str] = None,
+        limit: int = 200,
+    ) -> Optional[Tuple[List[ArchivedMessage], bool]]:
+        """保存済みのメッセージを読む（アーカイブがなければ None）"""
+        async with self._open(live_chat_id) as archive:
+            if archive is None:
+                return None
+            return await asyncio.to_thread(archive.read, since, until, after_id, limit)
+
+    async def read_chunk(
+        self, live_chat_id: str, start: int, limit: int
+    ) -> List[ArchivedMessage]:
+        """保存済みのメッセージを通し番号 start から最大 limit 件読む"""
+        async with self._open(live_chat_id) as archive:
+            if archive is None:
+                return []
+            return await asyncio.to_thread(archive.read_chunk, start, limit)
+
+    async def search(
+        self,
+        live_chat_id: str,
+        query: Optional[str] = None,
+        author_id: Optional[str] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        after_id: Optional[str] = None,
+        limit: int = 200,
+    ) -> Optional[Tuple[List[ArchivedMessage], bool]]:
+        """保存済みのメッセージを検索（アーカイブがなければ None）"""
+        async with self._open(live_chat_id) as archive:
+            if archive is None:
+                return None
+            return await asyncio.to_thread(
+                archive.search, query, author_id, since, until, after_id, limit
+            )
+
+    def close(self):
+        """開いているアーカイブをすべて閉じる（シャットダウン時）"""
+        with self._lock:
+            for archive in self._archives.values():
+                archive.close()
+            self._archives.clear()
@@ -0,0 +1,175 @@
+import asyncio
+import csv
+import io
+from typing import AsyncIterator, List, Optional, Union
+from pydantic import BaseModel
+from app.models.youtube import LiveChatMessageItem
+from app.services.archive import ArchivedMessage, ChatArchiver
+from app.services.message_filter import MessageFilter
+from app.services.youtube import YouTubeService, is_chat_ended_error
+from app.utils.exceptions import PollTooEarlyError
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+# CSV の既定の列
+DEFAULT_CSV_FIELDS = [
+    "id",
+    "snippet.publishedAt",
+    "snippet.type",
+    "snippet.authorChannelId",
+    "authorDetails.displayName",
+    "snippet.displayMessage",
+]
+
+Record = Union[LiveChatMessageItem, ArchivedMessage]
+
+
+async def iter_archive(
+    archiver: ChatArchiver, live_chat_id: str, chunk_size: int
+) -> AsyncIterator[List[ArchivedMessage]]:
+    """アーカイブのメッセージを chunk_size 件ずつ古い順に返す"""
+    start = 0
+    while True:
+        records = await archiver.read_chunk(live_chat_id, start, chunk_size)
+        if not records:
+            return
+        yield records
+        start += len(records)
+
+
+async def iter_upstream(
+    service: YouTubeService, live_chat_id: str
+) -> AsyncIterator[List[LiveChatMessageItem]]:
+    """nextPageToken をたどってページごとのメッセージを返す
+
+    新着がないページ（最新に追いついた）かチャット終了で止まる。
+    pollingIntervalMillis より早い場合は指定された時間だけ待つ。
+    """
+    page_token: Optional[str] = None
+    while True:
+        try:
+            page = await service.get_chat_messages(live_chat_id, page_token)
+        except PollTooEarlyError as e:
+            await asyncio.sleep(e.retry_after)
+            continue
+        except Exception as e:
+            if is_chat_ended_error(e):
+                logger.info(f"🏁 Export reached end of chat: {live_chat_id}")
+                return
+            raise
+
+        if page.items:
+            yield page.items
+        if not page.items or not page.nextPageToken or page.nextPageToken == page_token:
+            return
+        page_token = page.nextPageToken
+
+
+def _to_item(record: Record) -> LiveChatMessageItem:
+    if isinstance(record, ArchivedMessage):
+        return LiveChatMessageItem.model_validate_json(record.payload)
+    return record
+
+
+def _field_value(item: LiveChatMessageItem, path: str) -> str:
+    value = item
+    for name in path.split("."):
+        value = getattr(value, name)
+    if isinstance(value, BaseModel):
+        return value.model_dump_json()
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return "" if value is None else str(value)
+
+
+class ChatExporter:
+    """メッセージのチャンクを NDJSON / CSV の文字列に変換する
+
+    チャンクごとに変換して返すため、チャットの長さによらずメモリ使用量は一定。
+    """
+
+    def __init__(self, format: str, message_filter: MessageFilter):
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"unsupported export format: {format}")
+        self.format = format
+        self.message_filter = message_filter
+        self.columns = message_filter.fields or DEFAULT_CSV_FIELDS
+        self.count = 0
+
+    @property
+    def media_type(self) -> str:
+        return EXPORT_MEDIA_TYPES[self.format]
+
+    def header(self) -> str:
+        if self.format == "csv":
+            # Excel で文字化けしないように BOM を付ける
+            return "\ufeff" + self._csv_rows([self.columns])
+        return ""
+
+    def encode(self, records: List[Record]) -> str:
+        message_filter = self.message_filter
+        if self.format == "ndjson" and not message_filter.active:
+            # アーカイブの本文はそのまま1行にする
+            lines = [
+                record.payload.decode()
+                if isinstance(record, ArchivedMessage)
+                else record.model_dump_json()
+                for record in records
+            ]
+        else:
+            items = [_to_item(record) for record in records]
+            items = [item for item in items if message_filter.matches(item)]
+            if self.format == "csv":
+                self.count += len(items)
+                return self._csv_rows(
+                    [_field_value(item, path) for path in self.columns]
+                    for item in items
+                )
+            lines = [message_filter.dump_item(item) for item in items]
+
+        self.count += len(lines)
+        return "".join(line + "\n" for line in lines)
+
+    @staticmethod
+    def _csv_rows(rows) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\r\n").writerows(rows)
+        return buffer.getvalue()
+
+
+async def export_chat(
+    service: YouTubeService,
+    live_chat_id: str,
+    exporter: ChatExporter,
+    chunk_size: int = 1000,
+) -> AsyncIterator[str]:
+    """チャット全体をエクスポート（アーカイブがあればAPIを使わない）"""
+    archiver = service.archiver
+    if archiver is not None and archiver.has_archive(live_chat_id):
+        source = "archive"
+        chunks = iter_archive(archiver, live_chat_id, chunk_size)
+    else:
+        source = "api"
+        chunks = iter_upstream(service, live_chat_id)
+
+    logger.info(f"📤 Export started - chat: {live_chat_id}, source: {source}")
+    header = exporter.header()
+    if header:
+        yield header
+    try:
+        async for records in chunks:
+            text = exporter.encode(records)
+            if text:
+                yield text
+    except Exception as e:
+        logger.error(f"💥 Export failed - chat: {live_chat_id}, error: {e}")
+        raise
+    logger.info(
+        f"✅ Export finished - chat: {live_chat_id}, messages: {exporter.count}"
+    )
@@ -0,0 +1,186 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from app.utils.exceptions import QuotaExceededError
+import logging
+
+logger = logging.getLogger(__name__)
+
+# エンドポイントごとの推定クォータ消費量（YouTube Data API v3 のコスト表）
+QUOTA_COSTS: Dict[str, int] = {
+    "videos": 1,
+    "liveChat/messages": 5,
+}
+DEFAULT_QUOTA_COST = 1
+
+
+def quota_cost(endpoint: str) -> int:
+    """エンドポイントの推定クォータ消費量"""
+    return QUOTA_COSTS.get(endpoint, DEFAULT_QUOTA_COST)
+
+
+def mask_key(key: str) -> str:
+    """ログ・統計用に伏せたAPIキー"""
+    return f"{key[:4]}…{key[-4:]}" if len(key) > 8 else "…"
+
+
+def quota_timezone(name: str) -> tzinfo:
+    """クォータがリセットされるタイムゾーン"""
+    try:
+        return ZoneInfo(name)
+    except ZoneInfoNotFoundError:
+        # タイムゾーンデータがない環境では太平洋標準時の固定オフセットで代用
+        logger.warning(f"⚠️ Time zone {name} not found, using UTC-8")
+        return timezone(timedelta(hours=-8))
+
+
+def next_quota_reset(now: float, tz: tzinfo) -> float:
+    """now の次のクォータリセット時刻（tz の0時、UNIX時刻）"""
+    local = datetime.fromtimestamp(now, tz)
+    midnight = datetime.combine(local.date() + timedelta(days=1), datetime.min.time(), tz)
+    return midnight.timestamp()
+
+
+class ApiKeyState:
+    """1つのAPIキーの当日のクォータ消費状況"""
+
+    def __init__(self, key: str, daily_quota: int):
+        self.key = key
+        self.daily_quota = daily_quota
+        self.used = 0
+        self.requests = 0
+        # クォータ超過で休止中なら再開時刻（UNIX時刻）
+        self.benched_until: Optional[float] = None
+
+    @property
+    def label(self) -> str:
+        return mask_key(self.key)
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.daily_quota - self.used)
+
+    @property
+    def usage_ratio(self) -> float:
+        return self.used / self.daily_quota if self.daily_quota > 0 else 1.0
+
+
+class ApiKeyPool:
+    """複数のAPIキーをクォータ消費量に応じて使い分けるプール
+
+    1日のクォータに対する消費率が最も低いキーを選ぶため、クォータの大きいキーほど多く使われる。
+    クォータ超過になったキーは次のリセット（太平洋時間の0時）まで休止させる。
+    """
+
+    def __init__(
+        self,
+        keys: List[str],
+        daily_quota: int = 10000,
+        reset_timezone: str = "America/Los_Angeles",
+        clock: Callable[[], float] = time.time,
+    ):
+        if not keys:
+            raise ValueError("at least one API key is required")
+        self._clock = clock
+        self._tz = quota_timezone(reset_timezone)
+        self._lock = threading.Lock()
+        self.keys: List[ApiKeyState] = []
+        for spec in keys:
+            key, _, quota = spec.partition(":")
+            self.keys.append(ApiKeyState(key, int(quota) if quota else daily_quota))
+        self._period_end = next_quota_reset(clock(), self._tz)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def total_quota(self) -> int:
+        """全キーの1日のクォータの合計"""
+        return sum(state.daily_quota for state in self.keys)
+
+    @property
+    def available(self) -> int:
+        """休止中でないキーの残りクォータの合計"""
+        with self._lock:
+            self._maybe_reset()
+            now = self._clock()
+            return sum(
+                state.remaining
+                for state in self.keys
+                if state.benched_until is None or state.benched_until <= now
+            )
+
+    def seconds_until_reset(self) -> float:
+        return max(0.0, self._period_end - self._clock())
+
+    def _maybe_reset(self):
+        now = self._clock()
+        if now < self._period_end:
+            return
+        for state in self.keys:
+            state.used = 0
+            state.benched_until = None
+        self._period_end = next_quota_reset(now, self._tz)
+        logger.info("🔄 API key quota reset")
+
+    def acquire(self, cost: int) -> ApiKeyState:
+        """消費率が最も低い使用可能なキーを選び、cost を計上する"""
+        state = self.select(cost)
+        self.charge(state, cost)
+        return state
+
+    def select(self, cost: int) -> ApiKeyState:
+        """消費率が最も低い使用可能なキーを選ぶ（計上はしない）
+
+        レート制限などで送らずに終わる呼び出しがあるため、計上は実際に送る直前に charge で行う。
+        全キーが休止中か残りが足りなければ QuotaExceededError。
+        """
+        with self._lock:
+            self._maybe_reset()
+            now = self._clock()
+            candidates = [
+                state
+                for state in self.keys
+                if (state.benched_until is None or state.benched_until <= now)
+                and state.remaining >= cost
+            ]
+            if not candidates:
+                raise QuotaExceededError(retry_after=self.seconds_until_reset())
+
+            return min(candidates, key=lambda s: s.usage_ratio)
+
+    def charge(self, state: ApiKeyState, cost: int):
+        """キーに cost を計上する"""
+        with self._lock:
+            self._maybe_reset()
+            state.used += cost
+            state.requests += 1
+
+    def bench(self, state: ApiKeyState):
+        """クォータ超過のキーを次のリセットまで休止させる"""
+        with self._lock:
+            state.benched_until = self._period_end
+            state.used = max(state.used, state.daily_quota)
+        logger.warning(
+            f"🪫 API key {state.label} exhausted, benched for {self.seconds_until_reset():.0f}s"
+        )
+
+    def stats(self) -> List[Dict]:
+        """キーごとの消費状況（キーは伏せる）"""
+        with self._lock:
+            self._maybe_reset()
+            now = self._clock()
+            return [
+                {
+                    "key": state.label,
+                    "used": state.used,
+                    "remaining": state.remaining,
+                    "daily_quota": state.daily_quota,
+                    "requests": state.requests,
+                    "benched": state.benched_until is not None
+                    and state.benched_until > now,
+                }
+                for state in self.keys
+            ]
@@ -0,0 +1,145 @@
+import zlib
+from typing import Dict, Iterable, List, Optional, Set, Type
+from pydantic import BaseModel
+from app.models.youtube import LiveChatMessageItem, LiveChatMessageListResponse
+from app.services.search import normalize
+
+
+def _field_paths(model: Type[BaseModel]) -> Set[str]:
+    """モデルのフィールドのパス（1階層下まで、例: snippet.displayMessage）"""
+    paths = set()
+    for name, info in model.model_fields.items():
+        paths.add(name)
+        annotation = info.annotation
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            paths.update(f"{name}.{child}" for child in annotation.model_fields)
+    return paths
+
+
+MESSAGE_FIELD_PATHS = frozenset(_field_paths(LiveChatMessageItem))
+
+
+def split_param(value: Optional[str]) -> Optional[List[str]]:
+    """カンマ区切りのクエリパラメータをリストに（空なら None）"""
+    if value is None:
+        return None
+    items = [part.strip() for part in value.split(",") if part.strip()]
+    return items or None
+
+
+class MessageFilter:
+    """チャットメッセージの絞り込み（type・作者・キーワード）とフィールドの射影
+
+    絞り込みは直列化の前にモデルに対して行い、射影は pydantic の include で直列化時に行う。
+    """
+
+    def __init__(
+        self,
+        fields: Optional[Iterable[str]] = None,
+        types: Optional[Iterable[str]] = None,
+        author_ids: Optional[Iterable[str]] = None,
+        keyword: Optional[str] = None,
+    ):
+        self.fields = sorted(set(fields)) if fields else None
+        self.types = frozenset(types) if types else None
+        self.author_ids = frozenset(author_ids) if author_ids else None
+        self.keyword = normalize(keyword.strip()) if keyword and keyword.strip() else None
+
+        if self.fields is not None:
+            unknown = [path for path in self.fields if path not in MESSAGE_FIELD_PATHS]
+            if unknown:
+                raise ValueError(
+                    f"unknown fields: {', '.join(unknown)} "
+                    f"(available: {', '.join(sorted(MESSAGE_FIELD_PATHS))})"
+                )
+        self.item_include = self._build_include(self.fields)
+
+    @classmethod
+    def from_query(
+        cls,
+        fields: Optional[str] = None,
+        type: Optional[str] = None,
+        author_id: Optional[str] = None,
+        q: Optional[str] = None,
+    ) -> "MessageFilter":
+        """カンマ区切りのクエリパラメータから作成"""
+        return cls(split_param(fields), split_param(type), split_param(author_id), q)
+
+    @staticmethod
+    def _build_include(fields: Optional[List[str]]) -> Optional[Dict]:
+        if fields is None:
+            return None
+        include: Dict = {}
+        for path in fields:
+            parent, _, child = path.partition(".")
+            if not child:
+                include[parent] = True
+            elif include.get(parent) is not True:
+                include.setdefault(parent, {})[child] = True
+        return include
+
+    @property
+    def filters_items(self) -> bool:
+        return bool(self.types or self.author_ids or self.keyword)
+
+    @property
+    def active(self) -> bool:
+        return self.filters_items or self.fields is not None
+
+    @property
+    def cache_key(self) -> str:
+        """レスポンスの形を区別するキー（ETag に使う）"""
+        return "|".join(
+            (
+                ",".join(self.fields or ()),
+                ",".join(sorted(self.types or ())),
+                ",".join(sorted(self.author_ids or ())),
+                self.keyword or "",
+            )
+        )
+
+    def etag(self, etag: str) -> str:
+        """元のETagに絞り込み条件を反映したETag"""
+        if not self.active:
+            return etag
+        return f"{etag}-{zlib.crc32(self.cache_key.encode()):08x}"
+
+    def matches(self, item: LiveChatMessageItem) -> bool:
+        if self.types is not None and item.snippet.type not in self.types:
+            return False
+        if self.author_ids is not None and item.snippet.authorChannelId not in self.author_ids:
+            return False
+        if self.keyword is not None and self.keyword not in normalize(
+            item.snippet.displayMessage
+        ):
+            return False
+        return True
+
+    def filter_items(self, items: List[LiveChatMessageItem]) -> List[LiveChatMessageItem]:
+        if not self.filters_items:
+            return items
+        return [item for item in items if self.matches(item)]
+
+    def apply_page(
+        self, page: LiveChatMessageListResponse
+    ) -> LiveChatMessageListResponse:
+        """絞り込んだページ（共有されているモデルは変更せずコピーする）"""
+        if not self.filters_items:
+            return page
+        return page.model_copy(update={"items": self.filter_items(page.items)})
+
+    @property
+    def page_include(self) -> Optional[Dict]:
+        """ページを直列化する時の include（ページ送りに必要なフィールドは常に含める）"""
+        if self.item_include is None:
+            return None
+        include: Dict = {
+            name: True
+            for name in LiveChatMessageListResponse.model_fields
+            if name != "items"
+        }
+        include["items"] = {"__all__": self.item_include}
+        return include
+
+    def dump_item(self, item: LiveChatMessageItem) -> str:
+        return item.model_dump_json(include=self.item_include)
@@ -0,0 +1,41 @@
+import time
+from typing import Callable, Optional
+from app.utils.cache import TTLCache, MISSING
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ChatPollScheduler:
+    """(liveChatId, pageToken) ごとに最終ポーリング時刻と pollingIntervalMillis を管理
+
+    YouTube が指定する間隔より早く同じページを取り直すポーリングを検出し、クォータの無駄遣いを防ぐ。
+    まだ取得していないページ（他のクライアントが進めた nextPageToken など）は抑止しない。
+    """
+
+    def __init__(
+        self,
+        max_chats: int = 4096,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._clock = clock
+        # (liveChatId, pageToken) → 次にポーリングしてよい時刻（しばらく使われないものは自然に消える）
+        self._next_poll_at = TTLCache(max_size=max_chats, ttl=3600, clock=clock)
+
+    def wait_time(self, live_chat_id: str, page_token: Optional[str] = None) -> float:
+        """このページを次にポーリングできるまでの秒数（今すぐ可能なら0）"""
+        next_poll_at = self._next_poll_at.get((live_chat_id, page_token or ""))
+        if next_poll_at is MISSING:
+            return 0.0
+        return max(0.0, next_poll_at - self._clock())
+
+    def record_poll(
+        self,
+        live_chat_id: str,
+        page_token: Optional[str],
+        polling_interval_millis: int,
+    ):
+        """ポーリング結果を記録"""
+        interval = max(0, polling_interval_millis) / 1000
+        self._next_poll_at.set((live_chat_id, page_token or ""), self._clock() + interval)
+        logger.debug(f"🗓️ Next poll for {live_chat_id} ({page_token}) in {interval:.2f}s")
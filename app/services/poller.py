@@ -0,0 +1,370 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from app.models.youtube import LiveChatMessageItem
+from app.models.compact import CompactMessage, CompactMessageCodec
+from app.config import (
+    POLLER_BUFFER_SIZE,
+    POLLER_MIN_INTERVAL,
+    POLLER_ERROR_BACKOFF,
+    POLLER_IDLE_GRACE,
+)
+from app.services.youtube import (
+    YouTubeService,
+    youtube_service,
+    is_chat_ended_error,
+)
+from app.utils.deadline import clear_deadline
+from app.utils.exceptions import PollTooEarlyError
+from app.utils.request_context import DEFAULT_PRIORITY, client_id_var, priority_var
+from app.utils.tracing import clear_current_span
+import logging
+
+logger = logging.getLogger(__name__)
+
+POLLER_CLIENT_ID = "poller"
+# ポーリングは購読者全員のための処理なので、開始したリクエストの優先度にはしない
+POLLER_PRIORITY = DEFAULT_PRIORITY
+
+
+class MessageRingBuffer:
+    """連番付きの固定長リングバッファ
+
+    メッセージには1から始まる連番（seq）を振り、容量を超えると古いものから上書きする。
+    メッセージは CompactMessage で保持し、読み出し時に公開モデルへ戻す。
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.codec = CompactMessageCodec()
+        self._slots: List[Optional[CompactMessage]] = [None] * capacity
+        self._ids: Dict[str, int] = {}
+        self.last_seq = 0
+
+    @property
+    def first_seq(self) -> int:
+        """バッファに残っている最古の連番（空なら last_seq + 1）"""
+        return max(1, self.last_seq - self.capacity + 1)
+
+    def __len__(self) -> int:
+        return self.last_seq - self.first_seq + 1
+
+    def __contains__(self, message_id: str) -> bool:
+        return message_id in self._ids
+
+    def append(self, item: LiveChatMessageItem) -> int:
+        """メッセージを追加して連番を返す"""
+        self.last_seq += 1
+        slot = self.last_seq % self.capacity
+        overwritten = self._slots[slot]
+        if overwritten is not None:
+            self._ids.pop(overwritten.id, None)
+        self._slots[slot] = self.codec.pack(item)
+        self._ids[item.id] = self.last_seq
+        return self.last_seq
+
+    def seq_of(self, message_id: str) -> Optional[int]:
+        """メッセージIDの連番を取得（バッファにない場合は None）"""
+        return self._ids.get(message_id)
+
+    def read_after(
+        self, seq: int, limit: Optional[int] = None
+    ) -> Tuple[List[Tuple[int, LiveChatMessageItem]], int]:
+        """指定した連番より後のメッセージと、上書きで取りこぼした件数を返す"""
+        start = seq + 1
+        dropped = 0
+        if start < self.first_seq:
+            dropped = self.first_seq - start
+            start = self.first_seq
+
+        end = self.last_seq
+        if limit is not None:
+            end = min(end, start + limit - 1)
+
+        unpack = self.codec.unpack
+        slots = self._slots
+        items = [
+            (s, unpack(slots[s % self.capacity])) for s in range(start, end + 1)
+        ]
+        return items, dropped
+
+
+class Subscription:
+    """ポーラーの購読者（自分の読み取り位置を持つ）"""
+
+    def __init__(self, poller: "LiveChatPoller", cursor: int):
+        self.poller = poller
+        self.cursor = cursor
+        self.dropped = 0
+        self.closed = False
+
+    @property
+    def live_chat_id(self) -> str:
+        return self.poller.live_chat_id
+
+    @property
+    def ended(self) -> bool:
+        """チャット終了または購読解除済みで、未読もない"""
+        return (self.closed or self.poller.ended) and (
+            self.cursor >= self.poller.buffer.last_seq
+        )
+
+    async def get(
+        self, timeout: Optional[float] = None, limit: Optional[int] = None
+    ) -> List[Tuple[int, LiveChatMessageItem]]:
+        """新着メッセージを待って取得（タイムアウト時は空リスト）
+
+        遅い購読者は他の購読者を待たせず、上書きされた分は dropped に加算して読み飛ばす。
+        """
+        poller = self.poller
+        condition = poller.condition
+        async with condition:
+            try:
+                await asyncio.wait_for(
+                    condition.wait_for(
+                        lambda: self.closed
+                        or poller.ended
+                        or poller.buffer.last_seq > self.cursor
+                    ),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                return []
+
+        items, dropped = poller.buffer.read_after(self.cursor, limit)
+        if dropped:
+            self.dropped += dropped
+            logger.warning(
+                f"🐢 Slow subscriber skipped {dropped} messages (chat: {self.live_chat_id})"
+            )
+        if items:
+            self.cursor = items[-1][0]
+        return items
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> List[Tuple[int, LiveChatMessageItem]]:
+        while True:
+            if self.ended:
+                raise StopAsyncIteration
+            items = await self.get()
+            if items:
+                return items
+
+
+class LiveChatPoller:
+    """1つの liveChatId をポーリングしてリングバッファに蓄積する"""
+
+    def __init__(
+        self,
+        live_chat_id: str,
+        service: YouTubeService,
+        buffer_size: int = POLLER_BUFFER_SIZE,
+    ):
+        self.live_chat_id = live_chat_id
+        self.service = service
+        self.buffer = MessageRingBuffer(buffer_size)
+        self.condition = asyncio.Condition()
+        self.subscribers = 0
+        self.page_token: Optional[str] = None
+        self.polling_interval = POLLER_MIN_INTERVAL
+        self.ended = False
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """ポーリングループを開始"""
+        if not self.running:
+            self._task = asyncio.create_task(
+                self._run(), name=f"livechat-poller-{self.live_chat_id}"
+            )
+            logger.info(f"▶️ Poller started: {self.live_chat_id}")
+
+    async def stop(self):
+        """ポーリングループを停止"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info(f"⏹️ Poller stopped: {self.live_chat_id}")
+        await self._notify()
+
+    async def _notify(self):
+        async with self.condition:
+            self.condition.notify_all()
+
+    async def poll_once(self) -> int:
+        """1回ポーリングして新着件数を返す"""
+        response = await self.service.get_chat_messages(
+            self.live_chat_id, self.page_token
+        )
+
+        added = 0
+        for item in response.items:
+            if item.id not in self.buffer:
+                self.buffer.append(item)
+                added += 1
+
+        if response.nextPageToken:
+            self.page_token = response.nextPageToken
+        self.polling_interval = max(
+            response.pollingIntervalMillis / 1000, POLLER_MIN_INTERVAL
+        )
+        self.last_error = None
+
+        if added:
+            await self._notify()
+        return added
+
+    async def _run(self):
+        # ポーラーのクォータ消費は購読者ではなくポーラーに計上する
+        client_id_var.set(POLLER_CLIENT_ID)
+        priority_var.set(POLLER_PRIORITY)
+        # 開始したリクエストの期限は引き継がない
+        clear_deadline()
+        # 開始したリクエストのトレースにもつなげない（ポーリング1回ごとに別のトレースにする）
+        clear_current_span()
+        while True:
+            try:
+                added = await self.poll_once()
+                logger.debug(
+                    f"🔁 Polled {self.live_chat_id}: {added} new, next in {self.polling_interval:.1f}s"
+                )
+                await asyncio.sleep(self.polling_interval)
+            except asyncio.CancelledError:
+                raise
+            except PollTooEarlyError as e:
+                # 他のクライアントが直前にポーリングした（次の時刻まで待つ）
+                await asyncio.sleep(e.retry_after)
+            except Exception as e:
+                self.last_error = str(e)
+                if is_chat_ended_error(e):
+                    logger.info(f"🏁 Live chat ended: {self.live_chat_id}")
+                    self.ended = True
+                    await self._notify()
+                    return
+                logger.error(f"💥 Poller error ({self.live_chat_id}): {e}")
+                await asyncio.sleep(max(self.polling_interval, POLLER_ERROR_BACKOFF))
+
+
+class LiveChatPollerManager:
+    """liveChatId ごとのポーラーと購読者を管理する
+
+    最初の購読者でポーリングを開始し、最後の購読者が抜けてから idle_grace 秒たったら停止する。
+    その間はポーリングを続けるので、切断した購読者が Last-Event-ID で再接続すれば続きから読める。
+    """
+
+    def __init__(
+        self,
+        service: YouTubeService,
+        buffer_size: int = POLLER_BUFFER_SIZE,
+        idle_grace: float = POLLER_IDLE_GRACE,
+    ):
+        self.service = service
+        self.buffer_size = buffer_size
+        self.idle_grace = idle_grace
+        self.pollers: Dict[str, LiveChatPoller] = {}
+        # 購読者がいなくなったポーラーの停止待ち
+        self._idle_stops: Dict[str, asyncio.Task] = {}
+
+    def subscribe(
+        self, live_chat_id: str, last_message_id: Optional[str] = None
+    ) -> Subscription:
+        """購読を開始（last_message_id 指定時はその次のメッセージから）"""
+        idle_stop = self._idle_stops.pop(live_chat_id, None)
+        if idle_stop is not None:
+            idle_stop.cancel()
+
+        poller = self.pollers.get(live_chat_id)
+        if poller is None or poller.ended:
+            poller = LiveChatPoller(live_chat_id, self.service, self.buffer_size)
+            self.pollers[live_chat_id] = poller
+
+        cursor = poller.buffer.last_seq
+        if last_message_id:
+            seq = poller.buffer.seq_of(last_message_id)
+            if seq is not None:
+                cursor = seq
+
+        poller.subscribers += 1
+        poller.start()
+        logger.debug(
+            f"➕ Subscribed to {live_chat_id} ({poller.subscribers} subscribers)"
+        )
+        return Subscription(poller, cursor)
+
+    async def unsubscribe(self, subscription: Subscription):
+        """購読を解除（最後の購読者なら idle_grace 秒後にポーラーを停止）"""
+        if subscription.closed:
+            return
+        subscription.closed = True
+
+        poller = subscription.poller
+        poller.subscribers -= 1
+        logger.debug(
+            f"➖ Unsubscribed from {poller.live_chat_id} ({poller.subscribers} subscribers)"
+        )
+        if poller.subscribers > 0:
+            await poller._notify()
+        elif (
+            poller.ended
+            or self.idle_grace <= 0
+            or self.pollers.get(poller.live_chat_id) is not poller
+        ):
+            await self._remove(poller)
+        else:
+            self._idle_stops[poller.live_chat_id] = asyncio.create_task(
+                self._stop_when_idle(poller)
+            )
+            # 解除した購読の待機を起こす
+            await poller._notify()
+
+    async def _stop_when_idle(self, poller: LiveChatPoller):
+        await asyncio.sleep(self.idle_grace)
+        if self._idle_stops.get(poller.live_chat_id) is asyncio.current_task():
+            del self._idle_stops[poller.live_chat_id]
+        if poller.subscribers <= 0:
+            logger.debug(f"💤 No subscribers for {self.idle_grace}s: {poller.live_chat_id}")
+            await self._remove(poller)
+
+    async def _remove(self, poller: LiveChatPoller):
+        if self.pollers.get(poller.live_chat_id) is poller:
+            del self.pollers[poller.live_chat_id]
+        await poller.stop()
+
+    async def shutdown(self):
+        """全ポーラーを停止"""
+        for idle_stop in self._idle_stops.values():
+            idle_stop.cancel()
+        self._idle_stops.clear()
+        pollers = list(self.pollers.values())
+        self.pollers.clear()
+        for poller in pollers:
+            await poller.stop()
+
+    def stats(self) -> Dict[str, Dict]:
+        """ポーラーごとの状態"""
+        return {
+            chat_id: {
+                "subscribers": poller.subscribers,
+                "buffered": len(poller.buffer),
+                "last_seq": poller.buffer.last_seq,
+                "polling_interval": poller.polling_interval,
+                "ended": poller.ended,
+                "last_error": poller.last_error,
+            }
+            for chat_id, poller in self.pollers.items()
+        }
+
+
+# ポーラー管理のシングルトンインスタンス
+poller_manager = LiveChatPollerManager(youtube_service)
@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional, Sequence
+from app.services.key_pool import next_quota_reset, quota_timezone
+from app.utils.exceptions import QuotaBudgetExceededError
+from app.utils.request_context import mask_client_id
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 優先度ごとに残しておくクォータの割合（残りがこれを下回ると断る）
+DEFAULT_PRIORITY_RESERVES: Dict[str, float] = {
+    "low": 0.3,
+    "normal": 0.0,
+    "high": 0.0,
+}
+# 消費ペースからの予測を出すのに必要な経過時間（秒）
+MIN_PROJECTION_ELAPSED = 300
+# liveChatId → videoId の対応の最大保持数
+MAX_VIDEO_LINKS = 10000
+# 動画・クライアントごとの集計の最大保持数（最近計上していないものから捨てる）
+MAX_TRACKED_VIDEOS = 10000
+MAX_TRACKED_CLIENTS = 10000
+
+
+def _isoformat(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def _add(counts: Dict, key: str, amount: float, limit: int):
+    """counts[key] に加算（limit 件を超えたら最近計上していないものを捨てる）"""
+    counts[key] = counts.pop(key, 0) + amount
+    if len(counts) > limit:
+        del counts[next(iter(counts))]
+
+
+class QuotaLedger:
+    """YouTube APIのクォータ消費量をエンドポイント・動画・クライアントごとに集計する
+
+    集計は1日の区切り（太平洋時間の0時）でリセットし、当日の消費ペースから
+    リセット時点の消費量を予測する。クライアントごとの予算と、優先度ごとの
+    残量の下限を超える呼び出しは QuotaBudgetExceededError で断る。
+    """
+
+    def __init__(
+        self,
+        daily_limit: int,
+        client_budget: int = 0,
+        reserves: Optional[Dict[str, float]] = None,
+        reset_timezone: str = "America/Los_Angeles",
+        clock: Callable[[], float] = time.time,
+    ):
+        self.daily_limit = daily_limit
+        # クライアントごとの1日の予算（0なら無制限）
+        self.client_budget = client_budget
+        self.reserves = {**DEFAULT_PRIORITY_RESERVES, **(reserves or {})}
+        self._clock = clock
+        self._tz = quota_timezone(reset_timezone)
+        self._lock = threading.Lock()
+        self._video_links: Dict[str, str] = {}
+        self._start_period(clock())
+
+    def _start_period(self, now: float):
+        self._period_end = next_quota_reset(now, self._tz)
+        local = datetime.fromtimestamp(now, self._tz)
+        self._period_start = datetime.combine(
+            local.date(), datetime.min.time(), self._tz
+        ).timestamp()
+        self.used = 0
+        self.requests = 0
+        self.refused = 0
+        self.by_endpoint: Dict[str, int] = defaultdict(int)
+        self.by_video: Dict[str, float] = {}
+        self.by_client: Dict[str, int] = {}
+
+    def _maybe_reset(self):
+        now = self._clock()
+        if now >= self._period_end:
+            logger.info(f"🔄 Quota ledger reset - used yesterday: {self.used}")
+            self._start_period(now)
+
+    def seconds_until_reset(self) -> float:
+        return max(0.0, self._period_end - self._clock())
+
+    def link(self, live_chat_id: str, video_id: str):
+        """liveChatId の消費量を動画に計上できるように対応を記録"""
+        with self._lock:
+            self._video_links.pop(live_chat_id, None)
+            self._video_links[live_chat_id] = video_id
+            if len(self._video_links) > MAX_VIDEO_LINKS:
+                del self._video_links[next(iter(self._video_links))]
+
+    def check(self, cost: int, client_id: str, priority: str, available: int):
+        """cost ユニットを使ってよいか判定（だめなら QuotaBudgetExceededError）
+
+        available は今使えるクォータの残り（休止中のキーを除く）。
+        """
+        with self._lock:
+            self._maybe_reset()
+            reason = None
+            reserve = self.reserves.get(priority, 0.0) * self.daily_limit
+            if available - cost < reserve:
+                reason = f"{priority} priority"
+            elif (
+                self.client_budget
+                and self.by_client.get(client_id, 0) + cost > self.client_budget
+            ):
+                reason = "client budget"
+            if reason is None:
+                return
+            self.refused += 1
+
+        logger.warning(
+            f"🚧 Quota budget refused - client: {client_id}, reason: {reason}, available: {available}"
+        )
+        raise QuotaBudgetExceededError(reason, retry_after=self.seconds_until_reset())
+
+    def record(
+        self,
+        endpoint: str,
+        cost: int,
+        client_id: str,
+        subjects: Sequence[str] = (),
+    ):
+        """1回の呼び出しの消費量を計上（subjects は動画IDか liveChatId、消費量は等分する）"""
+        with self._lock:
+            self._maybe_reset()
+            self.used += cost
+            self.requests += 1
+            self.by_endpoint[endpoint] += cost
+            _add(self.by_client, client_id, cost, MAX_TRACKED_CLIENTS)
+            for subject in subjects:
+                video_id = self._video_links.get(subject, subject)
+                _add(self.by_video, video_id, cost / len(subjects), MAX_TRACKED_VIDEOS)
+
+    def projected(self) -> int:
+        """当日の消費ペースが続いた場合のリセット時点の消費量"""
+        now = self._clock()
+        elapsed = now - self._period_start
+        if elapsed < MIN_PROJECTION_ELAPSED:
+            return self.used
+        rate = self.used / elapsed
+        return round(self.used + rate * max(0.0, self._period_end - now))
+
+    def snapshot(self, top: int = 20) -> Dict:
+        """集計結果（動画・クライアントは消費量の多い順に top 件、接続元アドレスは伏せる）"""
+
+        def ranked(counts: Dict, label=str) -> Dict:
+            items = sorted(counts.items(), key=lambda kv: kv[1], reverse=True)
+            return {label(key): round(value, 2) for key, value in items[:top]}
+
+        with self._lock:
+            self._maybe_reset()
+            return {
+                "period_start": _isoformat(self._period_start),
+                "reset_at": _isoformat(self._period_end),
+                "seconds_until_reset": round(self.seconds_until_reset()),
+                "daily_limit": self.daily_limit,
+                "used": self.used,
+                "remaining": max(0, self.daily_limit - self.used),
+                "projected": self.projected(),
+                "requests": self.requests,
+                "refused": self.refused,
+                "client_budget": self.client_budget or None,
+                "reserves": dict(self.reserves),
+                "by_endpoint": dict(self.by_endpoint),
+                "by_video": ranked(self.by_video),
+                "by_client": ranked(self.by_client, mask_client_id),
+            }
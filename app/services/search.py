@@ -0,0 +1,169 @@
+import os
+import re
+import struct
+import unicodedata
+from array import array
+from typing import Dict, List, Optional, Set, Tuple
+
+# 英数字は単語単位、それ以外の文字（日本語など）は連続部分を n-gram にする
+_RUNS = re.compile(r"[0-9a-z_]+|[^\W0-9a-z_]+")
+NGRAM_SIZE = 2
+
+# 保存ファイルのヘッダー: 形式, 配列の要素のバイト数, メッセージ数, トークン数, 作者数
+_INDEX_HEADER = struct.Struct("<4sBQQQ")
+_INDEX_MAGIC = b"CSI1"
+# トークン・作者ごとのヘッダー: キーのバイト数, メッセージ番号の数
+_ENTRY_HEADER = struct.Struct("<IQ")
+
+
+def normalize(text: str) -> str:
+    """検索用に正規化（全角・半角の統一と小文字化）"""
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def _runs(text: str) -> List[str]:
+    return _RUNS.findall(normalize(text))
+
+
+def _run_tokens(run: str) -> List[str]:
+    if run.isascii() or len(run) <= NGRAM_SIZE:
+        return [run]
+    return [run[i : i + NGRAM_SIZE] for i in range(len(run) - NGRAM_SIZE + 1)]
+
+
+def tokenize(text: str) -> Set[str]:
+    """インデックス用のトークン（英数字の単語と、それ以外の文字の bi-gram）"""
+    tokens: Set[str] = set()
+    for run in _runs(text):
+        tokens.update(_run_tokens(run))
+        if not run.isascii():
+            # 1文字だけの検索語（「草」など）にも当たるように unigram も持つ
+            tokens.update(run)
+    return tokens
+
+
+def parse_query(query: str) -> Tuple[Set[str], List[str]]:
+    """検索語をトークンと、照合用の正規化済みの語に分解"""
+    runs = _runs(query)
+    tokens: Set[str] = set()
+    for run in runs:
+        tokens.update(_run_tokens(run))
+    return tokens, runs
+
+
+def matches(runs: List[str], *fields: str) -> bool:
+    """正規化した各語がいずれかのフィールドに連続して含まれるか
+
+    bi-gram の組み合わせだけで一致した（語としては含まれない）候補を除くために使う。
+    """
+    texts = [normalize(field) for field in fields]
+    return all(any(run in text for text in texts) for run in runs)
+
+
+class ChatSearchIndex:
+    """アーカイブのメッセージ番号を値に持つ転置インデックス
+
+    メッセージ本文と作者名のトークン、作者のチャンネルIDからメッセージ番号の昇順リストを引く。
+    メッセージは番号順に追加されるため、リストは追記するだけで昇順を保つ。
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, array] = {}
+        self.authors: Dict[str, array] = {}
+        self.published_at = array("q")
+
+    def __len__(self) -> int:
+        return len(self.published_at)
+
+    def add(
+        self,
+        doc: int,
+        published_at: int,
+        message: str,
+        author_name: str,
+        author_id: str,
+    ):
+        """メッセージを追加（doc は追加済みの件数と等しいこと）"""
+        if doc != len(self.published_at):
+            raise ValueError(f"unexpected document number: {doc}")
+        self.published_at.append(published_at)
+        for token in tokenize(message) | tokenize(author_name):
+            self.postings.setdefault(token, array("L")).append(doc)
+        self.authors.setdefault(author_id, array("L")).append(doc)
+
+    def candidates(
+        self,
+        tokens: Set[str],
+        author_id: Optional[str] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        start: int = 0,
+    ) -> List[int]:
+        """全トークン・作者・期間の条件を満たしうるメッセージ番号（昇順）"""
+        lists = [self.postings.get(token, array("L")) for token in tokens]
+        if author_id is not None:
+            lists.append(self.authors.get(author_id, array("L")))
+        if not lists:
+            return []
+
+        lists.sort(key=len)
+        docs = set(lists[0])
+        for postings in lists[1:]:
+            if not docs:
+                break
+            docs.intersection_update(postings)
+
+        published_at = self.published_at
+        return sorted(
+            doc
+            for doc in docs
+            if doc >= start
+            and (since is None or published_at[doc] >= since)
+            and (until is None or published_at[doc] < until)
+        )
+
+    def save(self, path: str):
+        """ファイルに保存（一時ファイルに書いてから置き換える）"""
+        with open(path + ".tmp", "wb") as f:
+            f.write(
+                _INDEX_HEADER.pack(
+                    _INDEX_MAGIC,
+                    self.published_at.itemsize,
+                    len(self.published_at),
+                    len(self.postings),
+                    len(self.authors),
+                )
+            )
+            self.published_at.tofile(f)
+            for mapping in (self.postings, self.authors):
+                for key, docs in mapping.items():
+                    encoded = key.encode()
+                    f.write(_ENTRY_HEADER.pack(len(encoded), len(docs)))
+                    f.write(encoded)
+                    docs.tofile(f)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["ChatSearchIndex"]:
+        """save したファイルから読み込む（なければ・壊れていれば None）"""
+        index = cls()
+        try:
+            with open(path, "rb") as f:
+                magic, itemsize, docs, tokens, authors = _INDEX_HEADER.unpack(
+                    f.read(_INDEX_HEADER.size)
+                )
+                if magic != _INDEX_MAGIC or itemsize != index.published_at.itemsize:
+                    return None
+                index.published_at.fromfile(f, docs)
+                for mapping, entries in ((index.postings, tokens), (index.authors, authors)):
+                    for _ in range(entries):
+                        key_length, length = _ENTRY_HEADER.unpack(
+                            f.read(_ENTRY_HEADER.size)
+                        )
+                        key = f.read(key_length).decode()
+                        values = array("L")
+                        values.fromfile(f, length)
+                        mapping[key] = values
+        except (OSError, EOFError, UnicodeDecodeError, struct.error):
+            return None
+        return index
@@ -1,104 +1,502 @@
+import asyncio
+import json
 import time
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
 from app.models.youtube import LiveChatMessageListResponse
 from app.config import (
-    YOUTUBE_API_KEY,
+    YOUTUBE_API_KEYS,
+    YOUTUBE_API_DAILY_QUOTA,
+    QUOTA_RESET_TIMEZONE,
+    QUOTA_CLIENT_DAILY_BUDGET,
+    QUOTA_RESERVE_LOW,
+    QUOTA_RESERVE_NORMAL,
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    CIRCUIT_BREAKER_RECOVERY_TIMEOUT,
+    CIRCUIT_BREAKER_SERVE_STALE,
+    CONCURRENCY_LIMIT_INITIAL,
+    CONCURRENCY_LIMIT_MIN,
+    CONCURRENCY_LIMIT_MAX,
+    CONCURRENCY_LATENCY_THRESHOLD,
+    CONCURRENCY_MAX_WAIT,
+    CONCURRENCY_DECREASE_WINDOW,
     RATE_LIMIT_MAX_RETRIES,
     RATE_LIMIT_BASE_DELAY,
     RATE_LIMIT_REQUESTS_PER_SECOND,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_MODE,
+    RATE_LIMIT_MAX_WAIT,
+    LIVE_CHAT_ID_CACHE_TTL,
+    LIVE_CHAT_ID_CACHE_NEGATIVE_TTL,
+    LIVE_CHAT_ID_CACHE_MAX_SIZE,
+    LIVE_CHAT_ID_BATCH_WINDOW,
+    PAGE_CACHE_ENABLED,
+    PAGE_CACHE_BACKEND,
+    PAGE_CACHE_MAX_BYTES,
+    PAGE_CACHE_TTL,
+    CHAT_POLL_SCHEDULER_ENABLED,
+    ARCHIVE_ENABLED,
+    ARCHIVE_DIR,
+    ARCHIVE_SEGMENT_MAX_BYTES,
+    ARCHIVE_INDEX_INTERVAL,
+    ARCHIVE_MAX_OPEN,
+)
+from app.services.archive import ChatArchiver
+from app.services.key_pool import ApiKeyPool, mask_key, quota_cost
+from app.services.poll_scheduler import ChatPollScheduler
+from app.services.quota import QuotaLedger
+from app.utils.batching import MicroBatcher
+from app.utils.cache import TTLCache, MISSING
+from app.utils.circuit_breaker import CircuitBreakerRegistry
+from app.utils.concurrency import AIMDLimiter
+from app.utils.deadline import check_deadline, clear_deadline
+from app.utils.exceptions import (
+    DeadlineExceededError,
+    PollTooEarlyError,
+    QuotaExceededError,
+    UpstreamError,
+    UpstreamUnavailableError,
 )
 from app.utils.http_client import RateLimitedHTTPClient
+from app.utils.metrics import QUOTA_UNITS, RATE_LIMIT_WAIT, UPSTREAM_REQUEST_DURATION
+from app.utils.page_cache import ChatPageCache, load_page_cache_backend
+from app.utils.rate_limiter import RateLimiter
+from app.utils.request_context import (
+    DEFAULT_PRIORITY,
+    client_id_var,
+    current_client_id,
+    current_priority,
+    priority_var,
+)
+from app.utils.singleflight import SingleFlight, make_request_key
+from app.utils.tracing import TRACER
 import logging
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# videos.list の id パラメータに指定できる最大件数
+VIDEOS_MAX_IDS_PER_REQUEST = 50
+
+# マイクロバッチは複数の呼び出し元の分なので、最初の呼び出し元ではなくここに計上する
+BATCH_CLIENT_ID = "batch"
+
+# チャット終了を示すエラーメッセージのキーワード
+CHAT_ENDED_ERROR_KEYWORDS = (
+    "livechatended",
+    "livechatnotfound",
+    "livechatdisabled",
+    "forbidden",
+    "not found",
+)
+
+
+def is_chat_ended_error(error: Exception) -> bool:
+    """チャット終了（または無効化）を示すエラーか判定"""
+    error_str = str(error).lower()
+    return any(keyword in error_str for keyword in CHAT_ENDED_ERROR_KEYWORDS)
+
 
 class YouTubeService:
-    def __init__(self):
+    def __init__(
+        self,
+        page_cache: Optional[ChatPageCache] = None,
+        archiver: Optional[ChatArchiver] = None,
+        key_pool: Optional[ApiKeyPool] = None,
+    ):
         self.client = RateLimitedHTTPClient(
             max_retries=RATE_LIMIT_MAX_RETRIES,
             base_delay=RATE_LIMIT_BASE_DELAY,
         )
-        self.last_request_time = 0
-        self.min_interval = 1.0 / RATE_LIMIT_REQUESTS_PER_SECOND
+        # クォータ消費量に応じて使い分けるAPIキー
+        self.key_pool = key_pool or ApiKeyPool(
+            YOUTUBE_API_KEYS,
+            daily_quota=YOUTUBE_API_DAILY_QUOTA,
+            reset_timezone=QUOTA_RESET_TIMEZONE,
+        )
+        # エンドポイント・動画・クライアントごとのクォータ消費量と予算
+        self.quota_ledger = QuotaLedger(
+            self.key_pool.total_quota,
+            client_budget=QUOTA_CLIENT_DAILY_BUDGET,
+            reserves={"low": QUOTA_RESERVE_LOW, "normal": QUOTA_RESERVE_NORMAL},
+            reset_timezone=QUOTA_RESET_TIMEZONE,
+        )
+        # エンドポイントごとのサーキットブレーカーと上流への同時実行数の上限
+        self.circuit_breakers = CircuitBreakerRegistry(
+            failure_threshold=CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            recovery_timeout=CIRCUIT_BREAKER_RECOVERY_TIMEOUT,
+        )
+        self.concurrency = AIMDLimiter(
+            initial_limit=CONCURRENCY_LIMIT_INITIAL,
+            min_limit=CONCURRENCY_LIMIT_MIN,
+            max_limit=CONCURRENCY_LIMIT_MAX,
+            latency_threshold=CONCURRENCY_LATENCY_THRESHOLD,
+            max_wait=CONCURRENCY_MAX_WAIT,
+            decrease_window=CONCURRENCY_DECREASE_WINDOW,
+        )
+        # APIキー・エンドポイントごとのトークンバケット
+        self.rate_limiter = RateLimiter(
+            rate=RATE_LIMIT_REQUESTS_PER_SECOND,
+            capacity=RATE_LIMIT_BURST,
+            reject=RATE_LIMIT_MODE == "reject",
+            max_wait=RATE_LIMIT_MAX_WAIT,
+        )
+        # videoId → activeLiveChatId のキャッシュ（None はネガティブキャッシュ）
+        self.live_chat_id_cache = TTLCache(
+            max_size=LIVE_CHAT_ID_CACHE_MAX_SIZE,
+            ttl=LIVE_CHAT_ID_CACHE_TTL,
+        )
+        self.live_chat_id_batcher = MicroBatcher(
+            self._fetch_batched_live_chat_ids,
+            window=LIVE_CHAT_ID_BATCH_WINDOW,
+            max_batch=VIDEOS_MAX_IDS_PER_REQUEST,
+        )
+        # (liveChatId, pageToken) 単位のチャットページキャッシュ
+        if page_cache is None and PAGE_CACHE_ENABLED:
+            page_cache = ChatPageCache(
+                load_page_cache_backend(PAGE_CACHE_BACKEND, PAGE_CACHE_MAX_BYTES),
+                page_ttl=PAGE_CACHE_TTL,
+            )
+        self.page_cache = page_cache
+        # (liveChatId, pageToken) ごとの pollingIntervalMillis 管理
+        self.poll_scheduler = (
+            ChatPollScheduler() if CHAT_POLL_SCHEDULER_ENABLED else None
+        )
+        # 取得したメッセージのディスク保存（無効なら None）
+        if archiver is None and ARCHIVE_ENABLED:
+            archiver = ChatArchiver(
+                ARCHIVE_DIR,
+                segment_max_bytes=ARCHIVE_SEGMENT_MAX_BYTES,
+                index_interval=ARCHIVE_INDEX_INTERVAL,
+                max_open=ARCHIVE_MAX_OPEN,
+            )
+        self.archiver = archiver
+        # 同一リクエスト（APIキー以外が同じ）の同時実行をまとめる
+        self.singleflight = SingleFlight()
         logger.info("🎬 YouTubeService initialized")
 
-    def _wait_for_rate_limit(self):
-        """リクエスト間隔を制御"""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.min_interval:
-            wait_time = self.min_interval - elapsed
-            logger.debug(f"⏱️ Rate limiting: waiting {wait_time:.2f} seconds")
-            time.sleep(wait_time)
-        self.last_request_time = time.time()
+    async def _wait_for_rate_limit(self, endpoint: str, key: str) -> float:
+        """APIキー・エンドポイント単位でリクエスト間隔を制御（リクエストの期限までしか待たない）"""
+        with TRACER.span("rate_limiter.wait", endpoint=endpoint) as span:
+            wait = await self.rate_limiter.acquire(
+                (key, endpoint),
+                max_wait=check_deadline(),
+                label=f"{endpoint} ({mask_key(key)})",
+            )
+            span.set_attribute("wait", wait)
+        RATE_LIMIT_WAIT.labels(endpoint).observe(wait)
+        return wait
+
+    async def _request(
+        self,
+        endpoint: str,
+        url: str,
+        params: Dict,
+        decode: Callable[[bytes], T] = json.loads,
+        subjects: Sequence[str] = (),
+    ) -> T:
+        """YouTube APIを呼び出してデコードする
+
+        同一リクエストの同時実行は1回にまとめ、デコード結果も共有する。
+        共有する呼び出しは最初の呼び出し元の期限を引き継がず、それぞれの呼び出し元が
+        自分の期限まで待つ（クォータは実際に呼び出した最初の呼び出し元に計上する）。
+        """
+
+        async def call():
+            # 別タスクで動くので、ここで外しても呼び出し元の期限には影響しない
+            clear_deadline()
+            return decode(await self._fetch_raw(endpoint, url, params, subjects))
+
+        shared = self.singleflight.do(make_request_key(url, params), call)
+        remaining = check_deadline()
+        if remaining is None:
+            return await shared
+        try:
+            return await asyncio.wait_for(shared, remaining)
+        except asyncio.TimeoutError:
+            raise DeadlineExceededError() from None
+
+    async def _fetch_raw(
+        self, endpoint: str, url: str, params: Dict, subjects: Sequence[str]
+    ) -> bytes:
+        """サーキットブレーカーを通して上流から本文を取得
+
+        open の間や同時実行数の上限で呼び出せない時は、直近の本文があればそれを返す。
+        """
+        breaker = self.circuit_breakers.get(endpoint)
+        try:
+            breaker.before_call()
+            try:
+                raw = await self._fetch_with_keys(endpoint, url, params, subjects)
+            except UpstreamError:
+                breaker.record_failure()
+                raise
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.record_success()
+            return raw
+        except UpstreamUnavailableError as e:
+            stale = (
+                self.client.get_stale(url, params)
+                if CIRCUIT_BREAKER_SERVE_STALE
+                else None
+            )
+            if stale is None:
+                raise
+            logger.warning(f"🧊 Serving stale response for {endpoint} ({e.reason})")
+            return stale
+
+    async def _fetch_with_keys(
+        self, endpoint: str, url: str, params: Dict, subjects: Sequence[str]
+    ) -> bytes:
+        """APIキーを選んで上流を呼び出す
+
+        クォータ超過になったキーは休止させて別のキーで再試行する。
+        消費量は subjects（動画IDか liveChatId）と現在のクライアントに計上する。
+        同時実行枠の待ちが期限で打ち切られた時は 503 ではなく DeadlineExceededError にする。
+        """
+        cost = quota_cost(endpoint)
+        client_id = current_client_id()
+        self.quota_ledger.check(
+            cost, client_id, current_priority(), self.key_pool.available
+        )
+        for _ in range(len(self.key_pool)):
+            state = self.key_pool.select(cost)
+            await self._wait_for_rate_limit(endpoint, state.key)
+            started = time.perf_counter()
+            outcome = "error"
+            acquired = False
+            remaining = check_deadline()
+            try:
+                async with self.concurrency.slot(max_wait=remaining):
+                    acquired = True
+                    # 計上は実際に送る時だけ（レート制限・同時実行数で断った分は含めない）
+                    self.key_pool.charge(state, cost)
+                    self.quota_ledger.record(endpoint, cost, client_id, subjects)
+                    QUOTA_UNITS.labels(endpoint).inc(cost)
+                    started = time.perf_counter()
+                    try:
+                        raw = await self.client.get_raw_with_retry(
+                            url, {**params, "key": state.key}
+                        )
+                    except UpstreamError:
+                        self.concurrency.on_failure()
+                        raise
+                outcome = "ok"
+                return raw
+            except UpstreamUnavailableError:
+                if (
+                    not acquired
+                    and remaining is not None
+                    and remaining < self.concurrency.max_wait
+                ):
+                    outcome = "deadline_exceeded"
+                    raise DeadlineExceededError() from None
+                outcome = "rejected"
+                raise
+            except QuotaExceededError:
+                outcome = "quota_exceeded"
+                self.key_pool.bench(state)
+            finally:
+                UPSTREAM_REQUEST_DURATION.labels(endpoint, outcome).observe(
+                    time.perf_counter() - started
+                )
+        raise QuotaExceededError(retry_after=self.key_pool.seconds_until_reset())
 
-    def get_live_chat_id(self, video_id: str) -> Optional[str]:
-        """ライブチャットIDを取得"""
-        logger.debug(f"🔍 Fetching live chat ID for video: {video_id}")
-        self._wait_for_rate_limit()
+    @staticmethod
+    def _decode_chat_page(raw: bytes) -> Tuple[LiveChatMessageListResponse, bool]:
+        """チャットページをバイト列から直接モデルに変換（配信終了フラグ付き）"""
+        response = LiveChatMessageListResponse.model_validate_json(raw)
+        offline = b'"offlineAt"' in raw and bool(json.loads(raw).get("offlineAt"))
+        return response, offline
+
+    async def get_live_chat_id(self, video_id: str) -> Optional[str]:
+        """ライブチャットIDを取得（キャッシュ優先）
+
+        同時に届いた単発の問い合わせはマイクロバッチで1回のAPI呼び出しにまとめる。
+        """
+        with TRACER.span("youtube.get_live_chat_id", video_id=video_id) as span:
+            cached = self.live_chat_id_cache.get(video_id)
+            span.set_attribute("cache_hit", cached is not MISSING)
+            if cached is not MISSING:
+                logger.debug(f"🎯 Live chat ID cache hit: {video_id} -> {cached}")
+                return cached
+
+            return await self.live_chat_id_batcher.submit(video_id)
+
+    async def get_live_chat_ids(
+        self, video_ids: List[str]
+    ) -> Dict[str, Optional[str]]:
+        """複数動画のライブチャットIDを取得（50件ずつまとめてAPIを呼ぶ）"""
+        results: Dict[str, Optional[str]] = {}
+        missing = []
+        for video_id in dict.fromkeys(video_ids):
+            cached = self.live_chat_id_cache.get(video_id)
+            if cached is MISSING:
+                missing.append(video_id)
+            else:
+                results[video_id] = cached
+
+        for i in range(0, len(missing), VIDEOS_MAX_IDS_PER_REQUEST):
+            chunk = missing[i : i + VIDEOS_MAX_IDS_PER_REQUEST]
+            results.update(await self._fetch_live_chat_ids(chunk))
+
+        return results
+
+    def invalidate_live_chat(self, live_chat_id: str) -> int:
+        """チャット終了時に該当するキャッシュを破棄"""
+        removed = self.live_chat_id_cache.invalidate_where(
+            lambda _, cached_chat_id: cached_chat_id == live_chat_id
+        )
+        if removed:
+            logger.info(f"🧹 Live chat ID cache invalidated: {live_chat_id}")
+        return removed
+
+    async def _fetch_batched_live_chat_ids(
+        self, video_ids: List[str]
+    ) -> Dict[str, Optional[str]]:
+        """マイクロバッチの問い合わせ（バッチ用のクライアント・通常の優先度で計上する）"""
+        # バッチは空のコンテキストで動くので、ここでの設定は呼び出し元に影響しない
+        client_id_var.set(BATCH_CLIENT_ID)
+        priority_var.set(DEFAULT_PRIORITY)
+        return await self._fetch_live_chat_ids(video_ids)
+
+    async def _fetch_live_chat_ids(
+        self, video_ids: List[str]
+    ) -> Dict[str, Optional[str]]:
+        """ライブチャットIDをAPIからまとめて取得し、キャッシュに保存"""
+        logger.debug(f"🔍 Fetching live chat IDs for videos: {video_ids}")
 
         url = "https://www.googleapis.com/youtube/v3/videos"
         params = {
             "part": "liveStreamingDetails",
-            "id": video_id,
-            "key": YOUTUBE_API_KEY,
+            "id": ",".join(video_ids),
         }
 
         try:
-            data = self.client.get_with_retry(url, params)
-            items = data.get("items", [])
-
-            if not items:
-                logger.warning(f"🚫 No video found for ID: {video_id}")
-                return None
+            data = await self._request("videos", url, params, subjects=video_ids)
+        except Exception as e:
+            logger.error(f"💥 Failed to get live chat ID for videos {video_ids}: {e}")
+            raise
 
-            live_details = items[0].get("liveStreamingDetails", {})
-            chat_id = live_details.get("activeLiveChatId")
+        results: Dict[str, Optional[str]] = dict.fromkeys(video_ids)
+        for item in data.get("items", []):
+            # 1件だけ問い合わせた場合は id がなくても対応が取れる
+            video_id = item.get("id")
+            if video_id is None and len(video_ids) == 1:
+                video_id = video_ids[0]
+            if video_id in results:
+                live_details = item.get("liveStreamingDetails", {})
+                results[video_id] = live_details.get("activeLiveChatId")
 
+        for video_id, chat_id in results.items():
             if chat_id:
                 logger.info(f"✅ Live chat ID retrieved: {chat_id} (video: {video_id})")
+                ttl = LIVE_CHAT_ID_CACHE_TTL
+                self.quota_ledger.link(chat_id, video_id)
+                if self.archiver is not None:
+                    await self.archiver.link_video(video_id, chat_id)
             else:
                 logger.warning(f"❌ No active live chat for video: {video_id}")
+                ttl = LIVE_CHAT_ID_CACHE_NEGATIVE_TTL
+            self.live_chat_id_cache.set(video_id, chat_id, ttl=ttl)
 
-            return chat_id
+        return results
 
-        except Exception as e:
-            logger.error(f"💥 Failed to get live chat ID for video {video_id}: {e}")
-            raise
-
-    def get_chat_messages(
+    async def get_chat_messages(
         self, live_chat_id: str, page_token: Optional[str] = None
     ) -> LiveChatMessageListResponse:
         """ライブチャットメッセージを取得"""
-        logger.debug(
-            f"💬 Fetching messages for chat: {live_chat_id}, page_token: {page_token}"
-        )
-        self._wait_for_rate_limit()
+        with TRACER.span(
+            "youtube.get_chat_messages",
+            live_chat_id=live_chat_id,
+            page_token=page_token or "",
+        ) as span:
+            logger.debug(
+                f"💬 Fetching messages for chat: {live_chat_id}, page_token: {page_token}"
+            )
+            if self.page_cache is not None:
+                cached = await self.page_cache.get(live_chat_id, page_token)
+                span.set_attribute("cache_hit", cached is not None)
+                if cached is not None:
+                    logger.debug(f"🎯 Page cache hit: {live_chat_id}, {page_token}")
+                    return cached
 
-        url = "https://www.googleapis.com/youtube/v3/liveChat/messages"
-        params = {
-            "liveChatId": live_chat_id,
-            "part": "snippet,authorDetails",
-            "key": YOUTUBE_API_KEY,
-        }
+            if self.poll_scheduler is not None:
+                wait = self.poll_scheduler.wait_time(live_chat_id, page_token)
+                if wait > 0:
+                    logger.debug(f"⏳ Polled too early: {live_chat_id} ({wait:.2f}s left)")
+                    raise PollTooEarlyError(wait)
 
-        if page_token:
-            params["pageToken"] = page_token
+            url = "https://www.googleapis.com/youtube/v3/liveChat/messages"
+            params = {
+                "liveChatId": live_chat_id,
+                "part": "snippet,authorDetails",
+            }
 
-        try:
-            data = self.client.get_with_retry(url, params)
-            response = LiveChatMessageListResponse.model_validate(data)
+            if page_token:
+                params["pageToken"] = page_token
 
-            message_count = len(response.items) if hasattr(response, "items") else 0
-            logger.info(
-                f"📨 Retrieved {message_count} chat messages (chat: {live_chat_id})"
-            )
+            try:
+                response, offline = await self._request(
+                    "liveChat/messages",
+                    url,
+                    params,
+                    self._decode_chat_page,
+                    subjects=(live_chat_id,),
+                )
+                if offline:
+                    # 配信終了後のレスポンス
+                    self.invalidate_live_chat(live_chat_id)
+                if self.poll_scheduler is not None:
+                    self.poll_scheduler.record_poll(
+                        live_chat_id, page_token, response.pollingIntervalMillis
+                    )
+                if self.page_cache is not None:
+                    await self.page_cache.set(live_chat_id, page_token, response)
+                if self.archiver is not None:
+                    await self._archive(live_chat_id, response)
+
+                message_count = len(response.items) if hasattr(response, "items") else 0
+                span.set_attributes(messages=message_count, offline=offline)
+                logger.info(
+                    f"📨 Retrieved {message_count} chat messages (chat: {live_chat_id})"
+                )
 
-            return response
+                return response
 
+            except Exception as e:
+                logger.error(f"💥 Failed to get chat messages for {live_chat_id}: {e}")
+                if is_chat_ended_error(e):
+                    self.invalidate_live_chat(live_chat_id)
+                raise
+
+    async def _archive(self, live_chat_id: str, response: LiveChatMessageListResponse):
+        """メッセージをアーカイブに保存（失敗してもレスポンスには影響させない）"""
+        try:
+            await self.archiver.append(live_chat_id, response.items)
         except Exception as e:
-            logger.error(f"💥 Failed to get chat messages for {live_chat_id}: {e}")
-            raise
+            logger.error(f"💥 Failed to archive messages for {live_chat_id}: {e}")
+
+    def quota_stats(self) -> Dict:
+        """クォータの消費状況（集計とキーごとの状況）"""
+        return {**self.quota_ledger.snapshot(), "keys": self.key_pool.stats()}
+
+    def upstream_stats(self) -> Dict:
+        """上流の呼び出しの状況（コネクションプール・サーキットブレーカー・同時実行数・リトライ予算）"""
+        return {
+            "pool": self.client.pool_stats(),
+            "circuit_breakers": self.circuit_breakers.stats(),
+            "concurrency": self.concurrency.stats(),
+            "retry_budget": self.client.retry_budget.stats(),
+        }
+
+    async def close(self):
+        """HTTPクライアントとアーカイブを閉じる"""
+        await self.client.close()
+        if self.archiver is not None:
+            self.archiver.close()
 
 
 # サービスのシングルトンインスタンス
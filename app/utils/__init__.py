@@ -1,14 +1,35 @@
 from .logger import setup_logger
 from .http_client import RateLimitedHTTPClient
 from .validators import validate_youtube_video_id, sanitize_page_token
-from .exceptions import YouTubeAPIError, ValidationError, handle_youtube_api_error
+from .exceptions import (
+    YouTubeAPIError,
+    ValidationError,
+    RateLimitExceededError,
+    PollTooEarlyError,
+    QuotaExceededError,
+    QuotaBudgetExceededError,
+    UpstreamError,
+    UpstreamUnavailableError,
+    DeadlineExceededError,
+    handle_youtube_api_error,
+)
+from .rate_limiter import TokenBucket, RateLimiter
 
 __all__ = [
     "setup_logger",
     "RateLimitedHTTPClient",
+    "TokenBucket",
+    "RateLimiter",
     "validate_youtube_video_id",
     "sanitize_page_token",
     "YouTubeAPIError",
     "ValidationError",
+    "RateLimitExceededError",
+    "PollTooEarlyError",
+    "QuotaExceededError",
+    "QuotaBudgetExceededError",
+    "UpstreamError",
+    "UpstreamUnavailableError",
+    "DeadlineExceededError",
     "handle_youtube_api_error",
 ]
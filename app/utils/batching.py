@@ -0,0 +1,88 @@
+import asyncio
+import contextvars
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Optional, Set, TypeVar
+from app.utils.deadline import check_deadline
+from app.utils.exceptions import DeadlineExceededError
+import logging
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class MicroBatcher(Generic[K, V]):
+    """短時間に届いた単発リクエストをまとめて1回の処理にするバッチャー
+
+    window 秒の間に submit されたキーを集め、handler にまとめて渡す。
+    同じキーの同時リクエストは1つにまとめられる。
+    handler は呼び出し元のコンテキスト（期限・クライアントなど）を引き継がない空のコンテキストで
+    動き、各呼び出し元はそれぞれの期限まで結果を待つ。
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[K]], Awaitable[Dict[K, V]]],
+        window: float = 0.005,
+        max_batch: int = 50,
+    ):
+        self.handler = handler
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[K, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # イベントループは弱参照しか持たないので、実行中のフラッシュはここで保持する
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def submit(self, key: K) -> Optional[V]:
+        """キーを登録し、バッチ処理の結果を待つ"""
+        if self.window <= 0:
+            return (await self.handler([key])).get(key)
+
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch:
+                self._schedule_flush(loop)
+            elif self._timer is None:
+                self._timer = loop.call_later(
+                    self.window,
+                    self._schedule_flush,
+                    loop,
+                    context=contextvars.Context(),
+                )
+
+        remaining = check_deadline()
+        if remaining is None:
+            return await asyncio.shield(future)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), remaining)
+        except asyncio.TimeoutError:
+            raise DeadlineExceededError() from None
+
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            # 最初の呼び出し元の期限などに縛られないよう空のコンテキストで動かす
+            task = loop.create_task(self._flush(batch), context=contextvars.Context())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: Dict[K, asyncio.Future]):
+        logger.debug(f"📦 Flushing micro-batch of {len(batch)} keys")
+        try:
+            results = await self.handler(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key))
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# キャッシュ未登録を表す番兵（None を値として保存できるようにするため）
+MISSING = object()
+
+
+class TTLCache:
+    """TTL付きLRUキャッシュ（スレッドセーフ）
+
+    エントリごとに有効期限を持ち、上限サイズを超えた場合は
+    最も長く参照されていないエントリから削除する。
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """値を取得（期限切れ・未登録なら default を返す）"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """値を保存（ttl 省略時はデフォルトTTL）"""
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                evicted_key, _ = self._data.popitem(last=False)
+                logger.debug(f"🧹 Cache evicted: {evicted_key}")
+
+    def invalidate(self, key: Hashable) -> bool:
+        """キーを削除（削除できたら True）"""
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """条件に一致するエントリをまとめて削除し、削除件数を返す"""
+        with self._lock:
+            keys = [k for k, (v, _) in self._data.items() if predicate(k, v)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        """全エントリを削除"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
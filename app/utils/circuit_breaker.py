@@ -0,0 +1,133 @@
+import threading
+import time
+from typing import Callable, Dict, Hashable
+from app.utils.exceptions import UpstreamUnavailableError
+import logging
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """連続した失敗で上流への呼び出しを止めるサーキットブレーカー
+
+    closed: 通常どおり呼び出す。failure_threshold 回続けて失敗すると open にする。
+    open: recovery_timeout 秒のあいだ呼び出さずに UpstreamUnavailableError にする。
+    half_open: 試行を half_open_max_calls 件だけ通し、成功すれば closed、失敗すれば open に戻す。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if (
+            self._state == OPEN
+            and self._clock() - self._opened_at >= self.recovery_timeout
+        ):
+            self._state = HALF_OPEN
+            self._trials = 0
+            logger.info(f"🟡 Circuit half-open: {self.name}")
+
+    def retry_after(self) -> float:
+        """open の間、次に試行できるまでの秒数"""
+        return max(0.0, self._opened_at + self.recovery_timeout - self._clock())
+
+    def before_call(self):
+        """呼び出してよいか判定（だめなら UpstreamUnavailableError）"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and self._trials < self.half_open_max_calls:
+                self._trials += 1
+                return
+            self.rejected += 1
+            retry_after = self.retry_after() if self._state == OPEN else 1.0
+        raise UpstreamUnavailableError("circuit open", retry_after)
+
+    def record_success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                logger.info(f"🟢 Circuit closed: {self.name}")
+            self._state = CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self.opened += 1
+                logger.warning(
+                    f"🔴 Circuit opened: {self.name} (failures: {self._failures}, "
+                    f"retry in {self.recovery_timeout:.0f}s)"
+                )
+
+    def release(self):
+        """結果を判定せずに終わった呼び出し（キャンセルなど）の試行枠を返す"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreakerRegistry:
+    """キー（エンドポイント）ごとのサーキットブレーカー管理"""
+
+    def __init__(self, **options):
+        self.options = options
+        self._breakers: Dict[Hashable, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> CircuitBreaker:
+        """キーに対応するブレーカーを取得（なければ作成）"""
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(key)
+                if breaker is None:
+                    breaker = CircuitBreaker(str(key), **self.options)
+                    self._breakers[key] = breaker
+        return breaker
+
+    def stats(self) -> Dict[str, Dict]:
+        return {str(key): breaker.stats() for key, breaker in self._breakers.items()}
@@ -0,0 +1,245 @@
+import zlib
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 任意の依存
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 任意の依存
+    zstandard = None
+
+# 圧縮する Content-Type（SSE・NDJSON のストリームも含む）
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "text/",
+)
+
+
+class StreamEncoder(ABC):
+    """チャンクごとにフラッシュできる圧縮器の共通インターフェース"""
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        """入力を圧縮（出力は内部でバッファされることがある）"""
+
+    @abstractmethod
+    def flush(self) -> bytes:
+        """ここまでの入力をクライアントが展開できるように出力する"""
+
+    @abstractmethod
+    def finish(self) -> bytes:
+        """残りを出力してストリームを終える"""
+
+
+class GzipEncoder(StreamEncoder):
+    def __init__(self, level: int = 6):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder(StreamEncoder):
+    def __init__(self, quality: int = 4):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder(StreamEncoder):
+    def __init__(self, level: int = 3):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_encodings(
+    gzip_level: int = 6, brotli_quality: int = 4, zstd_level: int = 3
+) -> Dict[str, Callable[[], StreamEncoder]]:
+    """使える圧縮方式（優先順）"""
+    encodings: Dict[str, Callable[[], StreamEncoder]] = {}
+    if zstandard is not None:
+        encodings["zstd"] = lambda: ZstdEncoder(zstd_level)
+    if brotli is not None:
+        encodings["br"] = lambda: BrotliEncoder(brotli_quality)
+    encodings["gzip"] = lambda: GzipEncoder(gzip_level)
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: str, supported: List[str]) -> Optional[str]:
+    """Accept-Encoding から圧縮方式を選ぶ（q値が同じならサーバーの優先順）"""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best: Optional[Tuple[float, int]] = None
+    chosen = None
+    for rank, encoding in enumerate(supported):
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q <= 0:
+            continue
+        key = (q, -rank)
+        if best is None or key > best:
+            best, chosen = key, encoding
+    return chosen
+
+
+class CompressionMiddleware:
+    """レスポンスを Accept-Encoding に応じて zstd / br / gzip で圧縮するASGIミドルウェア
+
+    一度に返すレスポンスは minimum_size 以上の場合だけ圧縮する。
+    ストリーミング（SSE など）はチャンクごとにフラッシュし、届いたイベントをすぐ展開できるようにする。
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        encodings: Optional[Dict[str, Callable[[], StreamEncoder]]] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = encodings if encodings is not None else available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        encoding = negotiate_encoding(accept_encoding, list(self.encodings))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(
+            send, encoding, self.encodings[encoding], self.minimum_size
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """1レスポンス分の圧縮処理"""
+
+    def __init__(
+        self,
+        send: Send,
+        encoding: str,
+        encoder_factory: Callable[[], StreamEncoder],
+        minimum_size: int,
+    ):
+        self._send = send
+        self.encoding = encoding
+        self.encoder_factory = encoder_factory
+        self.minimum_size = minimum_size
+        self.start_message: Optional[Message] = None
+        self.encoder: Optional[StreamEncoder] = None
+        # None: 未判定, True: 圧縮する, False: そのまま送る
+        self.compressing: Optional[bool] = None
+
+    async def send(self, message: Message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            self.start_message = message
+            return
+        if message_type != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressing is None:
+            self.compressing = self._prepare(body, more_body)
+            if self.compressing and not more_body:
+                # 一度に返すレスポンスは全体を圧縮して Content-Length を付け直す
+                body = self.encoder.compress(body) + self.encoder.finish()
+                MutableHeaders(scope=self.start_message)["Content-Length"] = str(
+                    len(body)
+                )
+                await self._send(self.start_message)
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            await self._send(self.start_message)
+
+        if not self.compressing:
+            await self._send(message)
+            return
+
+        if more_body:
+            if body:
+                chunk = self.encoder.compress(body) + self.encoder.flush()
+                await self._send(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+        else:
+            chunk = self.encoder.compress(body) + self.encoder.finish()
+            await self._send({"type": "http.response.body", "body": chunk})
+
+    def _prepare(self, body: bytes, more_body: bool) -> bool:
+        """最初の本文で圧縮するか決め、ヘッダーを書き換える"""
+        headers = MutableHeaders(scope=self.start_message)
+        content_type = headers.get("content-type", "")
+        compressible = self.start_message["status"] not in (
+            204,
+            304,
+        ) and content_type.startswith(COMPRESSIBLE_TYPES)
+        if not compressible:
+            return False
+
+        headers.add_vary_header("Accept-Encoding")
+        if "content-encoding" in headers:
+            return False
+        if not more_body and len(body) < self.minimum_size:
+            return False
+
+        self.encoder = self.encoder_factory()
+        headers["Content-Encoding"] = self.encoding
+        if "content-length" in headers:
+            del headers["content-length"]
+        # 圧縮後の表現は別物なので強いETagは弱いETagにする
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        return True
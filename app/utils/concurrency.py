@@ -0,0 +1,121 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Optional
+from app.utils.exceptions import UpstreamUnavailableError
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AIMDLimiter:
+    """AIMD（加算増加・乗算減少）で同時実行数の上限を調整するリミッター
+
+    速い成功が続くと上限を1往復ごとに1ずつ増やし、失敗か latency_threshold 秒を超える
+    応答があると backoff 倍に減らす。同時に走っていた呼び出しがまとめて失敗しても
+    1回の混雑として扱うよう、減らすのは decrease_window 秒に1回まで。
+    上限に達している時は max_wait 秒まで空きを待ち、それでも空かなければ待ち行列を
+    作らずに UpstreamUnavailableError にする。
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 50,
+        backoff: float = 0.5,
+        latency_threshold: float = 2.0,
+        max_wait: float = 5.0,
+        decrease_window: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("limits must satisfy 1 <= min <= initial <= max")
+        if not 0 < backoff < 1:
+            raise ValueError("backoff must be between 0 and 1")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_threshold = latency_threshold
+        self.max_wait = max_wait
+        self.decrease_window = decrease_window
+        self._clock = clock
+        self._last_decrease = -math.inf
+        self._limit = float(initial_limit)
+        self.inflight = 0
+        self.rejected = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def condition(self) -> asyncio.Condition:
+        # イベントループの中で初めて使う時に作成
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def _acquire(self, max_wait: float):
+        async with self.condition:
+            if self.inflight >= self.limit:
+                try:
+                    await asyncio.wait_for(
+                        self.condition.wait_for(lambda: self.inflight < self.limit),
+                        max_wait,
+                    )
+                except asyncio.TimeoutError:
+                    self.rejected += 1
+                    logger.warning(
+                        f"🚧 Concurrency limit reached ({self.inflight}/{self.limit})"
+                    )
+                    raise UpstreamUnavailableError("concurrency limit", 1.0)
+            self.inflight += 1
+
+    async def _release(self):
+        async with self.condition:
+            self.inflight -= 1
+            self.condition.notify_all()
+
+    def on_success(self, latency: float):
+        if latency > self.latency_threshold:
+            self.on_failure()
+            return
+        # 上限いっぱいまで使っている時だけ増やす（使っていない枠は根拠にならない）
+        if self.inflight + 1 >= self.limit:
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+    def on_failure(self):
+        now = self._clock()
+        if now - self._last_decrease < self.decrease_window:
+            return
+        self._last_decrease = now
+        previous = self.limit
+        self._limit = max(self.min_limit, self._limit * self.backoff)
+        if self.limit < previous:
+            logger.info(f"📉 Concurrency limit decreased: {previous} → {self.limit}")
+
+    @asynccontextmanager
+    async def slot(self, max_wait: Optional[float] = None) -> AsyncIterator[None]:
+        """同時実行枠を1つ使う（失敗は呼び出し側で on_failure に報告する）
+
+        max_wait を指定すると設定の最大待機秒数とのうち短い方まで空きを待つ。
+        """
+        await self._acquire(
+            self.max_wait if max_wait is None else min(self.max_wait, max_wait)
+        )
+        start = self._clock()
+        try:
+            yield
+        finally:
+            await self._release()
+        self.on_success(self._clock() - start)
+
+    def stats(self) -> Dict:
+        return {
+            "limit": self.limit,
+            "inflight": self.inflight,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,42 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+from app.utils.exceptions import DeadlineExceededError
+
+# 現在のリクエストの期限（time.monotonic の時刻、None なら期限なし）
+deadline_var: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+def set_deadline(timeout: float):
+    """今から timeout 秒後を期限にする（既により早い期限があればそちらを使う）"""
+    deadline = time.monotonic() + timeout
+    current = deadline_var.get()
+    if current is None or deadline < current:
+        deadline_var.set(deadline)
+
+
+def clear_deadline():
+    """期限をなくす（リクエストとは独立したバックグラウンド処理用）"""
+    deadline_var.set(None)
+
+
+def time_remaining() -> Optional[float]:
+    """期限までの残り秒数（期限がなければ None）"""
+    deadline = deadline_var.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline() -> Optional[float]:
+    """期限を過ぎていれば DeadlineExceededError、まだなら残り秒数を返す"""
+    remaining = time_remaining()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceededError()
+    return remaining
+
+
+def cap_timeout(timeout: float) -> float:
+    """timeout を期限までの残り秒数で切り詰める"""
+    remaining = check_deadline()
+    return timeout if remaining is None else min(timeout, remaining)
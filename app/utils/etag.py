@@ -0,0 +1,21 @@
+from typing import Optional
+
+
+def format_etag(value: str) -> str:
+    """ETagヘッダー用にダブルクォートで囲む"""
+    if value.startswith('"') or value.startswith('W/"'):
+        return value
+    return f'"{value}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match ヘッダーが ETag に一致するか（弱い比較）"""
+    if not if_none_match:
+        return False
+
+    target = format_etag(etag).removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == target:
+            return True
+    return False
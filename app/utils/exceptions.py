@@ -1,3 +1,4 @@
+import math
 from fastapi import HTTPException
 from typing import Optional
 import logging
@@ -23,11 +24,108 @@ class ValidationError(Exception):
         super().__init__(f"{field}: {message}")
 
 
+class RateLimitExceededError(Exception):
+    """レート制限超過（待機せずに拒否した場合）の例外"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        self.message = f"Rate limit exceeded. Retry after {retry_after:.2f} seconds"
+        super().__init__(self.message)
+
+
+class PollTooEarlyError(Exception):
+    """pollingIntervalMillis より早いポーリングの例外"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        self.message = f"Polled too early. Next poll in {retry_after:.2f} seconds"
+        super().__init__(self.message)
+
+
+class QuotaExceededError(Exception):
+    """YouTube APIのクォータ超過の例外（retry_after はリセットまでの秒数）"""
+
+    def __init__(self, retry_after: Optional[float] = None):
+        self.retry_after = retry_after
+        self.message = "YouTube API quota exceeded"
+        super().__init__(self.message)
+
+
+class QuotaBudgetExceededError(Exception):
+    """クライアントの予算・優先度によりクォータの使用を断った場合の例外"""
+
+    def __init__(self, reason: str, retry_after: float):
+        self.reason = reason
+        self.retry_after = retry_after
+        self.message = f"Quota budget exceeded ({reason})"
+        super().__init__(self.message)
+
+
+class UpstreamError(Exception):
+    """YouTube APIへの接続・5xxがリトライしても回復しなかった場合の例外"""
+
+
+class UpstreamUnavailableError(Exception):
+    """上流の不調（サーキットブレーカー・同時実行数の上限）で呼び出さなかった場合の例外"""
+
+    def __init__(self, reason: str, retry_after: float):
+        self.reason = reason
+        self.retry_after = retry_after
+        self.message = f"YouTube API temporarily unavailable ({reason})"
+        super().__init__(self.message)
+
+
+class DeadlineExceededError(Exception):
+    """リクエストの期限までに上流の呼び出しが終わらなかった場合の例外"""
+
+    def __init__(self):
+        self.message = "Request deadline exceeded"
+        super().__init__(self.message)
+
+
 def handle_youtube_api_error(error: Exception) -> HTTPException:
     """YouTube API エラーを適切なHTTPExceptionに変換"""
     error_str = str(error).lower()
 
-    if "quota" in error_str:
+    if isinstance(error, RateLimitExceededError):
+        return HTTPException(
+            status_code=429,
+            detail="リクエストが多すぎます。しばらくしてから再試行してください。",
+            headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))},
+        )
+    elif isinstance(error, PollTooEarlyError):
+        # 304相当：まだ新しいページはない（次のポーリング時刻をヘッダーで返す）
+        return HTTPException(
+            status_code=304,
+            detail="まだ次のポーリング時刻になっていません。",
+            headers={
+                "Retry-After": str(max(1, math.ceil(error.retry_after))),
+                "X-Poll-After-Millis": str(math.ceil(error.retry_after * 1000)),
+            },
+        )
+    elif isinstance(error, DeadlineExceededError):
+        return HTTPException(
+            status_code=504, detail="YouTube APIの応答が期限内に得られませんでした。"
+        )
+    elif isinstance(error, UpstreamUnavailableError):
+        return HTTPException(
+            status_code=503,
+            detail="YouTube APIが一時的に利用できません。しばらくしてから再試行してください。",
+            headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))},
+        )
+    elif isinstance(error, QuotaBudgetExceededError):
+        return HTTPException(
+            status_code=429,
+            detail=f"クォータの予算を超過しました（{error.reason}）。",
+            headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))},
+        )
+    elif isinstance(error, QuotaExceededError) and error.retry_after:
+        return HTTPException(
+            status_code=429,
+            detail="YouTube APIのクォータを超過しました。",
+            headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))},
+        )
+    elif "quota" in error_str:
         return HTTPException(
             status_code=429, detail="YouTube APIのクォータを超過しました。"
         )
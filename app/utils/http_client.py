@@ -1,83 +1,310 @@
-import time
+import asyncio
+import json
 import random
-import requests
+import re
+import time
+import httpx
 from typing import Optional, Dict, Any
-from app.config import ENVIRONMENT
+from app.config import (
+    ENVIRONMENT,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_POOL_TIMEOUT,
+    HTTP2_ENABLED,
+    UPSTREAM_ETAG_CACHE_MAX_SIZE,
+    UPSTREAM_ETAG_CACHE_TTL,
+    RETRY_BUDGET_RATIO,
+    RETRY_BUDGET_MIN_PER_SECOND,
+)
+from app.utils.cache import TTLCache, MISSING
+from app.utils.etag import format_etag
+from app.utils.deadline import cap_timeout, check_deadline, time_remaining
+from app.utils.exceptions import (
+    DeadlineExceededError,
+    QuotaExceededError,
+    UpstreamError,
+)
+from app.utils.metrics import UPSTREAM_RETRIES
+from app.utils.retry_budget import RetryBudget
+from app.utils.singleflight import make_request_key
+from app.utils.tracing import TRACER
 import logging
 
 logger = logging.getLogger(__name__)
 
+# レスポンス先頭のトップレベル etag（YouTube API は kind, etag の順で返す）
+_BODY_ETAG_PATTERN = re.compile(rb'"etag"\s*:\s*"([^"]+)"')
+
+try:
+    import h2  # noqa: F401  httpx の HTTP/2 に必要
+except ImportError:  # pragma: no cover - 任意の依存
+    h2 = None
+
+# これより長くプールの空きを待ったリクエストを「待たされた」と数える（秒）
+POOL_WAIT_THRESHOLD = 0.01
+
 
 class RateLimitedHTTPClient:
-    """レート制限対応のHTTPクライアント"""
+    """レート制限対応の非同期HTTPクライアント"""
 
-    def __init__(self, max_retries: int = 3, base_delay: float = 1.0):
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        limits: Optional[httpx.Limits] = None,
+        http2: bool = HTTP2_ENABLED,
+    ):
         self.max_retries = max_retries
         self.base_delay = base_delay
-        self.session = requests.Session()
+        self.limits = limits or httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        )
+        if http2 and h2 is None:
+            logger.warning("⚠️ HTTP/2 requested but h2 is not installed, using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
 
         # 環境別User-Agent設定
         user_agent = f"LiveChatAPI/1.0 ({ENVIRONMENT})"
         if ENVIRONMENT == "production":
             user_agent += " (Production)"
 
-        self.session.headers.update({"User-Agent": user_agent})
+        self.headers = {"User-Agent": user_agent}
+        # 環境別タイムアウト設定
+        self.timeout = 30 if ENVIRONMENT == "production" else 10
+        # プールの空き待ち（コネクション取得までの時間）の統計
+        self.pool_requests = 0
+        self.pool_waited = 0
+        self.pool_wait_total = 0.0
+        self.pool_wait_max = 0.0
+        # イベントループ上で初めて使われた時に生成する
+        self._client: Optional[httpx.AsyncClient] = None
+        # リクエスト（APIキー除く）→ (ETag, レスポンス本文)
+        self.etag_cache = TTLCache(
+            max_size=UPSTREAM_ETAG_CACHE_MAX_SIZE, ttl=UPSTREAM_ETAG_CACHE_TTL
+        )
+        # クライアント全体のリトライ回数の上限（リクエスト数の一定割合）
+        self.retry_budget = RetryBudget(
+            ratio=RETRY_BUDGET_RATIO, min_per_second=RETRY_BUDGET_MIN_PER_SECOND
+        )
 
-    def get_with_retry(self, url: str, params: Optional[Dict] = None) -> Dict[Any, Any]:
+    @property
+    def session(self) -> httpx.AsyncClient:
+        """httpx.AsyncClient を取得（未生成なら生成）"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=httpx.Timeout(self.timeout, pool=HTTP_POOL_TIMEOUT),
+                limits=self.limits,
+                http2=self.http2,
+            )
+        return self._client
+
+    async def get_with_retry(
+        self, url: str, params: Optional[Dict] = None
+    ) -> Dict[Any, Any]:
         """指数バックオフとジッターを使ったリトライ機能付きGET"""
+        return json.loads(await self.get_raw_with_retry(url, params))
+
+    async def get_raw_with_retry(
+        self, url: str, params: Optional[Dict] = None
+    ) -> bytes:
+        """リトライ機能付きGET（デコードせずに本文のバイト列を返す）
+
+        以前のレスポンスのETagがあれば If-None-Match を送り、304なら保存済みの本文を返す。
+        リクエストの期限（app.utils.deadline）を超えるリトライはせず、リトライ回数は
+        クライアント全体の予算の範囲に抑える。
+        """
+        cache_key = make_request_key(url, params)
+        cached = self.etag_cache.get(cache_key)
+        headers = {}
+        if cached is not MISSING:
+            headers["If-None-Match"] = cached[0]
+
+        self.retry_budget.record_request()
         for attempt in range(self.max_retries + 1):
-            try:
-                # 環境別タイムアウト設定
-                timeout = 30 if ENVIRONMENT == "production" else 10
-                response = self.session.get(url, params=params, timeout=timeout)
+            # 1回の試行のタイムアウトはリクエストの期限までの残りで切り詰める
+            timeout = cap_timeout(self.timeout)
+            with TRACER.span(
+                "http.attempt", kind="client", attempt=attempt + 1, **{"http.url": url}
+            ) as span:
+                traceparent = span.traceparent()
+                try:
+                    response = await self.session.get(
+                        url,
+                        params=params,
+                        headers={**headers, "traceparent": traceparent}
+                        if traceparent
+                        else headers,
+                        timeout=httpx.Timeout(timeout, pool=min(timeout, HTTP_POOL_TIMEOUT)),
+                        extensions={"trace": self._pool_wait_tracer()},
+                    )
+                    span.set_attribute("http.status_code", response.status_code)
+                    if response.status_code >= 400:
+                        span.set_status("error")
 
-                # レート制限チェック
-                if response.status_code == 429:
-                    if attempt == self.max_retries:
-                        raise Exception("Rate limit exceeded after all retries")
+                    if response.status_code == 304 and cached is not MISSING:
+                        logger.debug(f"Not modified, reusing cached body: {url}")
+                        self.etag_cache.set(cache_key, cached)
+                        return cached[1]
+
+                    # レート制限チェック
+                    if response.status_code == 429:
+                        if attempt == self.max_retries:
+                            raise UpstreamError("Rate limit exceeded after all retries")
 
-                    retry_after = response.headers.get("Retry-After")
-                    if retry_after:
-                        delay = int(retry_after)
+                        retry_after = response.headers.get("Retry-After")
+                        if retry_after:
+                            delay = int(retry_after)
+                        else:
+                            delay = self.base_delay * (2**attempt) + random.uniform(0, 1)
+
+                        self._check_retry(delay, "Rate limit exceeded", "rate_limited")
+                        logger.warning(
+                            f"Rate limited. Retrying in {delay:.2f} seconds... (attempt {attempt + 1})"
+                        )
                     else:
-                        delay = self.base_delay * (2**attempt) + random.uniform(0, 1)
+                        body = response.content
+
+                        # YouTube APIエラーチェック（キーがある時だけデコードする）
+                        # 4xx のAPIエラーはリトライしても結果が変わらないのでそのまま例外にする
+                        if response.status_code < 500 and b'"error"' in body:
+                            self._raise_for_error_body(body)
+                        response.raise_for_status()
+
+                        etag = response.headers.get("ETag")
+                        if not etag:
+                            match = _BODY_ETAG_PATTERN.search(body, 0, 512)
+                            etag = match.group(1).decode() if match else None
+                        if etag:
+                            self.etag_cache.set(cache_key, (format_etag(etag), body))
+
+                        logger.debug(f"Request successful: {url}")
+                        return body
 
+                except httpx.HTTPError as e:
+                    span.set_status("error")
+                    span.set_attribute("error.type", type(e).__name__)
+                    if isinstance(e, httpx.TimeoutException):
+                        # 期限で切り詰めたタイムアウトなら期限切れ
+                        check_deadline()
+                    if attempt == self.max_retries:
+                        raise UpstreamError(
+                            f"Request failed after {self.max_retries} retries: {e}"
+                        )
+
+                    delay = self.base_delay * (2**attempt) + random.uniform(0, 1)
+                    self._check_retry(delay, f"Request failed: {e}", "error")
                     logger.warning(
-                        f"Rate limited. Retrying in {delay:.2f} seconds... (attempt {attempt + 1})"
-                    )
-                    time.sleep(delay)
-                    continue
-
-                response.raise_for_status()
-                data = response.json()
-
-                # YouTube APIエラーチェック
-                if "error" in data:
-                    error = data["error"]
-                    if (
-                        error.get("code") == 403
-                        and "quota" in error.get("message", "").lower()
-                    ):
-                        raise Exception("YouTube API quota exceeded")
-                    raise Exception(f"YouTube API Error: {error.get('message')}")
-
-                logger.debug(f"Request successful: {url}")
-                return data
-
-            except requests.RequestException as e:
-                if attempt == self.max_retries:
-                    raise Exception(
-                        f"Request failed after {self.max_retries} retries: {e}"
+                        f"Request failed (attempt {attempt + 1}). Retrying in {delay:.2f} seconds..."
                     )
 
-                delay = self.base_delay * (2**attempt) + random.uniform(0, 1)
-                logger.warning(
-                    f"Request failed (attempt {attempt + 1}). Retrying in {delay:.2f} seconds..."
-                )
-                time.sleep(delay)
+            # バックオフの待ち時間は試行とは別のスパンにする
+            with TRACER.span("http.backoff", attempt=attempt + 1, delay=delay):
+                await asyncio.sleep(delay)
+
+        raise UpstreamError("Unexpected error in retry logic")
+
+    def _check_retry(self, delay: float, reason: str, kind: str):
+        """delay 秒後にリトライしてよいか判定（期限を過ぎるか予算がなければ例外）"""
+        remaining = time_remaining()
+        if remaining is not None and delay >= remaining:
+            raise DeadlineExceededError()
+        if not self.retry_budget.try_retry():
+            logger.warning(f"🪣 Retry budget exhausted, giving up: {reason}")
+            raise UpstreamError(f"{reason} (retry budget exhausted)")
+        UPSTREAM_RETRIES.labels(kind).inc()
+
+    def _pool_wait_tracer(self):
+        """コネクションを取得するまでの時間を計測する httpcore の trace コールバック
+
+        プールの空きを待っている間はイベントが来ないため、最初のイベントまでを待ち時間とみなす。
+        """
+        started = time.perf_counter()
+        recorded = False
+
+        async def trace(event_name: str, info: Dict):
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            waited = time.perf_counter() - started
+            self.pool_requests += 1
+            self.pool_wait_total += waited
+            self.pool_wait_max = max(self.pool_wait_max, waited)
+            if waited > POOL_WAIT_THRESHOLD:
+                self.pool_waited += 1
+
+        return trace
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """コネクションプールの状態と空き待ちの統計"""
+        stats: Dict[str, Any] = {
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "requests": self.pool_requests,
+            "waited": self.pool_waited,
+            "wait_avg": self.pool_wait_total / self.pool_requests
+            if self.pool_requests
+            else 0.0,
+            "wait_max": self.pool_wait_max,
+        }
+        # 現在のコネクション数は httpcore のプールから取得（公開APIがないため取れなければ省略）
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        if pool is not None and hasattr(pool, "connections"):
+            connections = list(pool.connections)
+            stats["connections"] = len(connections)
+            stats["idle_connections"] = sum(1 for c in connections if c.is_idle())
+            stats["queued_requests"] = sum(
+                1 for request in getattr(pool, "_requests", []) if request.is_queued()
+            )
+        return stats
+
+    async def warmup(self, url: str, connections: int, timeout: float = 5.0) -> int:
+        """起動時にコネクションを確立しておく（確立できた本数を返す、失敗は無視）
+
+        HTTP/2 なら1本のコネクションを多重化するので1回だけ送る。
+        """
+        count = 1 if self.http2 else min(connections, self.limits.max_connections or connections)
+
+        async def connect() -> bool:
+            try:
+                await self.session.head(url, timeout=timeout)
+                return True
+            except httpx.HTTPError as e:
+                logger.debug(f"Warmup request failed: {e}")
+                return False
+
+        results = await asyncio.gather(*(connect() for _ in range(count)))
+        established = sum(results)
+        logger.info(f"🔥 Warmed up {established}/{count} upstream connections")
+        return established
+
+    def get_stale(self, url: str, params: Optional[Dict] = None) -> Optional[bytes]:
+        """保存済みの直近の本文（上流が使えない時の代わりに返す）"""
+        cached = self.etag_cache.get(make_request_key(url, params))
+        return None if cached is MISSING else cached[1]
 
-        raise Exception("Unexpected error in retry logic")
+    @staticmethod
+    def _raise_for_error_body(body: bytes):
+        data = json.loads(body)
+        if isinstance(data, dict) and "error" in data:
+            error = data["error"]
+            reasons = {e.get("reason") for e in error.get("errors", [])}
+            if error.get("code") == 403 and (
+                "quota" in error.get("message", "").lower()
+                or reasons & {"quotaExceeded", "dailyLimitExceeded"}
+            ):
+                raise QuotaExceededError()
+            raise Exception(f"YouTube API Error: {error.get('message')}")
 
-    def close(self):
+    async def close(self):
         """セッションを閉じる"""
-        self.session.close()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,354 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# レイテンシ用の既定のバケット（秒）
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    """ラベル値ごとの子を持つメトリクスの共通部分
+
+    記録はロックを取らずに子の値を加算するだけにしている（イベントループ上の単一スレッドから
+    呼ぶ前提。スレッドから呼んでも値がわずかにずれるだけで壊れはしない）。
+    頻繁に記録する箇所では labels() の戻り値を保持しておくと辞書の検索も省ける。
+    """
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Labels, object] = {}
+
+    def labels(self, *values: str):
+        # 通常は登録済みの子がそのまま見つかる（文字列化は初回だけ）
+        child = self._children.get(values)
+        if child is not None:
+            return child
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """ラベル値1組分の子を作る"""
+
+    def _unlabelled(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} requires labels {self.labelnames}")
+        return self.labels()
+
+    @abstractmethod
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """(サンプル名, ラベル文字列, 値) を返す"""
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    """単調増加するカウンター"""
+
+    type_name = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            yield (
+                f"{self.name}_total",
+                _format_labels(self.labelnames, key),
+                child.value,
+            )
+
+
+class Gauge(_Metric):
+    """増減する値"""
+
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._unlabelled().dec(amount)
+
+    def set(self, value: float):
+        self._unlabelled().set(value)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            yield (self.name, _format_labels(self.labelnames, key), child.value)
+
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        # バケットごとの件数（累積は出力時に計算する）
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    """バケットごとの件数を数えるヒストグラム"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.upper_bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.upper_bounds + (math.inf,), child.counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    _format_labels(
+                        self.labelnames, key, f'le="{_format_value(bound)}"'
+                    ),
+                    cumulative,
+                )
+            labels = _format_labels(self.labelnames, key)
+            yield (f"{self.name}_count", labels, cumulative)
+            yield (f"{self.name}_sum", labels, child.sum)
+
+
+class CallbackMetric:
+    """出力時に関数を呼んで値を取るメトリクス（既存の統計値をそのまま公開する）
+
+    callback は {ラベル値のタプル: 値} を返す。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        type_name: str,
+        labelnames: Sequence[str],
+        callback: Callable[[], Dict[Labels, float]],
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.type_name = type_name
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def samples(self):
+        sample_name = f"{self.name}_total" if self.type_name == "counter" else self.name
+        for key, value in self.callback().items():
+            yield (sample_name, _format_labels(self.labelnames, key), value)
+
+
+class MetricsRegistry:
+    """メトリクスの登録と Prometheus テキスト形式での出力"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        type_name: str,
+        labelnames: Sequence[str],
+        callback: Callable[[], Dict[Labels, float]],
+    ) -> CallbackMetric:
+        return self.register(
+            CallbackMetric(name, documentation, type_name, labelnames, callback)
+        )
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for sample_name, labels, value in metric.samples():
+                lines.append(f"{sample_name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# アプリケーション全体のレジストリ
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "livechat_http_request_duration_seconds",
+    "Time spent handling HTTP requests (until the response starts)",
+    ("method", "route", "status"),
+)
+UPSTREAM_REQUEST_DURATION = REGISTRY.histogram(
+    "livechat_upstream_request_duration_seconds",
+    "Time spent calling the YouTube Data API, including retries",
+    ("endpoint", "outcome"),
+)
+RATE_LIMIT_WAIT = REGISTRY.histogram(
+    "livechat_rate_limit_wait_seconds",
+    "Time spent waiting in the client-side rate limiter",
+    ("endpoint",),
+)
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "livechat_upstream_retries",
+    "Retries of YouTube Data API requests",
+    ("reason",),
+)
+QUOTA_UNITS = REGISTRY.counter(
+    "livechat_quota_units",
+    "Estimated YouTube Data API quota units spent",
+    ("endpoint",),
+)
+ACTIVE_STREAMS = REGISTRY.gauge(
+    "livechat_active_streams",
+    "Open streaming connections",
+    ("transport",),
+)
+
+
+def route_label(scope: Scope) -> str:
+    """ルーティング後のパスのテンプレート（未一致ならパスを使わずに unmatched）"""
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """ルートごとのレスポンス時間をヒストグラムに記録するASGIミドルウェア
+
+    ストリーミングでも計測がレスポンス全体の長さにならないよう、レスポンス開始までを計る。
+    """
+
+    def __init__(self, app: ASGIApp, histogram: Optional[Histogram] = None):
+        self.app = app
+        self.histogram = histogram or HTTP_REQUEST_DURATION
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        recorded = False
+
+        def record(status: int):
+            nonlocal recorded
+            recorded = True
+            self.histogram.labels(scope["method"], route_label(scope), str(status)).observe(
+                time.perf_counter() - started
+            )
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start" and not recorded:
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if not recorded:
+                record(500)
+            raise
@@ -0,0 +1,142 @@
+import importlib
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Optional
+from app.models.youtube import LiveChatMessageListResponse
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PageCacheBackend(ABC):
+    """チャットページキャッシュの保存先
+
+    値はシリアライズ済みのバイト列で受け渡すため、複数ワーカーで共有する場合は
+    Redis などの外部ストアでこのインターフェースを実装すればよい。
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """値を取得（期限切れ・未登録なら None）"""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        """値を ttl 秒間保存"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """値を削除"""
+
+
+class InMemoryPageCacheBackend(PageCacheBackend):
+    """プロセス内のLRUキャッシュ（合計バイト数で上限を管理）"""
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._data: "OrderedDict[str, tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                self._remove(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        if len(value) > self.max_bytes:
+            logger.debug(f"Page too large to cache: {key} ({len(value)} bytes)")
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, self._clock() + ttl)
+            self.total_bytes += len(value)
+            while self.total_bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                logger.debug(f"🧹 Page cache evicted: {oldest}")
+
+    async def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def _remove(self, key: str):
+        value, _ = self._data.pop(key)
+        self.total_bytes -= len(value)
+
+
+def load_page_cache_backend(spec: str, max_bytes: int) -> PageCacheBackend:
+    """設定値からバックエンドを生成（"memory" または "module:ClassName"）"""
+    if spec == "memory":
+        return InMemoryPageCacheBackend(max_bytes=max_bytes)
+
+    module_name, _, class_name = spec.partition(":")
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    logger.info(f"🗄️ Page cache backend: {spec}")
+    return backend_class()
+
+
+class ChatPageCache:
+    """(liveChatId, pageToken) をキーにしたチャットページのキャッシュ
+
+    pageToken なし（先頭）のページは pollingIntervalMillis の間だけ、
+    pageToken 付きのページは page_ttl 秒キャッシュする。
+    """
+
+    def __init__(self, backend: PageCacheBackend, page_ttl: float = 300.0):
+        self.backend = backend
+        self.page_ttl = page_ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(live_chat_id: str, page_token: Optional[str]) -> str:
+        return f"livechat:{live_chat_id}:{page_token or ''}"
+
+    async def get(
+        self, live_chat_id: str, page_token: Optional[str]
+    ) -> Optional[LiveChatMessageListResponse]:
+        """キャッシュ済みのページを取得"""
+        raw = await self.backend.get(self.make_key(live_chat_id, page_token))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return LiveChatMessageListResponse.model_validate_json(raw)
+
+    async def set(
+        self,
+        live_chat_id: str,
+        page_token: Optional[str],
+        response: LiveChatMessageListResponse,
+    ) -> None:
+        """ページを保存"""
+        if page_token:
+            ttl = self.page_ttl
+        else:
+            ttl = response.pollingIntervalMillis / 1000
+        if ttl <= 0:
+            return
+        await self.backend.set(
+            self.make_key(live_chat_id, page_token),
+            response.model_dump_json().encode(),
+            ttl,
+        )
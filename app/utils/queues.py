@@ -0,0 +1,68 @@
+import asyncio
+from collections import deque
+from typing import Any, Deque, List, Tuple
+
+
+class DropOldestQueue:
+    """上限付きの送信キュー（溢れたら最古の要素を捨てる）
+
+    制御メッセージ（購読開始・終了など）は上限の対象外で捨てられず、
+    通常要素との順序も保たれる。単一のイベントループ上で使う前提。
+    """
+
+    def __init__(self, maxsize: int):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self._entries: Deque[Tuple[bool, Any]] = deque()
+        self._size = 0
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, item: Any) -> bool:
+        """要素を追加（古い要素を捨てた場合は False）"""
+        kept = True
+        if self._size >= self.maxsize:
+            self._drop_oldest()
+            kept = False
+        self._entries.append((False, item))
+        self._size += 1
+        self._ready.set()
+        return kept
+
+    def put_control(self, item: Any):
+        """捨てられない制御メッセージを追加"""
+        self._entries.append((True, item))
+        self._ready.set()
+
+    def _drop_oldest(self):
+        for index, (is_control, _) in enumerate(self._entries):
+            if not is_control:
+                del self._entries[index]
+                self._size -= 1
+                self.dropped += 1
+                return
+
+    async def get_batch(self, max_items: int) -> List[Tuple[bool, Any]]:
+        """要素が届くまで待ち、(制御メッセージか, 要素) を順序どおりまとめて取り出す
+
+        通常要素は最大 max_items 件まで。
+        """
+        while not self._entries:
+            self._ready.clear()
+            await self._ready.wait()
+
+        batch = []
+        taken = 0
+        while self._entries:
+            is_control, item = self._entries[0]
+            if not is_control:
+                if taken >= max_items:
+                    break
+                taken += 1
+                self._size -= 1
+            batch.append(self._entries.popleft())
+        return batch
@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, Hashable, Optional
+from app.utils.exceptions import RateLimitExceededError
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """トークンバケット方式のレート制限（スレッドセーフ）
+
+    トークンを先に予約して待ち時間を計算する方式のため、
+    待機中の呼び出しは到着順（FIFO）に処理される。
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """即時取得を試みる（取得できたら0、できなければ必要な待ち秒数）"""
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def reserve(self, tokens: float = 1.0, max_wait: Optional[float] = None) -> float:
+        """トークンを予約して待ち秒数を返す
+
+        max_wait を超える待ちになる場合は予約せずに RateLimitExceededError。
+        """
+        with self._lock:
+            self._refill(self._clock())
+            wait = max(0.0, (tokens - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                raise RateLimitExceededError(wait)
+            self._tokens -= tokens
+            return wait
+
+    def refund(self, tokens: float = 1.0) -> None:
+        """予約したトークンを返却（待機がキャンセルされた場合）"""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    async def acquire(self, tokens: float = 1.0, max_wait: Optional[float] = None):
+        """トークンを取得するまで非同期に待機し、待った秒数を返す"""
+        wait = self.reserve(tokens, max_wait)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.refund(tokens)
+                raise
+        return wait
+
+    @property
+    def available(self) -> float:
+        """現在利用可能なトークン数"""
+        with self._lock:
+            self._refill(self._clock())
+            return self._tokens
+
+
+class RateLimiter:
+    """キー（APIキー・エンドポイント）ごとのトークンバケット管理"""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        reject: bool = False,
+        max_wait: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self.reject = reject
+        self.max_wait = max_wait
+        self._clock = clock
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, key: Hashable) -> TokenBucket:
+        """キーに対応するバケットを取得（なければ作成）"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = TokenBucket(self.rate, self.capacity, self._clock)
+                    self._buckets[key] = bucket
+        return bucket
+
+    async def acquire(
+        self,
+        key: Hashable,
+        max_wait: Optional[float] = None,
+        label: Optional[str] = None,
+    ) -> float:
+        """レート制限を通過するまで待機（reject モードなら即時に例外）
+
+        max_wait を指定すると設定の最大待機秒数とのうち短い方まで待つ。
+        ログにはキーの代わりに label を出す（キーにAPIキーなどの秘密を含む場合に指定する）。
+        """
+        bucket = self.bucket(key)
+        if label is None:
+            label = str(key)
+        if self.reject:
+            retry_after = bucket.try_acquire()
+            if retry_after > 0:
+                logger.warning(
+                    f"🚦 Rate limit rejected: {label} (retry after {retry_after:.2f}s)"
+                )
+                raise RateLimitExceededError(retry_after)
+            return 0.0
+
+        if max_wait is None or (self.max_wait is not None and self.max_wait < max_wait):
+            max_wait = self.max_wait
+        wait = await bucket.acquire(max_wait=max_wait)
+        if wait > 0:
+            logger.debug(f"⏱️ Rate limiting {label}: waited {wait:.2f} seconds")
+        return wait
@@ -0,0 +1,83 @@
+import hashlib
+import hmac
+import os
+from contextvars import ContextVar
+from typing import Optional
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.config import TRUST_CLIENT_HEADERS
+
+# リクエスト優先度（低い順）
+PRIORITIES = ("low", "normal", "high")
+DEFAULT_PRIORITY = "normal"
+ANONYMOUS_CLIENT = "anonymous"
+# 接続元アドレスから作ったクライアントIDの接頭辞
+PEER_PREFIX = "peer:"
+# 統計で接続元アドレスを伏せる時のソルト（プロセスごとに変わる）
+_MASK_SALT = os.urandom(16)
+
+# 現在のリクエストのクライアントIDと優先度（クォータの計上・予算の判定に使う）
+client_id_var: ContextVar[str] = ContextVar("client_id", default=ANONYMOUS_CLIENT)
+priority_var: ContextVar[str] = ContextVar("priority", default=DEFAULT_PRIORITY)
+
+
+def current_client_id() -> str:
+    return client_id_var.get()
+
+
+def current_priority() -> str:
+    return priority_var.get()
+
+
+def parse_priority(value: Optional[str], trusted: bool = True) -> str:
+    """X-Priority ヘッダーの値（不明な値は normal、信頼しないなら normal より上げない）"""
+    value = (value or "").strip().lower()
+    if value not in PRIORITIES:
+        return DEFAULT_PRIORITY
+    if not trusted and PRIORITIES.index(value) > PRIORITIES.index(DEFAULT_PRIORITY):
+        return DEFAULT_PRIORITY
+    return value
+
+
+def mask_client_id(client_id: str) -> str:
+    """統計で返すクライアントID（接続元アドレスはソルト付きのハッシュに置き換える）"""
+    if not client_id.startswith(PEER_PREFIX):
+        return client_id
+    digest = hmac.new(_MASK_SALT, client_id.encode(), hashlib.sha256).hexdigest()
+    return PEER_PREFIX + digest[:12]
+
+
+class RequestContextMiddleware:
+    """X-Client-Id・X-Priority ヘッダーからリクエストのコンテキストを設定するASGIミドルウェア
+
+    ヘッダーは誰でも付けられるため、trust_client_headers でない時は X-Client-Id を無視して
+    接続元のアドレスをクライアントIDにし、X-Priority は normal より上げない。
+    """
+
+    def __init__(self, app: ASGIApp, trust_client_headers: bool = TRUST_CLIENT_HEADERS):
+        self.app = app
+        self.trust_client_headers = trust_client_headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        client_id = (
+            headers.get("x-client-id", "").strip()[:64]
+            if self.trust_client_headers
+            else ""
+        )
+        if not client_id:
+            client = scope.get("client")
+            client_id = PEER_PREFIX + client[0] if client else ANONYMOUS_CLIENT
+        client_token = client_id_var.set(client_id)
+        priority_token = priority_var.set(
+            parse_priority(headers.get("x-priority"), self.trust_client_headers)
+        )
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            client_id_var.reset(client_token)
+            priority_var.reset(priority_token)
@@ -0,0 +1,21 @@
+from typing import Any, Dict, Optional
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class PydanticJSONResponse(JSONResponse):
+    """pydantic モデルをそのまま JSON バイト列にするレスポンス
+
+    FastAPI の既定の処理（dict 化 → jsonable_encoder → json.dumps）を経由せず、
+    pydantic のシリアライザで1回だけ変換する。モデル以外は通常の JSONResponse と同じ。
+    include を指定すると、そのフィールドだけを直列化する。
+    """
+
+    def __init__(self, content: Any, include: Optional[Dict] = None, **kwargs):
+        self.include = include
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json(include=self.include).encode("utf-8")
+        return super().render(content)
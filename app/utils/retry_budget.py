@@ -0,0 +1,67 @@
+import threading
+import time
+from typing import Callable, Dict
+
+
+class RetryBudget:
+    """サービス全体のリトライ回数をリクエスト数の一定割合までに抑える予算
+
+    リクエストごとに ratio 分、時間経過で毎秒 min_per_second 分のリトライ枠が貯まり、
+    リトライのたびに1つ使う（上限は capacity）。障害時にリトライが負荷を増幅するのを防ぐ。
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.1,
+        min_per_second: float = 0.2,
+        capacity: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if ratio < 0 or min_per_second < 0 or capacity < 1:
+            raise ValueError("invalid retry budget")
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.exhausted = 0
+
+    def _refill(self, amount: float = 0.0):
+        now = self._clock()
+        elapsed = max(0.0, now - self._updated_at)
+        self._updated_at = now
+        self._tokens = min(
+            self.capacity, self._tokens + elapsed * self.min_per_second + amount
+        )
+
+    def record_request(self):
+        """最初の試行（リトライ以外）を記録"""
+        with self._lock:
+            self.requests += 1
+            self._refill(self.ratio)
+
+    def try_retry(self) -> bool:
+        """リトライしてよければ枠を1つ使って True"""
+        with self._lock:
+            self._refill()
+            # ratio の積み上げの丸め誤差を許容する
+            if self._tokens >= 1 - 1e-9:
+                self._tokens = max(0.0, self._tokens - 1)
+                self.retries += 1
+                return True
+            self.exhausted += 1
+            return False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._refill()
+            return {
+                "available": round(self._tokens, 2),
+                "requests": self.requests,
+                "retries": self.retries,
+                "exhausted": self.exhausted,
+            }
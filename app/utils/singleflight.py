@@ -0,0 +1,55 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Mapping, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# リクエストキーから除外するパラメータ（APIキーなど結果に影響しないもの）
+IGNORED_PARAMS = frozenset({"key"})
+
+
+def make_request_key(url: str, params: Optional[Mapping[str, Any]] = None) -> Tuple:
+    """URLとパラメータ（APIキーを除く）からリクエストキーを作成"""
+    items = tuple(
+        sorted(
+            (name, str(value))
+            for name, value in (params or {}).items()
+            if name not in IGNORED_PARAMS
+        )
+    )
+    return (url, items)
+
+
+class SingleFlight:
+    """同じキーの同時実行を1回にまとめる（single-flight）
+
+    実行中の呼び出しがあれば新たに実行せず、その結果（または例外）を共有する。
+    処理は独立したタスクで動くため、呼び出し元の1つがキャンセルされても他には影響しない。
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """key の処理を実行（実行中なら相乗り）して結果を返す"""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.shared += 1
+            logger.debug(f"🤝 Joined in-flight request: {key}")
+
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # 全員がキャンセル済みでも例外が未取得の警告を出さない
+        if not task.cancelled():
+            task.exception()
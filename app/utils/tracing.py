@@ -0,0 +1,297 @@
+import json
+import random
+import re
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import TRACING_ENABLED, TRACING_SAMPLE_RATE
+from app.utils.metrics import route_label
+import logging
+
+logger = logging.getLogger(__name__)
+
+# W3C Trace Context の traceparent（version-trace_id-parent_id-flags）
+_TRACEPARENT_PATTERN = re.compile(
+    r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(-.*)?$"
+)
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+# flags の sampled ビット
+SAMPLED_FLAG = 0x01
+
+# 呼び出し元から引き継いだトレースの文脈 (trace_id, parent_id, sampled)
+RemoteContext = Tuple[str, str, bool]
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[RemoteContext]:
+    """traceparent ヘッダーを解析（不正な値は None）"""
+    if not value:
+        return None
+    match = _TRACEPARENT_PATTERN.match(value.strip().lower())
+    if match is None:
+        return None
+    version, trace_id, parent_id, flags, rest = match.groups()
+    # ff は不正なバージョン、00 なら後ろに続きがあってはならない
+    if version == "ff" or (version == "00" and rest):
+        return None
+    if trace_id == _INVALID_TRACE_ID or parent_id == _INVALID_SPAN_ID:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & SAMPLED_FLAG)
+
+
+def format_traceparent(trace_id: str, span_id: str, sampled: bool) -> str:
+    return f"00-{trace_id}-{span_id}-{'01' if sampled else '00'}"
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits) or 1:0{bits // 4}x}"
+
+
+class Span:
+    """処理1つ分の区間（with で囲んだ間、現在のスパンになる）
+
+    sampled でないスパンは属性を記録せず出力もしないが、IDは子と上流に引き継ぐ。
+    """
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "kind",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "sampled",
+        "attributes",
+        "status",
+        "start_time",
+        "duration",
+        "_started",
+        "_token",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        kind: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        sampled: bool,
+        attributes: Dict[str, Any],
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes = attributes if sampled else {}
+        self.status = "unset"
+        self.start_time = 0.0
+        self.duration: Optional[float] = None
+        self._started = 0.0
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any):
+        if self.sampled:
+            self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any):
+        if self.sampled:
+            self.attributes.update(attributes)
+
+    def set_status(self, status: str):
+        self.status = status
+
+    def traceparent(self) -> str:
+        """このスパンを親として上流に渡す traceparent"""
+        return format_traceparent(self.trace_id, self.span_id, self.sampled)
+
+    def __enter__(self) -> "Span":
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self._token = current_span_var.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._started
+        current_span_var.reset(self._token)
+        if exc_type is not None:
+            self.status = "error"
+            self.set_attribute("error.type", exc_type.__name__)
+        elif self.status == "unset":
+            self.status = "ok"
+        if self.sampled:
+            self.tracer.export(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """トレースが無効な時のスパン（何もしない）"""
+
+    __slots__ = ()
+
+    sampled = False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes: Any):
+        pass
+
+    def set_status(self, status: str):
+        pass
+
+    def traceparent(self) -> None:
+        return None
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+# 現在のスパン（子スパンの親と、上流に渡す traceparent になる）
+current_span_var: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span():
+    """現在のスパン（なければ何もしないスパン）"""
+    return current_span_var.get() or NOOP_SPAN
+
+
+def clear_current_span():
+    """現在のスパンをなくす（リクエストとは独立したバックグラウンド処理用）"""
+    current_span_var.set(None)
+
+
+class LoggingExporter:
+    """終わったスパンを1行のJSONでログに出す"""
+
+    def __init__(self, logger_name: str = "app.tracing"):
+        self.logger = logging.getLogger(logger_name)
+
+    def export(self, span: Span):
+        self.logger.info(json.dumps(span.to_dict(), ensure_ascii=False, default=str))
+
+
+class InMemoryExporter:
+    """終わったスパンをメモリに保持する（テスト・デバッグ用、古いものから捨てる）"""
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+
+    def export(self, span: Span):
+        self.spans.append(span)
+
+    def find(self, name: str) -> List[Span]:
+        return [span for span in self.spans if span.name == name]
+
+    def clear(self):
+        self.spans.clear()
+
+
+class Tracer:
+    """スパンの生成とサンプリング（OpenTelemetry のトレースを簡略化したもの）
+
+    ルートのスパンは sample_rate の割合で記録する。呼び出し元から traceparent を
+    受け取った場合はその sampled フラグに従い、子スパンは親の判定を引き継ぐ。
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        sample_rate: float = 1.0,
+        exporter=None,
+    ):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.exporter = exporter or LoggingExporter()
+
+    def span(
+        self,
+        name: str,
+        kind: str = "internal",
+        remote: Optional[RemoteContext] = None,
+        **attributes: Any,
+    ):
+        """現在のスパン（なければ remote）を親とするスパンを作る"""
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = current_span_var.get()
+        if parent is not None:
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+        elif remote is not None:
+            trace_id, parent_id, sampled = remote
+        else:
+            trace_id, parent_id = _new_id(128), None
+            sampled = random.random() < self.sample_rate
+        return Span(self, name, kind, trace_id, parent_id, sampled, attributes)
+
+    def export(self, span: Span):
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to export span {span.name}: {e}")
+
+
+# アプリケーション全体のトレーサー
+TRACER = Tracer(enabled=TRACING_ENABLED, sample_rate=TRACING_SAMPLE_RATE)
+
+
+class TracingMiddleware:
+    """HTTPリクエストごとにサーバースパンを作るASGIミドルウェア
+
+    traceparent ヘッダーがあればそのトレースを引き継ぎ、レスポンスの traceresponse
+    ヘッダーでこのリクエストのスパンを返す（ログとの突き合わせ用）。
+    """
+
+    def __init__(self, app: ASGIApp, tracer: Optional[Tracer] = None):
+        self.app = app
+        self.tracer = tracer or TRACER
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        remote = parse_traceparent(Headers(scope=scope).get("traceparent"))
+        with self.tracer.span(
+            scope["method"], kind="server", remote=remote, **{"http.method": scope["method"]}
+        ) as span:
+
+            async def send_wrapper(message: Message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status("error")
+                    MutableHeaders(scope=message)["traceresponse"] = span.traceparent()
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # ルーティング後にテンプレートが分かるので名前は最後に決める
+                route = route_label(scope)
+                span.name = f"{scope['method']} {route}"
+                span.set_attribute("http.route", route)
@@ -0,0 +1,93 @@
+"""チャットページのデコード・直列化コストのベンチマーク
+
+200件のメッセージを含むページ1枚あたりのCPU時間を、
+従来の経路（json.loads → model_validate → response_model で再検証 → json.dumps）と
+高速経路（model_validate_json → model_dump_json）で比較する。
+
+    python -m benchmarks.bench_chat_page
+"""
+
+import json
+import timeit
+from pydantic import TypeAdapter
+from app.models.youtube import LiveChatMessageListResponse
+
+MESSAGES_PER_PAGE = 200
+ROUNDS = 200
+
+
+def make_page(count: int = MESSAGES_PER_PAGE) -> bytes:
+    """YouTube API 形式のダミーページ（バイト列）を作る"""
+    items = [
+        {
+            "kind": "youtube#liveChatMessage",
+            "etag": f"etag_{i}",
+            "id": f"message_id_{i:06d}",
+            "snippet": {
+                "type": "textMessageEvent",
+                "liveChatId": "bench_chat_id",
+                "authorChannelId": f"UC_author_{i % 40}",
+                "publishedAt": "2026-01-01T00:00:00.000000+00:00",
+                "hasDisplayContent": True,
+                "displayMessage": f"こんにちは！メッセージ {i} です 🎉",
+                "textMessageDetails": {"messageText": f"こんにちは！メッセージ {i} です 🎉"},
+            },
+            "authorDetails": {
+                "channelId": f"UC_author_{i % 40}",
+                "channelUrl": f"http://www.youtube.com/channel/UC_author_{i % 40}",
+                "displayName": f"視聴者{i % 40}",
+                "profileImageUrl": f"https://yt3.ggpht.com/author_{i % 40}.jpg",
+                "isVerified": False,
+                "isChatOwner": False,
+                "isChatSponsor": i % 7 == 0,
+                "isChatModerator": False,
+            },
+        }
+        for i in range(count)
+    ]
+    page = {
+        "kind": "youtube#liveChatMessageListResponse",
+        "etag": "bench_etag",
+        "pollingIntervalMillis": 5000,
+        "pageInfo": {"totalResults": count, "resultsPerPage": count},
+        "nextPageToken": "GO_next_token",
+        "items": items,
+    }
+    return json.dumps(page, ensure_ascii=False).encode("utf-8")
+
+
+# FastAPI の response_model 処理に相当するアダプター
+_response_adapter = TypeAdapter(LiveChatMessageListResponse)
+
+
+def legacy_path(raw: bytes) -> bytes:
+    """従来の経路: デコード → 検証 → 再検証 → 直列化"""
+    model = LiveChatMessageListResponse.model_validate(json.loads(raw))
+    validated = _response_adapter.validate_python(model.model_dump())
+    content = _response_adapter.dump_python(validated, mode="json")
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def fast_path(raw: bytes) -> bytes:
+    """高速経路: バイト列から1回で検証し、そのまま直列化"""
+    model = LiveChatMessageListResponse.model_validate_json(raw)
+    return model.model_dump_json().encode("utf-8")
+
+
+def main():
+    raw = make_page()
+    assert json.loads(legacy_path(raw)) == json.loads(fast_path(raw))
+
+    print(f"page: {MESSAGES_PER_PAGE} messages, {len(raw) / 1024:.1f} KiB")
+    results = {}
+    for name, fn in (("legacy", legacy_path), ("fast", fast_path)):
+        best = min(timeit.repeat(lambda: fn(raw), number=ROUNDS, repeat=5)) / ROUNDS
+        results[name] = best
+        print(f"{name:>8}: {best * 1000:.3f} ms/page")
+    print(f" speedup: {results['legacy'] / results['fast']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
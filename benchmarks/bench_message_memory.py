@@ -0,0 +1,77 @@
+"""チャット履歴のメモリ使用量のベンチマーク
+
+LiveChatMessageItem をそのまま保持した場合と CompactMessage で保持した場合の
+メモリ使用量（tracemalloc で計測）を比較する。
+
+    python -m benchmarks.bench_message_memory [件数（既定 1000000）]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+from typing import Callable, List
+from app.models.compact import CompactMessageCodec
+from app.models.youtube import LiveChatMessageItem
+
+AUTHORS = 2000
+
+
+def make_item(i: int) -> LiveChatMessageItem:
+    """ダミーのチャットメッセージ（作者は AUTHORS 人で使い回す）"""
+    author = f"UCx{i % AUTHORS:021d}"
+    return LiveChatMessageItem.model_validate(
+        {
+            "kind": "youtube#liveChatMessage",
+            "etag": f"eTaG{i:024d}",
+            "id": f"LCC.CjgKDQoLbGl2ZV9jaGF0EicKJUNO{i:012d}",
+            "snippet": {
+                "type": "textMessageEvent",
+                "liveChatId": "KicKGFVDeDAwMDAwMDAwMDAwMDAwMDAwMDAwMBILbGl2ZV9jaGF0",
+                "authorChannelId": author,
+                "publishedAt": f"2026-01-01T12:{i // 60 % 60:02d}:{i % 60:02d}.000000+00:00",
+                "hasDisplayContent": True,
+                "displayMessage": f"コメント {i} です",
+            },
+            "authorDetails": {
+                "channelId": author,
+                "displayName": f"視聴者{i % AUTHORS}",
+                "profileImageUrl": f"https://yt3.ggpht.com/ytc/{author}=s64-c-k-c0x00ffffff-no-rj",
+                "isVerified": False,
+            },
+        }
+    )
+
+
+def measure(name: str, count: int, build: Callable[[int], object]) -> int:
+    """count 件を保持した時に増えたメモリ量を計測"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    held: List[object] = [build(i) for i in range(count)]
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:>8}: {size / 1024 / 1024:8.1f} MiB "
+        f"({size / count:6.1f} B/message, built in {elapsed:.1f}s)"
+    )
+    del held
+    gc.collect()
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"messages: {count:,}, authors: {AUTHORS:,}")
+
+    full = measure("pydantic", count, make_item)
+
+    codec = CompactMessageCodec()
+    compact = measure("compact", count, lambda i: codec.pack(make_item(i)))
+
+    print(f"   ratio: {full / compact:.2f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -74,3 +74,19 @@ def mock_empty_response():
         "pollingIntervalMillis": 5000,
         "items": [],
     }
+
+
+class FakeClock:
+    """テスト用の時計（now を書き換えて時間を進める）"""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """テスト用の時計（0秒から始まる）"""
+    return FakeClock()
@@ -0,0 +1,65 @@
+"""テストで共有するデータの組み立て"""
+
+from unittest.mock import AsyncMock, Mock
+from app.models.youtube import LiveChatMessageItem, LiveChatMessageListResponse
+from app.services.poller import LiveChatPollerManager
+
+
+def chat_message(
+    message_id: str,
+    published_at: str = "2024-01-01T12:00:00.000Z",
+    author: str = "UC_author",
+    display_name: str = "テストユーザー",
+    text: str = None,
+    **author_details,
+) -> dict:
+    """テスト用のチャットメッセージ（APIのレスポンスの形）"""
+    return {
+        "kind": "youtube#liveChatMessage",
+        "etag": f"etag_{message_id}",
+        "id": message_id,
+        "snippet": {
+            "type": "textMessageEvent",
+            "liveChatId": "chat_id_123",
+            "authorChannelId": author,
+            "publishedAt": published_at,
+            "hasDisplayContent": True,
+            "displayMessage": f"message {message_id}" if text is None else text,
+        },
+        "authorDetails": {
+            "channelId": author,
+            "displayName": display_name,
+            "profileImageUrl": "https://yt3.ggpht.com/test_avatar.jpg",
+            **author_details,
+        },
+    }
+
+
+def make_item(index: int) -> LiveChatMessageItem:
+    """テスト用のチャットメッセージ（1秒ごと）"""
+    return LiveChatMessageItem.model_validate(
+        chat_message(
+            f"m{index:04d}",
+            published_at=f"2024-01-01T12:{index // 60:02d}:{index % 60:02d}.000Z",
+            text=f"message {index}",
+        )
+    )
+
+
+def make_ending_poller_manager(message_ids):
+    """1ページ返したあとチャット終了するポーラー管理"""
+    page = LiveChatMessageListResponse.model_validate(
+        {
+            "kind": "youtube#liveChatMessageListResponse",
+            "etag": "page_etag",
+            "nextPageToken": "next",
+            "pollingIntervalMillis": 0,
+            "pageInfo": {"totalResults": 0, "resultsPerPage": 0},
+            "items": [chat_message(i) for i in message_ids],
+        }
+    )
+    service = Mock()
+    service.get_chat_messages = AsyncMock(
+        side_effect=[page, Exception("YouTube API Error: liveChatEnded")]
+    )
+    return LiveChatPollerManager(service, buffer_size=10)
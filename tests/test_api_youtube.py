@@ -3,6 +3,7 @@ from fastapi.testclient import TestClient
 from unittest.mock import patch, Mock
 from app.main import app
 from app.models.youtube import LiveChatMessageListResponse
+from tests.helpers import chat_message, make_ending_poller_manager
 
 
 client = TestClient(app)
@@ -24,7 +25,7 @@ def mock_youtube_api_response():
 class TestYouTubeAPI:
     """YouTube API エンドポイントのテスト"""
 
-    @patch("app.api.youtube.youtube_service")
+    @patch("app.api.youtube.youtube_service", autospec=True)
     def test_get_livechat_success(self, mock_service, mock_youtube_api_response):
         """GET /api/youtube/livechat 成功のテスト"""
         # モックレスポンスを作成
@@ -54,7 +55,7 @@ class TestYouTubeAPI:
         data = response.json()
         assert "無効な動画ID" in data["detail"]
 
-    @patch("app.api.youtube.youtube_service")
+    @patch("app.api.youtube.youtube_service", autospec=True)
     def test_get_livechat_no_live_chat(self, mock_service):
         """ライブチャットが存在しない場合のテスト"""
         mock_service.get_live_chat_id.return_value = None
@@ -65,7 +66,7 @@ class TestYouTubeAPI:
         data = response.json()
         assert "ライブ配信が見つからない" in data["detail"]
 
-    @patch("app.api.youtube.youtube_service")
+    @patch("app.api.youtube.youtube_service", autospec=True)
     def test_post_livechat_success(self, mock_service, mock_youtube_api_response):
         """POST /api/youtube/livechat 成功のテスト"""
         mock_response = LiveChatMessageListResponse.model_validate(
@@ -117,7 +118,7 @@ class TestYouTubeAPI:
         response = client.get("/api/youtube/livechat?video_id=")
         assert response.status_code == 400
 
-    @patch("app.api.youtube.youtube_service")
+    @patch("app.api.youtube.youtube_service", autospec=True)
     def test_youtube_api_error(self, mock_service):
         """YouTube APIエラーのテスト"""
         from app.utils.exceptions import YouTubeAPIError
@@ -131,7 +132,7 @@ class TestYouTubeAPI:
         # エラーハンドリングによってステータスコードが決まる
         assert response.status_code in [429, 500]  # クォータエラーは429か500
 
-    @patch("app.api.youtube.youtube_service")
+    @patch("app.api.youtube.youtube_service", autospec=True)
     def test_with_page_token(self, mock_service, mock_youtube_api_response):
         """ページトークン付きのテスト"""
         mock_response = LiveChatMessageListResponse.model_validate(
@@ -151,7 +152,7 @@ class TestYouTubeAPI:
             "chat_id_123", "testtoken"
         )
 
-    @patch("app.api.youtube.youtube_service")
+    @patch("app.api.youtube.youtube_service", autospec=True)
     def test_cors_headers(self, mock_service):
         """CORSヘッダーのテスト"""
         # モックを設定してエラーを避ける
@@ -165,7 +166,7 @@ class TestYouTubeAPI:
         # CORSヘッダーが設定されてることを確認
         assert "access-control-allow-origin" in response.headers
 
-    @patch("app.api.youtube.youtube_service")
+    @patch("app.api.youtube.youtube_service", autospec=True)
     def test_sanitize_page_token(self, mock_service, mock_youtube_api_response):
         """ページトークンのサニタイズテスト"""
         mock_response = LiveChatMessageListResponse.model_validate(
@@ -187,7 +188,7 @@ class TestYouTubeAPI:
             "chat_id_123", "tokenscript"  # 危険な文字が除去される
         )
 
-    @patch("app.api.youtube.youtube_service")
+    @patch("app.api.youtube.youtube_service", autospec=True)
     def test_long_video_id(self, mock_service):
         """長すぎる動画IDのテスト"""
         long_video_id = "a" * 15  # 15文字（11文字を超える）
@@ -210,3 +211,244 @@ class TestYouTubeAPI:
 
         # OPTIONSリクエストが適切に処理される
         assert response.status_code in [200, 204]
+
+
+class TestLiveChatStream:
+    """SSEストリーミングエンドポイントのテスト"""
+
+    @patch("app.services.poller.POLLER_MIN_INTERVAL", 0)
+    @patch("app.api.youtube.youtube_service", autospec=True)
+    def test_stream_messages(self, mock_service):
+        """メッセージがSSEイベントとして届き、チャット終了で閉じる"""
+        mock_service.get_live_chat_id.return_value = "chat_id_123"
+        manager = make_ending_poller_manager(["m1", "m2"])
+
+        with patch("app.api.youtube.poller_manager", manager):
+            with client.stream(
+                "GET", "/api/youtube/livechat/stream?video_id=dQw4w9WgXcQ"
+            ) as response:
+                assert response.status_code == 200
+                assert response.headers["content-type"].startswith(
+                    "text/event-stream"
+                )
+                body = "".join(response.iter_text())
+
+        assert "id: m1\nevent: message\n" in body
+        assert "id: m2\nevent: message\n" in body
+        assert body.rstrip().endswith("event: end\ndata: {}")
+        assert manager.pollers == {}
+
+    @patch("app.services.poller.POLLER_MIN_INTERVAL", 0)
+    @patch("app.api.youtube.youtube_service", autospec=True)
+    def test_stream_with_filter(self, mock_service):
+        """SSEでも絞り込み・射影ができる"""
+        mock_service.get_live_chat_id.return_value = "chat_id_123"
+        manager = make_ending_poller_manager(["m1", "m2"])
+
+        with patch("app.api.youtube.poller_manager", manager):
+            with client.stream(
+                "GET",
+                "/api/youtube/livechat/stream",
+                params={"video_id": "dQw4w9WgXcQ", "q": "m2", "fields": "id"},
+            ) as response:
+                body = "".join(response.iter_text())
+
+        assert "id: m1\n" not in body
+        assert 'id: m2\nevent: message\ndata: {"id":"m2"}\n' in body
+
+    def test_stream_invalid_video_id(self):
+        """無効な動画IDは400"""
+        response = client.get("/api/youtube/livechat/stream?video_id=short")
+        assert response.status_code == 400
+
+    @patch("app.api.youtube.youtube_service", autospec=True)
+    def test_stream_no_live_chat(self, mock_service):
+        """ライブチャットがなければ404"""
+        mock_service.get_live_chat_id.return_value = None
+
+        response = client.get("/api/youtube/livechat/stream?video_id=dQw4w9WgXcQ")
+        assert response.status_code == 404
+
+
+class TestLiveChatBatch:
+    """一括取得エンドポイントのテスト"""
+
+    @patch("app.api.youtube.youtube_service", autospec=True)
+    def test_batch_chat_ids(self, mock_service):
+        """動画ごとのライブチャットIDを返す"""
+        mock_service.get_live_chat_ids.return_value = {
+            "dQw4w9WgXcQ": "chat_id_123",
+            "jNQXAC9IVRw": None,
+        }
+
+        response = client.post(
+            "/api/youtube/livechat/batch",
+            json={"video_ids": ["dQw4w9WgXcQ", "jNQXAC9IVRw"]},
+        )
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert results["dQw4w9WgXcQ"]["live_chat_id"] == "chat_id_123"
+        assert results["jNQXAC9IVRw"]["live_chat_id"] is None
+        assert results["jNQXAC9IVRw"]["error"]
+        mock_service.get_chat_messages.assert_not_called()
+
+    @patch("app.api.youtube.youtube_service", autospec=True)
+    def test_batch_with_messages(self, mock_service, mock_youtube_api_response):
+        """include_messages でメッセージも取得する"""
+        mock_service.get_live_chat_ids.return_value = {"dQw4w9WgXcQ": "chat_id_123"}
+        mock_service.get_chat_messages.return_value = (
+            LiveChatMessageListResponse.model_validate(mock_youtube_api_response)
+        )
+
+        response = client.post(
+            "/api/youtube/livechat/batch",
+            json={"video_ids": ["dQw4w9WgXcQ"], "include_messages": True},
+        )
+
+        assert response.status_code == 200
+        result = response.json()["results"]["dQw4w9WgXcQ"]
+        assert result["messages"]["nextPageToken"] == "CAoQAA"
+        mock_service.get_chat_messages.assert_called_once_with("chat_id_123")
+
+    def test_batch_invalid_video_id(self):
+        """無効な動画IDを含むと422"""
+        response = client.post(
+            "/api/youtube/livechat/batch", json={"video_ids": ["short"]}
+        )
+        assert response.status_code == 422
+
+
+class TestPollTooEarly:
+    """早すぎるポーリングのテスト"""
+
+    @patch("app.api.youtube.youtube_service", autospec=True)
+    def test_returns_304_with_next_poll_time(self, mock_service):
+        """304と次のポーリング時刻を返す"""
+        from app.utils.exceptions import PollTooEarlyError
+
+        mock_service.get_live_chat_id.return_value = "chat_id_123"
+        mock_service.get_chat_messages.side_effect = PollTooEarlyError(2.5)
+
+        response = client.get(
+            "/api/youtube/livechat?video_id=dQw4w9WgXcQ&page_token=testtoken"
+        )
+
+        assert response.status_code == 304
+        assert response.headers["Retry-After"] == "3"
+        assert response.headers["X-Poll-After-Millis"] == "2500"
+
+
+class TestConditionalRequests:
+    """ETag / If-None-Match のテスト"""
+
+    @patch("app.api.youtube.youtube_service", autospec=True)
+    def test_etag_header(self, mock_service, mock_youtube_api_response):
+        """レスポンスにETagが付く"""
+        mock_service.get_live_chat_id.return_value = "chat_id_123"
+        mock_service.get_chat_messages.return_value = (
+            LiveChatMessageListResponse.model_validate(mock_youtube_api_response)
+        )
+
+        response = client.get("/api/youtube/livechat?video_id=dQw4w9WgXcQ")
+
+        assert response.status_code == 200
+        assert response.headers["ETag"] == '"dummy_etag"'
+
+    @patch("app.api.youtube.youtube_service", autospec=True)
+    def test_not_modified(self, mock_service, mock_youtube_api_response):
+        """If-None-Match が一致すれば304"""
+        mock_service.get_live_chat_id.return_value = "chat_id_123"
+        mock_service.get_chat_messages.return_value = (
+            LiveChatMessageListResponse.model_validate(mock_youtube_api_response)
+        )
+
+        response = client.get(
+            "/api/youtube/livechat?video_id=dQw4w9WgXcQ",
+            headers={"If-None-Match": '"other", "dummy_etag"'},
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+
+        response = client.post(
+            "/api/youtube/livechat",
+            json={"video_id": "dQw4w9WgXcQ"},
+            headers={"If-None-Match": 'W/"dummy_etag"'},
+        )
+        assert response.status_code == 304
+
+
+class TestLiveChatFiltering:
+    """絞り込み・フィールド射影のテスト"""
+
+    @pytest.fixture
+    def page(self, mock_youtube_api_response):
+        items = [chat_message(f"m{i}") for i in range(3)]
+        items[1]["snippet"]["type"] = "superChatEvent"
+        items[2]["snippet"]["authorChannelId"] = "UC_other"
+        return LiveChatMessageListResponse.model_validate(
+            {**mock_youtube_api_response, "items": items}
+        )
+
+    @patch("app.api.youtube.youtube_service", autospec=True)
+    def test_fields_projection(self, mock_service, page):
+        """fields で指定したフィールドだけを返す（ページ情報は残る）"""
+        mock_service.get_live_chat_id.return_value = "chat_id_123"
+        mock_service.get_chat_messages.return_value = page
+
+        response = client.get(
+            "/api/youtube/livechat",
+            params={
+                "video_id": "dQw4w9WgXcQ",
+                "fields": "snippet.displayMessage,authorDetails.displayName",
+            },
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["nextPageToken"] == "CAoQAA"
+        assert data["items"][0] == {
+            "snippet": {"displayMessage": "message m0"},
+            "authorDetails": {"displayName": "テストユーザー"},
+        }
+        assert response.headers["ETag"] != '"dummy_etag"'
+
+    @patch("app.api.youtube.youtube_service", autospec=True)
+    def test_type_and_author_filters(self, mock_service, page):
+        """type・author_id で絞り込み、元のページは変更しない"""
+        mock_service.get_live_chat_id.return_value = "chat_id_123"
+        mock_service.get_chat_messages.return_value = page
+
+        response = client.get(
+            "/api/youtube/livechat",
+            params={
+                "video_id": "dQw4w9WgXcQ",
+                "type": "superChatEvent,textMessageEvent",
+                "author_id": "UC_author",
+            },
+        )
+
+        assert [item["id"] for item in response.json()["items"]] == ["m0", "m1"]
+        assert len(page.items) == 3
+
+    @patch("app.api.youtube.youtube_service", autospec=True)
+    def test_post_keyword_filter(self, mock_service, page):
+        """POST でもキーワードで絞り込める"""
+        mock_service.get_live_chat_id.return_value = "chat_id_123"
+        mock_service.get_chat_messages.return_value = page
+
+        response = client.post(
+            "/api/youtube/livechat",
+            json={"video_id": "dQw4w9WgXcQ", "q": "M2", "fields": ["id"]},
+        )
+
+        assert response.json()["items"] == [{"id": "m2"}]
+
+    def test_unknown_field(self):
+        """存在しないフィールドは400"""
+        response = client.get(
+            "/api/youtube/livechat",
+            params={"video_id": "dQw4w9WgXcQ", "fields": "snippet.unknown"},
+        )
+
+        assert response.status_code == 400
@@ -0,0 +1,220 @@
+import asyncio
+import os
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch, Mock
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.youtube import LiveChatMessageItem
+from app.services.archive import ArchiveSegment, ChatArchive, ChatArchiver, to_micros
+from tests.helpers import make_item
+
+
+client = TestClient(app)
+
+
+def at(index: int) -> int:
+    """make_item(index) の publishedAt（マイクロ秒）"""
+    return to_micros(datetime(2024, 1, 1, 12, index // 60, index % 60, tzinfo=timezone.utc))
+
+
+def ids(records):
+    return [record.id for record in records]
+
+
+class TestChatArchive:
+    """ChatArchiveのテスト"""
+
+    @pytest.fixture
+    def archive(self, tmp_path):
+        archive = ChatArchive(str(tmp_path), segment_max_bytes=4096, index_interval=4)
+        archive.append([make_item(i) for i in range(50)])
+        yield archive
+        archive.close()
+
+    def test_read_all_in_order(self, archive):
+        """保存した順に読み出せ、本文は公開モデルのJSON"""
+        records, has_more = archive.read(limit=1000)
+
+        assert ids(records) == [f"m{i:04d}" for i in range(50)]
+        assert not has_more
+        assert LiveChatMessageItem.model_validate_json(records[7].payload) == make_item(7)
+
+    def test_segments_rotate(self, archive):
+        """セグメントが上限サイズで切り替わる"""
+        assert len(archive.segments) > 1
+
+    def test_duplicates_are_skipped(self, archive):
+        """保存済みのメッセージは追記しない"""
+        assert archive.append([make_item(49), make_item(50)]) == 1
+        assert archive.count == 51
+
+    def test_time_range(self, archive):
+        """since 以上 until 未満の範囲を返す"""
+        records, _ = archive.read(since=at(10), until=at(20))
+
+        assert ids(records) == [f"m{i:04d}" for i in range(10, 20)]
+
+    def test_after_id_and_limit(self, archive):
+        """after_id の次から limit 件返し、続きがあることを示す"""
+        records, has_more = archive.read(after_id="m0030", limit=5)
+
+        assert ids(records) == [f"m{i:04d}" for i in range(31, 36)]
+        assert has_more
+
+    def test_unknown_after_id(self, archive):
+        """アーカイブにない after_id は KeyError"""
+        with pytest.raises(KeyError):
+            archive.read(after_id="unknown")
+
+    def test_reopen_rebuilds_index_and_truncates_torn_record(self, archive, tmp_path):
+        """再オープン時にインデックスを再構築し、書きかけのレコードを切り詰める"""
+        archive.close()
+        last_segment = archive.segments[-1].path
+        with open(last_segment, "ab") as f:
+            f.write(b"\x10\x00\x00")
+
+        reopened = ChatArchive(str(tmp_path), segment_max_bytes=4096, index_interval=4)
+
+        assert reopened.count == 50
+        assert ids(reopened.read(since=at(45))[0]) == [f"m{i:04d}" for i in range(45, 50)]
+        assert reopened.append([make_item(10)]) == 0
+        assert os.path.getsize(last_segment) == reopened.segments[-1].size
+        reopened.close()
+
+
+    def test_find_with_hash_collisions(self, tmp_path):
+        """メッセージIDのハッシュが衝突しても正しいレコードを返す"""
+        with patch("app.services.archive.zlib.crc32", return_value=7):
+            archive = ChatArchive(str(tmp_path), segment_max_bytes=4096, index_interval=4)
+            archive.append([make_item(i) for i in range(10)])
+            archive.segments[-1].save_index()
+
+            records, _ = archive.read(after_id="m0003", limit=2)
+            archive.close()
+
+        assert ids(records) == ["m0004", "m0005"]
+
+    def test_reopen_reads_saved_index(self, archive, tmp_path):
+        """閉じる時に保存したインデックスを使い、再オープン時にセグメントを全件走査しない"""
+        archive.close()
+        scanned = []
+        records = ArchiveSegment._records
+
+        def counting_records(view, file_size, offset):
+            for end, record in records(view, file_size, offset):
+                scanned.append(record.id)
+                yield end, record
+
+        with patch.object(ArchiveSegment, "_records", staticmethod(counting_records)):
+            reopened = ChatArchive(
+                str(tmp_path), segment_max_bytes=4096, index_interval=4, recent_ids=2
+            )
+            assert reopened.count == 50
+            # 直近のIDを読む末尾のブロックだけ
+            assert len(scanned) <= 4
+            records, _ = reopened.read(after_id="m0030", limit=2)
+
+        assert ids(records) == ["m0031", "m0032"]
+        assert reopened.append([make_item(49)]) == 0
+        reopened.close()
+
+
+class TestChatArchiver:
+    """ChatArchiverのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_used(self, tmp_path):
+        """max_open を超えたら最近使っていないアーカイブを閉じ、次に使う時に読み直す"""
+        archiver = ChatArchiver(str(tmp_path), max_open=2)
+        for chat in ("chat_a", "chat_b", "chat_c"):
+            await archiver.append(chat, [make_item(i) for i in range(3)])
+
+        assert list(archiver._archives) == ["chat_b", "chat_c"]
+
+        records, _ = await archiver.read("chat_a")
+        assert ids(records) == ["m0000", "m0001", "m0002"]
+        assert list(archiver._archives) == ["chat_c", "chat_a"]
+
+        archiver.close()
+        assert not archiver._archives
+
+    @pytest.mark.asyncio
+    async def test_video_links_persisted(self, tmp_path):
+        """動画ID → liveChatId の対応は追加した順にファイルへ書き、再起動後も引ける"""
+        archiver = ChatArchiver(str(tmp_path))
+        await asyncio.gather(
+            archiver.link_video("video_1", "chat_a"),
+            archiver.link_video("video_2", "chat_b"),
+        )
+        await archiver.link_video("video_1", "chat_c")
+
+        reopened = ChatArchiver(str(tmp_path))
+        assert reopened.live_chat_id_for("video_1") == "chat_c"
+        assert reopened.live_chat_id_for("video_2") == "chat_b"
+
+    @pytest.mark.asyncio
+    async def test_archive_in_use_is_not_closed(self, tmp_path):
+        archiver = ChatArchiver(str(tmp_path), max_open=1)
+        await archiver.append("chat_a", [make_item(0)])
+
+        async with archiver._open("chat_a") as in_use:
+            # chat_a は使用中なので、上限を超えた分は使い終わった chat_b の方を閉じる
+            await archiver.append("chat_b", [make_item(1)])
+            assert list(archiver._archives) == ["chat_a"]
+            assert archiver._archives["chat_a"] is in_use
+
+        assert (await archiver.read("chat_b"))[0][0].id == "m0001"
+        archiver.close()
+
+
+class TestLiveChatHistoryAPI:
+    """GET /api/youtube/livechat/history のテスト"""
+
+    @pytest.fixture
+    def archiver(self, tmp_path):
+        archiver = ChatArchiver(str(tmp_path))
+        asyncio.run(archiver.link_video("dQw4w9WgXcQ", "chat_id_123"))
+        return archiver
+
+    @pytest.mark.asyncio
+    async def test_history_from_archive(self, archiver):
+        """アーカイブからAPIを呼ばずに履歴を返す"""
+        await archiver.append("chat_id_123", [make_item(i) for i in range(10)])
+        service = Mock(archiver=archiver)
+
+        with patch("app.api.youtube.youtube_service", service):
+            response = client.get(
+                "/api/youtube/livechat/history",
+                params={
+                    "video_id": "dQw4w9WgXcQ",
+                    "since": "2024-01-01T12:00:02Z",
+                    "limit": 3,
+                },
+            )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["live_chat_id"] == "chat_id_123"
+        assert [item["id"] for item in data["items"]] == ["m0002", "m0003", "m0004"]
+        assert data["next_after_id"] == "m0004"
+        assert data["has_more"] is True
+        service.get_live_chat_id.assert_not_called()
+
+    def test_history_not_archived(self, archiver):
+        """アーカイブがないチャットは404"""
+        with patch("app.api.youtube.youtube_service", Mock(archiver=archiver)):
+            response = client.get(
+                "/api/youtube/livechat/history", params={"live_chat_id": "other"}
+            )
+
+        assert response.status_code == 404
+
+    def test_history_disabled(self):
+        """アーカイブ無効時は404"""
+        with patch("app.api.youtube.youtube_service", Mock(archiver=None)):
+            response = client.get(
+                "/api/youtube/livechat/history", params={"live_chat_id": "chat_id_123"}
+            )
+
+        assert response.status_code == 404
@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from app.utils.batching import MicroBatcher
+
+
+class TestMicroBatcher:
+    """MicroBatcherのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_batches_concurrent_keys(self):
+        """同時に届いたキーを1回の処理にまとめる"""
+        calls = []
+
+        async def handler(keys):
+            calls.append(keys)
+            return {key: key.upper() for key in keys}
+
+        batcher = MicroBatcher(handler, window=0.001)
+
+        results = await asyncio.gather(
+            batcher.submit("a"), batcher.submit("b"), batcher.submit("a")
+        )
+
+        assert results == ["A", "B", "A"]
+        assert calls == [["a", "b"]]
+
+    @pytest.mark.asyncio
+    async def test_flush_task_is_kept_until_done(self):
+        """実行中のフラッシュは参照を保持し、終われば手放す"""
+        release = asyncio.Event()
+
+        async def handler(keys):
+            await release.wait()
+            return {key: key for key in keys}
+
+        batcher = MicroBatcher(handler, window=0.001)
+        pending = asyncio.ensure_future(batcher.submit("a"))
+        await asyncio.sleep(0.01)
+
+        assert len(batcher._flushes) == 1
+
+        release.set()
+        assert await pending == "a"
+        await asyncio.sleep(0)
+        assert not batcher._flushes
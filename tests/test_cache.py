@@ -0,0 +1,61 @@
+import pytest
+from app.utils.cache import TTLCache, MISSING
+
+
+class TestTTLCache:
+    """TTLCacheのテスト"""
+
+    def test_get_and_set(self):
+        """保存した値を取得できる"""
+        cache = TTLCache(max_size=2, ttl=10)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert cache.get("b") is MISSING
+
+    def test_none_value_is_cached(self):
+        """None も値としてキャッシュできる（ネガティブキャッシュ）"""
+        cache = TTLCache(max_size=2, ttl=10)
+        cache.set("a", None)
+        assert cache.get("a") is None
+
+    def test_expiration(self, clock):
+        """TTLを過ぎたエントリは取得できない"""
+        cache = TTLCache(max_size=2, ttl=10, clock=clock)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=1)
+
+        clock.now = 5
+        assert cache.get("a") == 1
+        assert cache.get("b") is MISSING
+
+        clock.now = 11
+        assert cache.get("a") is MISSING
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        """上限を超えると最も古く参照されたエントリが削除される"""
+        cache = TTLCache(max_size=2, ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is MISSING
+        assert cache.get("c") == 3
+
+    def test_invalidate_where(self):
+        """条件に一致するエントリを削除できる"""
+        cache = TTLCache(max_size=4, ttl=10)
+        cache.set("v1", "chat1")
+        cache.set("v2", "chat1")
+        cache.set("v3", "chat2")
+
+        assert cache.invalidate_where(lambda _, v: v == "chat1") == 2
+        assert cache.get("v3") == "chat2"
+        assert len(cache) == 1
+
+    def test_invalid_max_size(self):
+        """max_size が0以下ならエラー"""
+        with pytest.raises(ValueError):
+            TTLCache(max_size=0)
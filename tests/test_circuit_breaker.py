@@ -0,0 +1,210 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.youtube import YouTubeService
+from app.utils.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from app.utils.concurrency import AIMDLimiter
+from app.utils.exceptions import (
+    UpstreamError,
+    UpstreamUnavailableError,
+    handle_youtube_api_error,
+)
+
+
+class TestCircuitBreaker:
+    """CircuitBreakerのテスト"""
+
+    def test_opens_after_consecutive_failures(self, clock):
+        """連続した失敗で open になり、呼び出しを断る"""
+        breaker = CircuitBreaker("videos", failure_threshold=3, recovery_timeout=10, clock=clock)
+
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        clock.now = 4
+        with pytest.raises(UpstreamUnavailableError) as exc_info:
+            breaker.before_call()
+        assert exc_info.value.retry_after == pytest.approx(6)
+
+    def test_half_open_trial(self, clock):
+        """回復待ちのあとは1件だけ試行し、成功すれば closed に戻る"""
+        breaker = CircuitBreaker("videos", failure_threshold=1, recovery_timeout=10, clock=clock)
+        breaker.record_failure()
+
+        clock.now = 10
+        assert breaker.state == HALF_OPEN
+        breaker.before_call()
+        with pytest.raises(UpstreamUnavailableError):
+            breaker.before_call()
+
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        breaker.before_call()
+
+    def test_half_open_failure_reopens(self, clock):
+        """試行が失敗すれば再び open になる"""
+        breaker = CircuitBreaker("videos", failure_threshold=1, recovery_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        breaker.before_call()
+
+        breaker.record_failure()
+
+        assert breaker.state == OPEN
+        assert breaker.stats()["opened"] == 2
+
+    def test_release_returns_trial(self, clock):
+        """結果なしで終わった試行の枠は返却される"""
+        breaker = CircuitBreaker("videos", failure_threshold=1, recovery_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        breaker.before_call()
+
+        breaker.release()
+
+        breaker.before_call()
+
+    def test_maps_to_503(self):
+        error = handle_youtube_api_error(UpstreamUnavailableError("circuit open", 2.5))
+
+        assert error.status_code == 503
+        assert error.headers["Retry-After"] == "3"
+
+
+class TestAIMDLimiter:
+    """AIMDLimiterのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_additive_increase(self):
+        """上限いっぱいで速い成功が続くと上限が増える"""
+        limiter = AIMDLimiter(initial_limit=2, max_limit=4)
+
+        async def work():
+            async with limiter.slot():
+                await asyncio.sleep(0)
+
+        for _ in range(10):
+            await asyncio.gather(work(), work())
+
+        assert limiter.limit > 2
+        assert limiter.limit <= 4
+
+    @pytest.mark.asyncio
+    async def test_multiplicative_decrease(self, clock):
+        """失敗や遅い応答で上限を半分にする"""
+        limiter = AIMDLimiter(initial_limit=8, latency_threshold=1.0, clock=clock)
+
+        limiter.on_failure()
+        assert limiter.limit == 4
+
+        async with limiter.slot():
+            clock.now += 5
+        assert limiter.limit == 2
+
+        for _ in range(5):
+            clock.now += 1
+            limiter.on_failure()
+        assert limiter.limit == 1
+
+    @pytest.mark.asyncio
+    async def test_burst_of_failures_decreases_once(self, clock):
+        """同時に失敗した呼び出しでは上限を1回だけ下げる"""
+        limiter = AIMDLimiter(initial_limit=16, decrease_window=1.0, clock=clock)
+
+        async def failing():
+            async with limiter.slot():
+                await asyncio.sleep(0)
+                limiter.on_failure()
+
+        await asyncio.gather(*(failing() for _ in range(8)))
+        assert limiter.limit == 8
+
+        clock.now += 1
+        limiter.on_failure()
+        assert limiter.limit == 4
+
+    @pytest.mark.asyncio
+    async def test_rejects_instead_of_queueing(self):
+        """上限に達して max_wait 内に空かなければ断る"""
+        limiter = AIMDLimiter(initial_limit=1, max_wait=0.01)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+
+        with pytest.raises(UpstreamUnavailableError, match="concurrency limit"):
+            async with limiter.slot():
+                pass
+        assert limiter.stats() == {"limit": 1, "inflight": 1, "rejected": 1}
+
+        release.set()
+        await holder
+        assert limiter.inflight == 0
+
+
+class TestYouTubeServiceCircuitBreaker:
+    """上流の不調時のサービスの動作"""
+
+    @pytest.fixture
+    def service(self):
+        service = YouTubeService()
+        service.circuit_breakers.options.update(failure_threshold=2, recovery_timeout=60)
+        service._wait_for_rate_limit = AsyncMock()
+        service.client.get_raw_with_retry = AsyncMock(
+            side_effect=UpstreamError("Request failed after 3 retries: timeout")
+        )
+        return service
+
+    @pytest.mark.asyncio
+    async def test_fails_fast_when_open(self, service):
+        """失敗が続くと上流を呼ばずに失敗する"""
+        for _ in range(2):
+            with pytest.raises(UpstreamError):
+                await service.get_chat_messages("chat_id")
+
+        with pytest.raises(UpstreamUnavailableError):
+            await service.get_chat_messages("chat_id")
+        assert service.client.get_raw_with_retry.call_count == 2
+        assert service.circuit_breakers.stats()["liveChat/messages"]["state"] == OPEN
+
+    @pytest.mark.asyncio
+    async def test_serves_stale_when_open(self, service):
+        """open の間は直近のレスポンスを返す"""
+        body = json.dumps({"items": [{"id": "video_1", "liveStreamingDetails": {}}]}).encode()
+        service.client.get_stale = lambda url, params: body
+        breaker = service.circuit_breakers.get("videos")
+        breaker.record_failure()
+        breaker.record_failure()
+
+        assert await service.get_live_chat_id("video_1") is None
+        service.client.get_raw_with_retry.assert_not_called()
+
+
+class TestUpstreamEndpoint:
+    """GET /api/youtube/upstream"""
+
+    @patch("app.api.youtube.DEBUG", True)
+    def test_upstream_stats(self):
+        response = TestClient(app).get("/api/youtube/upstream")
+
+        assert response.status_code == 200
+        assert {"pool", "circuit_breakers", "concurrency", "retry_budget"} == set(
+            response.json()
+        )
+
+    def test_hidden_outside_debug(self):
+        """開発・ステージング以外では返さない"""
+        assert TestClient(app).get("/api/youtube/upstream").status_code == 404
@@ -0,0 +1,69 @@
+from app.models.compact import CompactMessageCodec, InternTable
+from app.models.youtube import LiveChatMessageItem
+from tests.helpers import chat_message
+
+
+def make_item(message_id: str, author: str = "UC_author", **details) -> LiveChatMessageItem:
+    """テスト用のチャットメッセージ（投稿者ごとに名前とアイコンが変わる）"""
+    return LiveChatMessageItem.model_validate(
+        chat_message(
+            message_id,
+            author=author,
+            display_name=f"ユーザー {author}",
+            text=f"message {message_id} 🎉",
+            profileImageUrl=f"https://yt3.ggpht.com/{author}.jpg",
+            **details,
+        )
+    )
+
+
+class TestInternTable:
+    """InternTableのテスト"""
+
+    def test_same_value_same_index(self):
+        """同じ値は同じ番号になる"""
+        table = InternTable()
+
+        assert table.intern(("a", 1)) == 0
+        assert table.intern(("b", 2)) == 1
+        assert table.intern(("a", 1)) == 0
+        assert table[1] == ("b", 2)
+        assert len(table) == 2
+
+
+class TestCompactMessageCodec:
+    """CompactMessageCodecのテスト"""
+
+    def test_round_trip_is_lossless(self):
+        """公開モデルに戻すと元と同じ内容になる"""
+        codec = CompactMessageCodec()
+        item = make_item("m1", isVerified=True)
+
+        restored = codec.unpack(codec.pack(item))
+
+        assert restored == item
+        assert restored.model_dump_json() == item.model_dump_json()
+
+    def test_optional_verified_none_is_preserved(self):
+        """isVerified が null でも区別して保持する"""
+        codec = CompactMessageCodec()
+        item = make_item("m1", isVerified=None)
+
+        assert codec.unpack(codec.pack(item)).authorDetails.isVerified is None
+
+    def test_authors_and_context_are_shared(self):
+        """同じ作者・チャットのメッセージはテーブルを共有する"""
+        codec = CompactMessageCodec()
+        messages = [
+            codec.pack(make_item(f"m{i}", author=f"UC_{i % 3}")) for i in range(30)
+        ]
+
+        assert len(codec.authors) == 3
+        assert len(codec.contexts) == 1
+        assert messages[0].author == messages[3].author
+
+    def test_compact_message_has_no_dict(self):
+        """__slots__ で属性辞書を持たない"""
+        message = CompactMessageCodec().pack(make_item("m1"))
+
+        assert not hasattr(message, "__dict__")
@@ -0,0 +1,119 @@
+import zlib
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from app.utils.compression import (
+    CompressionMiddleware,
+    GzipEncoder,
+    available_encodings,
+    negotiate_encoding,
+)
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/large")
+    async def large():
+        return JSONResponse(
+            {"items": ["https://yt3.ggpht.com/avatar.jpg"] * 100},
+            headers={"ETag": '"page"'},
+        )
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def events():
+            for i in range(3):
+                yield f"data: {i}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+class TestNegotiateEncoding:
+    """Accept-Encoding の解釈のテスト"""
+
+    @pytest.mark.parametrize(
+        "header, expected",
+        [
+            ("gzip, deflate", "gzip"),
+            ("br;q=1.0, gzip;q=0.5, zstd", "zstd"),
+            ("gzip;q=0, br", "br"),
+            ("*", "zstd"),
+            ("identity", None),
+            ("", None),
+        ],
+    )
+    def test_negotiate(self, header, expected):
+        assert negotiate_encoding(header, ["zstd", "br", "gzip"]) == expected
+
+    def test_unavailable_encoding_is_skipped(self):
+        """サーバーが対応していない方式は選ばない"""
+        assert negotiate_encoding("br, gzip;q=0.1", ["gzip"]) == "gzip"
+
+
+class TestGzipEncoder:
+    """GzipEncoderのテスト"""
+
+    def test_flush_makes_chunk_decodable(self):
+        """フラッシュした分だけで展開できる"""
+        encoder = GzipEncoder()
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        first = encoder.compress(b"data: 1\n\n") + encoder.flush()
+        assert decoder.decompress(first) == b"data: 1\n\n"
+
+        second = encoder.compress(b"data: 2\n\n") + encoder.finish()
+        assert decoder.decompress(second) == b"data: 2\n\n"
+
+
+class TestCompressionMiddleware:
+    """CompressionMiddlewareのテスト"""
+
+    @pytest.fixture
+    def client(self):
+        return TestClient(make_app())
+
+    def test_large_json_is_compressed(self, client):
+        """しきい値以上のJSONは圧縮され、ETagは弱いETagになる"""
+        response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["etag"] == 'W/"page"'
+        assert int(response.headers["content-length"]) < 500
+        assert len(response.json()["items"]) == 100
+
+    def test_small_json_is_not_compressed(self, client):
+        """しきい値未満はそのまま"""
+        response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
+        assert response.json() == {"ok": True}
+
+    def test_identity(self, client):
+        """圧縮を受け付けないクライアントにはそのまま返す"""
+        response = client.get("/large", headers={"Accept-Encoding": "identity"})
+
+        assert "content-encoding" not in response.headers
+
+    def test_stream_is_compressed_per_chunk(self, client):
+        """ストリーミングはチャンクごとに展開できる形で送る"""
+        with client.stream(
+            "GET", "/stream", headers={"Accept-Encoding": "gzip"}
+        ) as response:
+            assert response.headers["content-encoding"] == "gzip"
+            assert "content-length" not in response.headers
+            body = "".join(response.iter_text())
+
+        assert body == "data: 0\n\ndata: 1\n\ndata: 2\n\n"
+
+    def test_gzip_is_always_available(self):
+        assert "gzip" in available_encodings()
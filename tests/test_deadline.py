@@ -0,0 +1,277 @@
+import asyncio
+import httpx
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.youtube import YouTubeService
+from app.utils.deadline import (
+    cap_timeout,
+    check_deadline,
+    clear_deadline,
+    set_deadline,
+    time_remaining,
+)
+from app.utils.exceptions import (
+    DeadlineExceededError,
+    UpstreamError,
+    UpstreamUnavailableError,
+    handle_youtube_api_error,
+)
+from app.utils.http_client import RateLimitedHTTPClient
+from app.utils.retry_budget import RetryBudget
+
+
+def make_client(handler, max_retries: int = 3, budget: RetryBudget = None):
+    client = RateLimitedHTTPClient(max_retries=max_retries, base_delay=0)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    if budget is not None:
+        client.retry_budget = budget
+    return client
+
+
+class TestDeadline:
+    """リクエストの期限のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_no_deadline(self):
+        assert time_remaining() is None
+        assert check_deadline() is None
+        assert cap_timeout(10) == 10
+
+    @pytest.mark.asyncio
+    async def test_keeps_earlier_deadline(self):
+        """既により早い期限があればそちらを使う"""
+        set_deadline(1)
+        set_deadline(60)
+
+        assert 0 < time_remaining() <= 1
+        assert cap_timeout(10) <= 1
+
+        clear_deadline()
+        assert time_remaining() is None
+
+    @pytest.mark.asyncio
+    async def test_expired(self):
+        set_deadline(0)
+
+        with pytest.raises(DeadlineExceededError):
+            check_deadline()
+
+    def test_maps_to_504(self):
+        assert handle_youtube_api_error(DeadlineExceededError()).status_code == 504
+
+
+class TestRetryBudget:
+    """RetryBudgetのテスト"""
+
+    def test_ratio_of_requests(self, clock):
+        """リトライはリクエスト数の ratio 割合まで"""
+        budget = RetryBudget(ratio=0.1, min_per_second=0, capacity=1, clock=clock)
+        assert budget.try_retry()
+        assert not budget.try_retry()
+
+        for _ in range(10):
+            budget.record_request()
+
+        assert budget.try_retry()
+        assert not budget.try_retry()
+        assert budget.stats()["exhausted"] == 2
+
+    def test_refills_over_time(self, clock):
+        """時間経過でも少しずつ枠が貯まる（上限は capacity）"""
+        budget = RetryBudget(ratio=0, min_per_second=0.5, capacity=2, clock=clock)
+        budget.try_retry()
+        budget.try_retry()
+
+        clock.now = 2
+        assert budget.try_retry()
+        assert not budget.try_retry()
+
+        clock.now = 100
+        assert budget.stats()["available"] == 2
+
+
+class TestHTTPClientDeadline:
+    """HTTPクライアントの期限とリトライ予算"""
+
+    @pytest.mark.asyncio
+    async def test_budget_stops_retries(self, clock):
+        """予算がなければリトライせずに失敗する"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(503)
+
+        budget = RetryBudget(ratio=0, min_per_second=0, capacity=1, clock=clock)
+        client = make_client(handler, budget=budget)
+
+        with pytest.raises(UpstreamError, match="retry budget exhausted"):
+            await client.get_raw_with_retry("https://example.com")
+        assert len(calls) == 2
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_deadline_stops_backoff(self):
+        """期限を過ぎる待機はせずに DeadlineExceededError"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(429, headers={"Retry-After": "30"})
+
+        client = make_client(handler)
+        set_deadline(5)
+
+        with pytest.raises(DeadlineExceededError):
+            await client.get_raw_with_retry("https://example.com")
+        assert len(calls) == 1
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_attempt_timeout_capped(self):
+        """1回の試行のタイムアウトを期限までの残りで切り詰める"""
+        seen = []
+
+        def handler(request):
+            seen.append(request.extensions["timeout"]["read"])
+            return httpx.Response(200, json={})
+
+        client = make_client(handler)
+        set_deadline(2)
+
+        await client.get_raw_with_retry("https://example.com")
+        assert seen[0] <= 2
+        await client.close()
+
+
+class TestSharedCallDeadline:
+    """相乗りした呼び出しの期限"""
+
+    @pytest.mark.asyncio
+    async def test_each_caller_keeps_its_own_deadline(self):
+        """最初の呼び出し元の期限が切れても、期限のない相乗りは結果を受け取る"""
+        service = YouTubeService()
+        service._wait_for_rate_limit = AsyncMock()
+        upstream_deadlines = []
+
+        async def slow_get(url, params):
+            upstream_deadlines.append(time_remaining())
+            await asyncio.sleep(0.1)
+            return json.dumps({"items": []}).encode()
+
+        service.client.get_raw_with_retry = AsyncMock(side_effect=slow_get)
+
+        async def fetch(timeout):
+            if timeout is not None:
+                set_deadline(timeout)
+            return await service.get_live_chat_ids(["dQw4w9WgXcQ"])
+
+        hurried = asyncio.create_task(fetch(0.02))
+        await asyncio.sleep(0)
+        patient = asyncio.create_task(fetch(None))
+
+        with pytest.raises(DeadlineExceededError):
+            await hurried
+        assert await patient == {"dQw4w9WgXcQ": None}
+        # 上流への呼び出しは1回で、最初の呼び出し元の期限は引き継がない
+        assert upstream_deadlines == [None]
+
+    @pytest.mark.asyncio
+    async def test_batched_callers_keep_their_own_deadlines(self):
+        """マイクロバッチにまとめられても、最初の呼び出し元の期限は他に及ばない"""
+        service = YouTubeService()
+        service._wait_for_rate_limit = AsyncMock()
+        service.live_chat_id_batcher.window = 0.01
+        upstream = []
+
+        async def slow_get(url, params):
+            upstream.append((params["id"], time_remaining()))
+            await asyncio.sleep(0.1)
+            return json.dumps({"items": []}).encode()
+
+        service.client.get_raw_with_retry = AsyncMock(side_effect=slow_get)
+
+        async def fetch(video_id, timeout):
+            if timeout is not None:
+                set_deadline(timeout)
+            return await service.get_live_chat_id(video_id)
+
+        hurried = asyncio.create_task(fetch("video_a", 0.05))
+        patient = asyncio.create_task(fetch("video_b", None))
+
+        with pytest.raises(DeadlineExceededError):
+            await hurried
+        assert await patient is None
+        # 1回の呼び出しにまとめられ、その呼び出しに期限はない
+        assert upstream == [("video_a,video_b", None)]
+
+
+class TestConcurrencySlotDeadline:
+    """同時実行枠の待ちと期限"""
+
+    @pytest.mark.asyncio
+    async def test_expired_deadline_is_not_503(self):
+        """枠を待つ前に期限が切れていれば上流を呼ばずに DeadlineExceededError"""
+        service = YouTubeService()
+        service._wait_for_rate_limit = AsyncMock()
+        service.client.get_raw_with_retry = AsyncMock()
+        set_deadline(0.01)
+        await asyncio.sleep(0.02)
+
+        with pytest.raises(DeadlineExceededError):
+            await service._fetch_with_keys("videos", "url", {}, ())
+        service.client.get_raw_with_retry.assert_not_called()
+        assert service.concurrency.rejected == 0
+
+    @pytest.mark.asyncio
+    async def test_wait_capped_by_deadline(self):
+        """枠が空かないまま期限で待ちを打ち切った時は 504 になる"""
+        service = YouTubeService()
+        service._wait_for_rate_limit = AsyncMock()
+        service.client.get_raw_with_retry = AsyncMock()
+        service.concurrency.max_wait = 5.0
+        service.concurrency.inflight = service.concurrency.limit
+        set_deadline(0.05)
+
+        with pytest.raises(DeadlineExceededError):
+            await service._fetch_with_keys("videos", "url", {}, ())
+        service.client.get_raw_with_retry.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_full_without_deadline_is_503(self):
+        """期限より先に設定の最大待機秒数が尽きた時はこれまで通り 503"""
+        service = YouTubeService()
+        service._wait_for_rate_limit = AsyncMock()
+        service.concurrency.max_wait = 0.01
+        service.concurrency.inflight = service.concurrency.limit
+        set_deadline(5.0)
+
+        with pytest.raises(UpstreamUnavailableError):
+            await service._fetch_with_keys("videos", "url", {}, ())
+
+
+class TestRouteDeadline:
+    """ルートからサービスへの期限の引き継ぎ"""
+
+    def test_deadline_reaches_service(self):
+        """X-Request-Timeout で期限を短くでき、サービスから見える"""
+        seen = []
+
+        async def fake_get_live_chat_id(video_id):
+            seen.append(time_remaining())
+            raise DeadlineExceededError()
+
+        with patch(
+            "app.api.youtube.youtube_service.get_live_chat_id",
+            side_effect=fake_get_live_chat_id,
+        ):
+            response = TestClient(app).get(
+                "/api/youtube/livechat?video_id=dQw4w9WgXcQ",
+                headers={"X-Request-Timeout": "3"},
+            )
+
+        assert response.status_code == 504
+        assert 0 < seen[0] <= 3
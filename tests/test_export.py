@@ -0,0 +1,128 @@
+import json
+import pytest
+from unittest.mock import patch, AsyncMock, Mock
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.youtube import LiveChatMessageListResponse
+from app.services.archive import ChatArchiver
+from app.services.export import ChatExporter, iter_upstream
+from app.services.message_filter import MessageFilter
+from app.utils.exceptions import PollTooEarlyError
+from tests.helpers import make_item
+
+
+client = TestClient(app)
+
+
+def make_page(indexes, next_page_token):
+    """テスト用のチャットページ"""
+    return LiveChatMessageListResponse.model_validate(
+        {
+            "kind": "youtube#liveChatMessageListResponse",
+            "etag": "page_etag",
+            "nextPageToken": next_page_token,
+            "pollingIntervalMillis": 0,
+            "pageInfo": {"totalResults": len(indexes), "resultsPerPage": 200},
+            "items": [make_item(i).model_dump() for i in indexes],
+        }
+    )
+
+
+@pytest.fixture
+def upstream_service():
+    """2ページ分のメッセージを返し、3ページ目で最新に追いつくサービス"""
+    service = Mock(archiver=None)
+    service.get_live_chat_id = AsyncMock(return_value="chat_id_123")
+    service.get_chat_messages = AsyncMock(
+        side_effect=[
+            make_page([0, 1], "t1"),
+            PollTooEarlyError(0),
+            make_page([2], "t2"),
+            make_page([], "t3"),
+        ]
+    )
+    return service
+
+
+class TestIterUpstream:
+    """nextPageToken をたどる取得のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_walks_pages_until_caught_up(self, upstream_service):
+        """早すぎる場合は待って再試行し、空ページで止まる"""
+        chunks = [
+            [item.id for item in items]
+            async for items in iter_upstream(upstream_service, "chat_id_123")
+        ]
+
+        assert chunks == [["m0000", "m0001"], ["m0002"]]
+        assert upstream_service.get_chat_messages.call_args_list[-1].args == (
+            "chat_id_123",
+            "t2",
+        )
+
+
+class TestChatExporter:
+    """ChatExporterのテスト"""
+
+    def test_csv_columns_from_fields(self):
+        """CSV の列は fields で指定できる"""
+        exporter = ChatExporter(
+            "csv", MessageFilter(fields=["id", "snippet.displayMessage"])
+        )
+
+        assert exporter.header() == "\ufeffid,snippet.displayMessage\r\n"
+        assert exporter.encode([make_item(1)]) == "m0001,message 1\r\n"
+
+
+class TestLiveChatExportAPI:
+    """GET /api/youtube/livechat/export のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_ndjson_from_archive(self, tmp_path):
+        """アーカイブがあればAPIを使わずに全件を1行ずつ返す"""
+        archiver = ChatArchiver(str(tmp_path))
+        await archiver.link_video("dQw4w9WgXcQ", "chat_id_123")
+        await archiver.append("chat_id_123", [make_item(i) for i in range(7)])
+        service = Mock(archiver=archiver)
+
+        with patch("app.api.youtube.youtube_service", service), patch(
+            "app.api.youtube.EXPORT_CHUNK_SIZE", 3
+        ):
+            response = client.get(
+                "/api/youtube/livechat/export", params={"video_id": "dQw4w9WgXcQ"}
+            )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = response.text.splitlines()
+        assert [json.loads(line)["id"] for line in lines] == [
+            f"m{i:04d}" for i in range(7)
+        ]
+        service.get_chat_messages.assert_not_called()
+
+    def test_csv_from_upstream(self, upstream_service):
+        """アーカイブがなければページをたどって CSV を返す"""
+        with patch("app.api.youtube.youtube_service", upstream_service):
+            response = client.get(
+                "/api/youtube/livechat/export",
+                params={"video_id": "dQw4w9WgXcQ", "format": "csv"},
+            )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert 'filename="livechat-dQw4w9WgXcQ.csv"' in response.headers[
+            "content-disposition"
+        ]
+        rows = response.text.lstrip("\ufeff").splitlines()
+        assert rows[0].startswith("id,snippet.publishedAt")
+        assert [row.split(",")[0] for row in rows[1:]] == ["m0000", "m0001", "m0002"]
+
+    def test_invalid_format(self):
+        """未対応の形式は422"""
+        response = client.get(
+            "/api/youtube/livechat/export",
+            params={"video_id": "dQw4w9WgXcQ", "format": "xml"},
+        )
+
+        assert response.status_code == 422
@@ -0,0 +1,186 @@
+import httpx
+from unittest.mock import patch
+import pytest
+from app.utils.exceptions import QuotaExceededError
+from app.utils.http_client import RateLimitedHTTPClient
+
+
+def make_client(handler, max_retries: int = 2) -> RateLimitedHTTPClient:
+    """MockTransport を使うクライアントを作成"""
+    client = RateLimitedHTTPClient(max_retries=max_retries, base_delay=0)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+class TestRateLimitedHTTPClient:
+    """非同期HTTPクライアントのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_get_success(self):
+        """正常なレスポンスを辞書で返す"""
+        client = make_client(lambda request: httpx.Response(200, json={"ok": True}))
+
+        assert await client.get_with_retry("https://example.com") == {"ok": True}
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_retry_on_rate_limit(self):
+        """429のあとに成功すればリトライで回復する"""
+        responses = iter(
+            [
+                httpx.Response(429, headers={"Retry-After": "0"}),
+                httpx.Response(200, json={"items": []}),
+            ]
+        )
+        client = make_client(lambda request: next(responses))
+
+        assert await client.get_with_retry("https://example.com") == {"items": []}
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_retry_exhausted(self):
+        """リトライ上限に達したら例外"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(500)
+
+        client = make_client(handler, max_retries=1)
+
+        with pytest.raises(Exception, match="Request failed after 1 retries"):
+            await client.get_with_retry("https://example.com")
+        assert len(calls) == 2
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_youtube_error_body(self):
+        """エラーボディはYouTube APIエラーとして扱う"""
+        client = make_client(
+            lambda request: httpx.Response(
+                200, json={"error": {"code": 400, "message": "bad request"}}
+            )
+        )
+
+        with pytest.raises(Exception, match="YouTube API Error: bad request"):
+            await client.get_with_retry("https://example.com")
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_conditional_request_reuses_body(self):
+        """ETagを送り、304なら前回の本文を返す"""
+        seen = []
+
+        def handler(request):
+            seen.append(request.headers.get("If-None-Match"))
+            if len(seen) == 1:
+                return httpx.Response(200, json={"etag": "abc", "items": [1]})
+            return httpx.Response(304)
+
+        client = make_client(handler)
+        params = {"id": "x", "key": "k1"}
+
+        first = await client.get_with_retry("https://example.com", params)
+        second = await client.get_with_retry(
+            "https://example.com", {"id": "x", "key": "k2"}
+        )
+
+        assert first == second == {"etag": "abc", "items": [1]}
+        assert seen == [None, '"abc"']
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_quota_exceeded_not_retried(self):
+        """403のクォータ超過はリトライせずに QuotaExceededError"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(
+                403,
+                json={
+                    "error": {
+                        "code": 403,
+                        "message": "The request cannot be completed.",
+                        "errors": [{"reason": "quotaExceeded"}],
+                    }
+                },
+            )
+
+        client = make_client(handler)
+
+        with pytest.raises(QuotaExceededError):
+            await client.get_with_retry("https://example.com")
+        assert len(calls) == 1
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_get_stale(self):
+        """直近の本文をAPIキーに関係なく取り出せる"""
+        client = make_client(
+            lambda request: httpx.Response(200, json={"etag": "abc", "items": []})
+        )
+
+        assert client.get_stale("https://example.com", {"id": "x"}) is None
+        await client.get_raw_with_retry("https://example.com", {"id": "x", "key": "k1"})
+
+        assert client.get_stale("https://example.com", {"id": "x"}) == b'{"etag":"abc","items":[]}'
+        await client.close()
+
+
+class TestConnectionPool:
+    """コネクションプールの設定と統計"""
+
+    def test_limits_and_http2_fallback(self):
+        """プールの設定を反映し、h2 がなければ HTTP/1.1 にする"""
+        limits = httpx.Limits(max_connections=7, max_keepalive_connections=3)
+        with patch("app.utils.http_client.h2", None):
+            client = RateLimitedHTTPClient(limits=limits, http2=True)
+
+        assert client.http2 is False
+        stats = client.pool_stats()
+        assert stats["max_connections"] == 7
+        assert stats["max_keepalive_connections"] == 3
+        assert "connections" not in stats
+
+    @pytest.mark.asyncio
+    async def test_pool_snapshot(self):
+        """生成済みのプールのコネクション数を返す"""
+        client = RateLimitedHTTPClient()
+        client.session
+
+        stats = client.pool_stats()
+
+        assert stats["connections"] == 0
+        assert stats["queued_requests"] == 0
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_pool_wait_tracer(self):
+        """最初の trace イベントまでを空き待ち時間として記録する"""
+        client = RateLimitedHTTPClient()
+        trace = client._pool_wait_tracer()
+
+        await trace("connection.connect_tcp.started", {})
+        await trace("connection.connect_tcp.complete", {})
+
+        stats = client.pool_stats()
+        assert stats["requests"] == 1
+        assert stats["wait_max"] >= 0
+
+    @pytest.mark.asyncio
+    async def test_warmup(self):
+        """指定した本数だけ HEAD を送り、失敗は無視する"""
+        methods = []
+
+        def handler(request):
+            methods.append(request.method)
+            if len(methods) == 1:
+                raise httpx.ConnectError("boom")
+            return httpx.Response(404)
+
+        client = make_client(handler)
+
+        assert await client.warmup("https://example.com", 3) == 2
+        assert methods == ["HEAD", "HEAD", "HEAD"]
+        await client.close()
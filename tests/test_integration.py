@@ -12,7 +12,7 @@ class TestIntegration:
 
     def test_cors_headers(self):
         """CORSヘッダーのテスト"""
-        with patch("app.api.youtube.youtube_service") as mock_service:
+        with patch("app.api.youtube.youtube_service", autospec=True) as mock_service:
             mock_service.get_live_chat_id.return_value = None
 
             response = client.get(
@@ -51,7 +51,7 @@ class TestIntegration:
 
     def test_request_logging_flow(self):
         """リクエストログの流れをテスト"""
-        with patch("app.api.youtube.youtube_service") as mock_service:
+        with patch("app.api.youtube.youtube_service", autospec=True) as mock_service:
             mock_service.get_live_chat_id.return_value = None
 
             # ログが出力されることを間接的に確認
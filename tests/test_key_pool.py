@@ -0,0 +1,166 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import json
+import pytest
+from unittest.mock import AsyncMock
+from app.services.key_pool import ApiKeyPool, quota_cost
+from app.services.youtube import YouTubeService
+from app.utils.exceptions import (
+    QuotaExceededError,
+    RateLimitExceededError,
+    handle_youtube_api_error,
+)
+
+
+PACIFIC = ZoneInfo("America/Los_Angeles")
+# 太平洋時間 2025-01-01 12:00（リセットまで12時間）
+NOON = datetime(2025, 1, 1, 12, tzinfo=PACIFIC).timestamp()
+
+
+@pytest.fixture
+def clock(clock):
+    """正午から始まる時計"""
+    clock.now = NOON
+    return clock
+
+
+def make_pool(clock, keys, daily_quota: int = 100):
+    return ApiKeyPool(keys, daily_quota=daily_quota, clock=clock)
+
+
+class TestApiKeyPool:
+    """ApiKeyPoolのテスト"""
+
+    def test_quota_cost(self):
+        """エンドポイントごとのコスト"""
+        assert quota_cost("videos") == 1
+        assert quota_cost("liveChat/messages") == 5
+        assert quota_cost("unknown") == 1
+
+    def test_least_used_selection(self, clock):
+        """消費量が少ないキーから順に使う"""
+        pool = make_pool(clock, ["key_a", "key_b"])
+
+        keys = [pool.acquire(5).key for _ in range(4)]
+
+        assert keys == ["key_a", "key_b", "key_a", "key_b"]
+        assert [state.used for state in pool.keys] == [10, 10]
+
+    def test_weighted_by_quota(self, clock):
+        """クォータの大きいキーほど多く使う"""
+        pool = make_pool(clock, ["key_a:300", "key_b:100"])
+
+        keys = [pool.acquire(1).key for _ in range(8)]
+
+        assert keys.count("key_a") == 6
+        assert keys.count("key_b") == 2
+
+    def test_bench_and_rotate(self, clock):
+        """休止中のキーは使わず、全キーが使えなければ QuotaExceededError"""
+        pool = make_pool(clock, ["key_a", "key_b"])
+        pool.bench(pool.acquire(1))
+
+        assert pool.acquire(1).key == "key_b"
+        pool.bench(pool.keys[1])
+
+        with pytest.raises(QuotaExceededError) as exc_info:
+            pool.acquire(1)
+        assert exc_info.value.retry_after == pytest.approx(12 * 3600)
+
+    def test_exhausted_by_estimate(self, clock):
+        """推定消費量がクォータに達したキーは使わない"""
+        pool = make_pool(clock, ["key_a"], daily_quota=10)
+        pool.acquire(5)
+        pool.acquire(5)
+
+        with pytest.raises(QuotaExceededError):
+            pool.acquire(1)
+
+    def test_reset_at_pacific_midnight(self, clock):
+        """太平洋時間の0時に消費量と休止がリセットされる"""
+        pool = make_pool(clock, ["key_a"])
+        pool.bench(pool.acquire(5))
+
+        clock.now = NOON + 12 * 3600
+        state = pool.acquire(5)
+
+        assert state.used == 5
+        assert pool.stats()[0]["benched"] is False
+
+    def test_stats_masks_keys(self, clock):
+        """統計ではキーを伏せる"""
+        pool = make_pool(clock, ["AIzaSyABCDEFGHIJ"])
+        pool.acquire(5)
+
+        stats = pool.stats()
+
+        assert stats == [
+            {
+                "key": "AIza…GHIJ",
+                "used": 5,
+                "remaining": 95,
+                "daily_quota": 100,
+                "requests": 1,
+                "benched": False,
+            }
+        ]
+
+    def test_quota_error_maps_to_429(self):
+        """リセットまでの秒数を Retry-After にする"""
+        error = handle_youtube_api_error(QuotaExceededError(retry_after=12.3))
+
+        assert error.status_code == 429
+        assert error.headers["Retry-After"] == "13"
+
+
+class TestYouTubeServiceKeyRotation:
+    """クォータ超過時のキーの切り替え"""
+
+    @pytest.fixture
+    def service(self, clock):
+        pool = make_pool(clock, ["key_a", "key_b"])
+        service = YouTubeService(key_pool=pool)
+        service._wait_for_rate_limit = AsyncMock()
+        service.client.get_raw_with_retry = AsyncMock()
+        return service
+
+    @pytest.mark.asyncio
+    async def test_rotates_on_quota_exceeded(self, service):
+        """クォータ超過のキーを休止させ、別のキーで再試行する"""
+
+        async def fake_get(url, params):
+            if params["key"] == "key_a":
+                raise QuotaExceededError()
+            return json.dumps({"items": [{"id": "v", "liveStreamingDetails": {}}]}).encode()
+
+        service.client.get_raw_with_retry.side_effect = fake_get
+
+        await service.get_live_chat_id("dQw4w9WgXcQ")
+
+        used_keys = [
+            call.args[1]["key"] for call in service.client.get_raw_with_retry.call_args_list
+        ]
+        assert used_keys == ["key_a", "key_b"]
+        assert [s["benched"] for s in service.key_pool.stats()] == [True, False]
+
+    @pytest.mark.asyncio
+    async def test_all_keys_exhausted(self, service):
+        """全キーがクォータ超過ならリセットまでの秒数付きで失敗する"""
+        service.client.get_raw_with_retry.side_effect = QuotaExceededError()
+
+        with pytest.raises(QuotaExceededError) as exc_info:
+            await service.get_chat_messages("chat_id")
+        assert exc_info.value.retry_after == pytest.approx(12 * 3600)
+        assert service.client.get_raw_with_retry.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_key_not_charged_when_throttled(self, service):
+        """レート制限で送らなかった呼び出しはキーに計上しない"""
+        service._wait_for_rate_limit.side_effect = RateLimitExceededError(1.0)
+
+        with pytest.raises(RateLimitExceededError):
+            await service.get_chat_messages("chat_id")
+
+        service.client.get_raw_with_retry.assert_not_called()
+        assert [state.used for state in service.key_pool.keys] == [0, 0]
+        assert [state.requests for state in service.key_pool.keys] == [0, 0]
@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from app.main import app
+from app.utils.queues import DropOldestQueue
+from tests.helpers import make_ending_poller_manager
+
+
+client = TestClient(app)
+
+
+class TestDropOldestQueue:
+    """DropOldestQueueのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest(self):
+        """上限を超えたら古い要素から捨てる"""
+        queue = DropOldestQueue(2)
+        assert queue.put(1)
+        assert queue.put(2)
+        assert not queue.put(3)
+
+        assert await queue.get_batch(10) == [(False, 2), (False, 3)]
+        assert queue.dropped == 1
+
+    @pytest.mark.asyncio
+    async def test_controls_are_kept_in_order(self):
+        """制御メッセージは捨てられず、順序も保たれる"""
+        queue = DropOldestQueue(1)
+        queue.put_control("subscribed")
+        queue.put(1)
+        queue.put(2)
+        queue.put_control("end")
+
+        assert await queue.get_batch(10) == [
+            (True, "subscribed"),
+            (False, 2),
+            (True, "end"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_get_batch_limit(self):
+        """通常要素は max_items 件まで取り出す"""
+        queue = DropOldestQueue(10)
+        for i in range(3):
+            queue.put(i)
+
+        assert await queue.get_batch(2) == [(False, 0), (False, 1)]
+        assert len(queue) == 1
+
+    @pytest.mark.asyncio
+    async def test_get_batch_waits(self):
+        """空の時は要素が届くまで待つ"""
+        queue = DropOldestQueue(2)
+        task = asyncio.create_task(queue.get_batch(10))
+        await asyncio.sleep(0)
+        assert not task.done()
+
+        queue.put("a")
+        assert await asyncio.wait_for(task, 1) == [(False, "a")]
+
+
+class TestLiveChatWebSocket:
+    """WebSocketエンドポイントのテスト"""
+
+    @patch("app.services.poller.POLLER_MIN_INTERVAL", 0)
+    @patch("app.api.livechat_ws.youtube_service", autospec=True)
+    def test_subscribe_and_receive(self, mock_service):
+        """購読した動画のメッセージがまとめて届く"""
+        mock_service.get_live_chat_id.return_value = "chat_id_123"
+        manager = make_ending_poller_manager(["m1", "m2"])
+
+        with patch("app.api.livechat_ws.poller_manager", manager):
+            with client.websocket_connect("/api/youtube/livechat/ws") as ws:
+                ws.send_json({"action": "subscribe", "video_id": "dQw4w9WgXcQ"})
+                frames = []
+                while not frames or frames[-1]["type"] != "end":
+                    frames.append(ws.receive_json())
+
+        assert frames[0] == {"type": "subscribed", "video_id": "dQw4w9WgXcQ"}
+        messages = [f for f in frames if f["type"] == "messages"]
+        batch = messages[0]["batches"][0]
+        assert batch["video_id"] == "dQw4w9WgXcQ"
+        assert [item["id"] for item in batch["items"]] == ["m1", "m2"]
+
+    def test_invalid_video_id(self):
+        """無効な動画IDはエラーイベント"""
+        with client.websocket_connect("/api/youtube/livechat/ws") as ws:
+            ws.send_json({"action": "subscribe", "video_id": "short"})
+            frame = ws.receive_json()
+
+        assert frame["type"] == "error"
+        assert frame["video_id"] == "short"
+
+    @patch("app.api.livechat_ws.youtube_service", autospec=True)
+    def test_no_live_chat(self, mock_service):
+        """ライブチャットがない動画はエラーイベント"""
+        mock_service.get_live_chat_id.return_value = None
+
+        with client.websocket_connect("/api/youtube/livechat/ws") as ws:
+            ws.send_json({"action": "subscribe", "video_id": "dQw4w9WgXcQ"})
+            frame = ws.receive_json()
+
+        assert frame["type"] == "error"
@@ -0,0 +1,115 @@
+import json
+import pytest
+from unittest.mock import AsyncMock
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.youtube import YouTubeService
+from app.utils.metrics import (
+    QUOTA_UNITS,
+    UPSTREAM_REQUEST_DURATION,
+    MetricsRegistry,
+)
+
+
+client = TestClient(app)
+
+
+class TestMetricsRegistry:
+    """MetricsRegistryのテスト"""
+
+    def test_counter_and_gauge(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("jobs", "Jobs done", ("kind",))
+        gauge = registry.gauge("queue_depth", "Queued jobs")
+
+        counter.labels("a").inc()
+        counter.labels("a").inc(2)
+        counter.labels('b"x').inc()
+        gauge.inc(3)
+        gauge.dec()
+
+        text = registry.render()
+        assert "# TYPE jobs counter" in text
+        assert 'jobs_total{kind="a"} 3' in text
+        assert 'jobs_total{kind="b\\"x"} 1' in text
+        assert "queue_depth 2" in text
+
+    def test_histogram_buckets(self):
+        """バケットは累積で、境界値はそのバケットに入る"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency", "Latency", buckets=(0.1, 1.0))
+
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+
+        text = registry.render()
+        assert 'latency_bucket{le="0.1"} 2' in text
+        assert 'latency_bucket{le="1"} 3' in text
+        assert 'latency_bucket{le="+Inf"} 4' in text
+        assert "latency_count 4" in text
+        assert "latency_sum 3.65" in text
+
+    def test_callback_metric(self):
+        """出力時に関数から値を読む"""
+        registry = MetricsRegistry()
+        hits = {"value": 1}
+        registry.callback(
+            "cache_lookups", "Lookups", "counter", ("result",),
+            lambda: {("hit",): hits["value"]},
+        )
+
+        hits["value"] = 5
+
+        assert 'cache_lookups_total{result="hit"} 5' in registry.render()
+
+    def test_label_count_checked(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("jobs", "Jobs done", ("kind",))
+
+        with pytest.raises(ValueError):
+            counter.labels("a", "b")
+        with pytest.raises(ValueError):
+            counter.inc()
+        with pytest.raises(ValueError):
+            registry.counter("jobs", "again")
+
+
+class TestMetricsEndpoint:
+    """GET /metrics"""
+
+    def test_route_latency_recorded(self):
+        """ルートのテンプレートごとにレスポンス時間を記録する"""
+        client.get("/health")
+        client.get("/no-such-route")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        assert (
+            'livechat_http_request_duration_seconds_count{method="GET",route="/health",status="200"}'
+            in text
+        )
+        assert 'route="unmatched",status="404"' in text
+        assert 'livechat_cache_lookups_total{cache="live_chat_id",result="hit"}' in text
+        assert "livechat_subscribers 0" in text
+
+
+class TestServiceMetrics:
+    """サービスからの記録"""
+
+    @pytest.mark.asyncio
+    async def test_upstream_and_quota_recorded(self):
+        service = YouTubeService()
+        service.client.get_raw_with_retry = AsyncMock(
+            return_value=json.dumps({"items": []}).encode()
+        )
+        duration = UPSTREAM_REQUEST_DURATION.labels("videos", "ok")
+        quota = QUOTA_UNITS.labels("videos")
+        count_before, quota_before = sum(duration.counts), quota.value
+
+        await service.get_live_chat_id("dQw4w9WgXcQ")
+
+        assert sum(duration.counts) == count_before + 1
+        assert quota.value == quota_before + 1
@@ -0,0 +1,89 @@
+import pytest
+from app.models.youtube import LiveChatMessageListResponse
+from app.utils.page_cache import (
+    ChatPageCache,
+    InMemoryPageCacheBackend,
+    PageCacheBackend,
+    load_page_cache_backend,
+)
+
+
+@pytest.fixture
+def page():
+    """テスト用のチャットページ"""
+    return LiveChatMessageListResponse.model_validate(
+        {
+            "kind": "youtube#liveChatMessageListResponse",
+            "etag": "page_etag",
+            "nextPageToken": "next",
+            "pollingIntervalMillis": 2000,
+            "pageInfo": {"totalResults": 0, "resultsPerPage": 0},
+            "items": [],
+        }
+    )
+
+
+class TestInMemoryPageCacheBackend:
+    """InMemoryPageCacheBackendのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_evicts_by_total_bytes(self):
+        """合計バイト数が上限を超えると古いものから削除"""
+        backend = InMemoryPageCacheBackend(max_bytes=10)
+        await backend.set("a", b"12345", ttl=60)
+        await backend.set("b", b"12345", ttl=60)
+        await backend.get("a")
+        await backend.set("c", b"12345", ttl=60)
+
+        assert await backend.get("a") == b"12345"
+        assert await backend.get("b") is None
+        assert backend.total_bytes == 10
+
+    @pytest.mark.asyncio
+    async def test_expiration(self, clock):
+        """TTLを過ぎたら取得できない"""
+        backend = InMemoryPageCacheBackend(max_bytes=100, clock=clock)
+        await backend.set("a", b"x", ttl=1)
+
+        clock.now = 2
+        assert await backend.get("a") is None
+        assert backend.total_bytes == 0
+
+    @pytest.mark.asyncio
+    async def test_oversized_value_is_skipped(self):
+        """上限より大きい値は保存しない"""
+        backend = InMemoryPageCacheBackend(max_bytes=3)
+        await backend.set("a", b"12345", ttl=60)
+        assert len(backend) == 0
+
+
+class TestChatPageCache:
+    """ChatPageCacheのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_round_trip(self, page):
+        """保存したページを同じ内容で取得できる"""
+        cache = ChatPageCache(InMemoryPageCacheBackend())
+        await cache.set("chat", "token", page)
+
+        assert await cache.get("chat", "token") == page
+        assert await cache.get("chat", "other") is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_head_ttl_follows_polling_interval(self, page, clock):
+        """先頭ページは pollingIntervalMillis の間だけキャッシュ"""
+        cache = ChatPageCache(InMemoryPageCacheBackend(clock=clock), page_ttl=300)
+        await cache.set("chat", None, page)
+        await cache.set("chat", "token", page)
+
+        clock.now = 3
+        assert await cache.get("chat", None) is None
+        assert await cache.get("chat", "token") == page
+
+    def test_load_custom_backend(self):
+        """module:Class 形式でバックエンドを差し替えられる"""
+        backend = load_page_cache_backend(
+            "app.utils.page_cache:InMemoryPageCacheBackend", 0
+        )
+        assert isinstance(backend, PageCacheBackend)
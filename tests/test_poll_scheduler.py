@@ -0,0 +1,41 @@
+import pytest
+from app.services.poll_scheduler import ChatPollScheduler
+from app.utils.exceptions import PollTooEarlyError, handle_youtube_api_error
+
+
+class TestChatPollScheduler:
+    """ChatPollSchedulerのテスト"""
+
+    def test_unknown_chat_can_poll(self):
+        """初めてのチャットはすぐにポーリングできる"""
+        scheduler = ChatPollScheduler()
+        assert scheduler.wait_time("chat") == 0.0
+
+    def test_wait_follows_polling_interval(self, clock):
+        """pollingIntervalMillis が経過するまで待ち時間が残る"""
+        scheduler = ChatPollScheduler(clock=clock)
+        scheduler.record_poll("chat", None, 5000)
+
+        clock.now = 2
+        assert scheduler.wait_time("chat") == pytest.approx(3.0)
+        assert scheduler.wait_time("other") == 0.0
+
+        clock.now = 5
+        assert scheduler.wait_time("chat") == 0.0
+
+    def test_keyed_by_page_token(self, clock):
+        """まだ取得していないページは同じチャットでも待たない"""
+        scheduler = ChatPollScheduler(clock=clock)
+        scheduler.record_poll("chat", "token_1", 5000)
+
+        assert scheduler.wait_time("chat", "token_1") == pytest.approx(5.0)
+        assert scheduler.wait_time("chat", "token_2") == 0.0
+        assert scheduler.wait_time("chat") == 0.0
+
+    def test_too_early_maps_to_304(self):
+        """早すぎるポーリングは次の時刻付きの304"""
+        result = handle_youtube_api_error(PollTooEarlyError(1.2))
+
+        assert result.status_code == 304
+        assert result.headers["Retry-After"] == "2"
+        assert result.headers["X-Poll-After-Millis"] == "1200"
@@ -0,0 +1,194 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from app.models.youtube import LiveChatMessageItem, LiveChatMessageListResponse
+from app.services.poller import (
+    POLLER_CLIENT_ID,
+    POLLER_PRIORITY,
+    MessageRingBuffer,
+    LiveChatPollerManager,
+)
+from app.utils.request_context import client_id_var, priority_var
+from tests.helpers import chat_message
+
+
+def make_page(message_ids, next_page_token="next", interval=1):
+    """テスト用のチャットページ"""
+    return LiveChatMessageListResponse.model_validate(
+        {
+            "kind": "youtube#liveChatMessageListResponse",
+            "etag": "page_etag",
+            "nextPageToken": next_page_token,
+            "pollingIntervalMillis": interval,
+            "pageInfo": {"totalResults": len(message_ids), "resultsPerPage": 200},
+            "items": [chat_message(i) for i in message_ids],
+        }
+    )
+
+
+class TestMessageRingBuffer:
+    """MessageRingBufferのテスト"""
+
+    def test_append_and_read(self):
+        """連番付きで追加・読み出しできる"""
+        buffer = MessageRingBuffer(3)
+        for i in range(2):
+            buffer.append(LiveChatMessageItem.model_validate(chat_message(f"m{i}")))
+
+        items, dropped = buffer.read_after(0)
+        assert [seq for seq, _ in items] == [1, 2]
+        assert dropped == 0
+
+    def test_overwrite_reports_dropped(self):
+        """上書きされた分は dropped として返る"""
+        buffer = MessageRingBuffer(3)
+        for i in range(5):
+            buffer.append(LiveChatMessageItem.model_validate(chat_message(f"m{i}")))
+
+        items, dropped = buffer.read_after(0)
+        assert [item.id for _, item in items] == ["m2", "m3", "m4"]
+        assert dropped == 2
+        assert "m0" not in buffer
+        assert buffer.seq_of("m4") == 5
+
+
+class TestLiveChatPollerManager:
+    """LiveChatPollerManagerのテスト"""
+
+    @pytest.fixture
+    def service(self):
+        service = Mock()
+        service.get_chat_messages = AsyncMock(
+            side_effect=[make_page(["a", "b"]), make_page(["b", "c"])]
+            + [make_page([])] * 100
+        )
+        return service
+
+    @pytest.mark.asyncio
+    async def test_fan_out_to_subscribers(self, service):
+        """1つのポーリング結果が全購読者に配信される"""
+        manager = LiveChatPollerManager(service, buffer_size=10)
+        sub1 = manager.subscribe("chat_id_123")
+        sub2 = manager.subscribe("chat_id_123")
+
+        assert len(manager.pollers) == 1
+
+        received = [item.id for _, item in await asyncio.wait_for(sub1.get(), 1)]
+        assert received == ["a", "b"]
+        received = [item.id for _, item in await asyncio.wait_for(sub2.get(), 1)]
+        assert received == ["a", "b"]
+
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_page_token_and_dedup(self, service):
+        """nextPageToken を引き継ぎ、重複メッセージは配信しない"""
+        manager = LiveChatPollerManager(service, buffer_size=10)
+        poller_sub = manager.subscribe("chat_id_123")
+        poller = poller_sub.poller
+
+        await poller.stop()
+        await poller.poll_once()
+        await poller.poll_once()
+
+        items, _ = poller.buffer.read_after(0)
+        assert [item.id for _, item in items] == ["a", "b", "c"]
+        service.get_chat_messages.assert_called_with("chat_id_123", "next")
+
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_stops_when_last_subscriber_leaves(self, service):
+        """最後の購読者が抜けるとポーラーが止まる"""
+        manager = LiveChatPollerManager(service, buffer_size=10, idle_grace=0)
+        sub1 = manager.subscribe("chat_id_123")
+        sub2 = manager.subscribe("chat_id_123")
+        poller = sub1.poller
+
+        await manager.unsubscribe(sub1)
+        assert poller.running
+
+        await manager.unsubscribe(sub2)
+        assert not poller.running
+        assert manager.pollers == {}
+
+    @pytest.mark.asyncio
+    @patch("app.services.poller.POLLER_MIN_INTERVAL", 0.01)
+    async def test_resume_after_disconnect(self, service):
+        """唯一の購読者が切断しても、猶予の間に再接続すれば切断中の分から読める"""
+        pages = iter([make_page(["a", "b"]), make_page(["c"])])
+
+        async def get_chat_messages(live_chat_id, page_token):
+            page = next(pages, None)
+            if page is None:
+                await asyncio.sleep(1)
+                return make_page([])
+            if page.items[0].id == "c":
+                # 購読者が切断するまで待ってから届く
+                await disconnected.wait()
+            return page
+
+        disconnected = asyncio.Event()
+        service.get_chat_messages = AsyncMock(side_effect=get_chat_messages)
+        manager = LiveChatPollerManager(service, buffer_size=10, idle_grace=1)
+        sub = manager.subscribe("chat_id_123")
+        received = [item.id for _, item in await asyncio.wait_for(sub.get(), 1)]
+        assert received == ["a", "b"]
+
+        await manager.unsubscribe(sub)
+        disconnected.set()
+        assert sub.poller.running
+
+        resumed = manager.subscribe("chat_id_123", last_message_id="b")
+        assert resumed.poller is sub.poller
+        received = [item.id for _, item in await asyncio.wait_for(resumed.get(), 1)]
+        assert received == ["c"]
+
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_stops_after_idle_grace(self, service):
+        """猶予の間に再接続がなければポーラーが止まる"""
+        manager = LiveChatPollerManager(service, buffer_size=10, idle_grace=0.01)
+        sub = manager.subscribe("chat_id_123")
+        poller = sub.poller
+
+        await manager.unsubscribe(sub)
+        assert manager.pollers == {"chat_id_123": poller}
+        await asyncio.sleep(0.05)
+
+        assert not poller.running
+        assert manager.pollers == {}
+
+    @pytest.mark.asyncio
+    async def test_resume_from_message_id(self, service):
+        """last_message_id を指定するとその次から読める"""
+        manager = LiveChatPollerManager(service, buffer_size=10)
+        sub1 = manager.subscribe("chat_id_123")
+        await asyncio.wait_for(sub1.get(), 1)
+
+        sub2 = manager.subscribe("chat_id_123", last_message_id="a")
+        received = [item.id for _, item in await asyncio.wait_for(sub2.get(), 1)]
+        assert received[0] == "b"
+
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_runs_with_own_client_and_priority(self, service):
+        """ポーリングは開始したリクエストのクライアント・優先度を引き継がない"""
+        seen = []
+
+        async def get_chat_messages(live_chat_id, page_token):
+            seen.append((client_id_var.get(), priority_var.get()))
+            return make_page(["a"])
+
+        service.get_chat_messages = AsyncMock(side_effect=get_chat_messages)
+        client_id_var.set("peer:203.0.113.7")
+        priority_var.set("low")
+        manager = LiveChatPollerManager(service, buffer_size=10)
+
+        sub = manager.subscribe("chat_id_123")
+        await asyncio.wait_for(sub.get(), 1)
+
+        assert seen[0] == (POLLER_CLIENT_ID, POLLER_PRIORITY)
+        await manager.shutdown()
@@ -0,0 +1,287 @@
+import asyncio
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.key_pool import ApiKeyPool
+from app.services import quota
+from app.services.quota import QuotaLedger
+from app.services.youtube import BATCH_CLIENT_ID, YouTubeService
+from app.utils.exceptions import (
+    QuotaBudgetExceededError,
+    RateLimitExceededError,
+    handle_youtube_api_error,
+)
+from app.utils.request_context import (
+    RequestContextMiddleware,
+    client_id_var,
+    mask_client_id,
+    parse_priority,
+    priority_var,
+)
+
+
+PACIFIC = ZoneInfo("America/Los_Angeles")
+# 太平洋時間 2025-01-01 06:00（1日の1/4が経過）
+MORNING = datetime(2025, 1, 1, 6, tzinfo=PACIFIC).timestamp()
+
+
+@pytest.fixture
+def clock(clock):
+    """朝6時から始まる時計"""
+    clock.now = MORNING
+    return clock
+
+
+def make_ledger(clock, **kwargs):
+    return QuotaLedger(1000, clock=clock, **kwargs)
+
+
+class TestQuotaLedger:
+    """QuotaLedgerのテスト"""
+
+    def test_record_breakdown(self, clock):
+        """エンドポイント・動画・クライアントごとに集計する"""
+        ledger = make_ledger(clock)
+        ledger.link("chat_1", "video_1")
+
+        ledger.record("videos", 1, "alice", ["video_1", "video_2"])
+        ledger.record("liveChat/messages", 5, "alice", ["chat_1"])
+        ledger.record("liveChat/messages", 5, "bob", ["chat_1"])
+
+        snapshot = ledger.snapshot()
+        assert snapshot["used"] == 11
+        assert snapshot["by_endpoint"] == {"videos": 1, "liveChat/messages": 10}
+        assert snapshot["by_video"] == {"video_1": 10.5, "video_2": 0.5}
+        assert snapshot["by_client"] == {"alice": 6, "bob": 5}
+
+    def test_snapshot_masks_peer_addresses(self, clock):
+        ledger = make_ledger(clock)
+        ledger.record("videos", 1, "peer:203.0.113.7")
+
+        (client,) = ledger.snapshot()["by_client"]
+        assert "203.0.113.7" not in client
+
+    def test_breakdown_bounded(self, monkeypatch, clock):
+        """動画・クライアントの集計は最近計上したものだけ保持する"""
+        monkeypatch.setattr(quota, "MAX_TRACKED_CLIENTS", 2)
+        monkeypatch.setattr(quota, "MAX_TRACKED_VIDEOS", 2)
+        ledger = make_ledger(clock)
+
+        for name in ("a", "b", "a", "c"):
+            ledger.record("videos", 1, name, [f"video_{name}"])
+
+        assert set(ledger.by_client) == {"a", "c"}
+        assert set(ledger.by_video) == {"video_a", "video_c"}
+        assert ledger.used == 4
+
+    def test_projection(self, clock):
+        """当日の消費ペースからリセット時点の消費量を予測する"""
+        ledger = make_ledger(clock)
+        ledger.record("liveChat/messages", 100, "alice")
+
+        # 6時間で100 → 24時間で400
+        assert ledger.snapshot()["projected"] == 400
+
+    def test_priority_reserve(self, clock):
+        """残りが少なくなると低い優先度から断る"""
+        ledger = make_ledger(clock)
+
+        ledger.check(5, "alice", "low", available=400)
+        with pytest.raises(QuotaBudgetExceededError, match="low priority"):
+            ledger.check(5, "alice", "low", available=300)
+        # 既定の優先度は残りを最後まで使える
+        ledger.check(5, "alice", "normal", available=5)
+        ledger.check(5, "alice", "high", available=5)
+
+        assert ledger.snapshot()["refused"] == 1
+
+    def test_normal_reserve(self, clock):
+        """normal にも確保分を設定すれば high のために残せる"""
+        ledger = make_ledger(clock, reserves={"normal": 0.1})
+
+        ledger.check(5, "alice", "normal", available=300)
+        with pytest.raises(QuotaBudgetExceededError, match="normal priority"):
+            ledger.check(5, "alice", "normal", available=100)
+        ledger.check(5, "alice", "high", available=5)
+
+    def test_client_budget(self, clock):
+        """クライアントごとの予算を超える呼び出しを断る"""
+        ledger = make_ledger(clock, client_budget=10)
+        ledger.record("liveChat/messages", 10, "alice")
+
+        with pytest.raises(QuotaBudgetExceededError) as exc_info:
+            ledger.check(5, "alice", "high", available=1000)
+        assert exc_info.value.reason == "client budget"
+        assert exc_info.value.retry_after == pytest.approx(18 * 3600)
+        ledger.check(5, "bob", "high", available=1000)
+
+    def test_reset(self, clock):
+        """太平洋時間の0時に集計をリセットする"""
+        ledger = make_ledger(clock)
+        ledger.record("videos", 1, "alice", ["video_1"])
+
+        clock.now = MORNING + 18 * 3600
+        snapshot = ledger.snapshot()
+
+        assert snapshot["used"] == 0
+        assert snapshot["by_video"] == {}
+
+    def test_budget_error_maps_to_429(self):
+        error = handle_youtube_api_error(QuotaBudgetExceededError("client budget", 3.2))
+
+        assert error.status_code == 429
+        assert error.headers["Retry-After"] == "4"
+
+
+class TestRequestContext:
+    """クライアントIDと優先度のコンテキスト"""
+
+    def test_parse_priority(self):
+        assert parse_priority("HIGH") == "high"
+        assert parse_priority("urgent") == "normal"
+        assert parse_priority(None) == "normal"
+
+    def test_middleware_sets_context(self):
+        """既定では X-Client-Id を信頼せず接続元アドレスで識別する（X-Priority は伝わる）"""
+        seen = {}
+
+        async def fake_get_live_chat_id(video_id):
+            seen["client"] = client_id_var.get()
+            seen["priority"] = priority_var.get()
+            return None
+
+        with patch(
+            "app.api.youtube.youtube_service.get_live_chat_id",
+            side_effect=fake_get_live_chat_id,
+        ):
+            TestClient(app).get(
+                "/api/youtube/livechat?video_id=dQw4w9WgXcQ",
+                headers={"X-Client-Id": "dashboard", "X-Priority": "low"},
+            )
+
+        assert seen == {"client": "peer:testclient", "priority": "low"}
+
+    def test_untrusted_priority_capped(self):
+        assert parse_priority("high", trusted=False) == "normal"
+        assert parse_priority("low", trusted=False) == "low"
+
+    def test_trusted_client_headers(self):
+        """信頼する設定なら X-Client-Id と X-Priority: high をそのまま使う"""
+        seen = {}
+
+        async def app(scope, receive, send):
+            seen["client"] = client_id_var.get()
+            seen["priority"] = priority_var.get()
+            await send({"type": "http.response.start", "status": 204, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        TestClient(RequestContextMiddleware(app, trust_client_headers=True)).get(
+            "/", headers={"X-Client-Id": "dashboard", "X-Priority": "high"}
+        )
+
+        assert seen == {"client": "dashboard", "priority": "high"}
+
+    def test_mask_client_id(self):
+        """接続元アドレスは統計で伏せる（同じアドレスは同じ値）"""
+        masked = mask_client_id("peer:203.0.113.7")
+
+        assert masked.startswith("peer:")
+        assert "203.0.113.7" not in masked
+        assert masked == mask_client_id("peer:203.0.113.7")
+        assert mask_client_id("dashboard") == "dashboard"
+
+
+class TestYouTubeServiceQuota:
+    """サービスからのクォータの計上と予算"""
+
+    @pytest.fixture
+    def service(self, clock):
+        service = YouTubeService(
+            key_pool=ApiKeyPool(["key_a"], daily_quota=100, clock=clock)
+        )
+        service.quota_ledger = QuotaLedger(100, clock=clock)
+        service._wait_for_rate_limit = AsyncMock()
+        service.client.get_raw_with_retry = AsyncMock(
+            return_value=json.dumps(
+                {"items": [{"id": "video_1", "liveStreamingDetails": {"activeLiveChatId": "chat_1"}}]}
+            ).encode()
+        )
+        return service
+
+    @pytest.mark.asyncio
+    async def test_records_by_client_and_video(self, service):
+        """呼び出したクライアントと動画に計上する"""
+        client_id_var.set("alice")
+
+        await service.get_live_chat_ids(["video_1"])
+
+        stats = service.quota_stats()
+        assert stats["by_client"] == {"alice": 1}
+        assert stats["by_video"] == {"video_1": 1}
+        assert stats["keys"][0]["used"] == 1
+
+    @pytest.mark.asyncio
+    async def test_low_priority_refused(self, service):
+        """残りが少ない時は優先度 low の呼び出しをAPIに送らない"""
+        service.key_pool.keys[0].used = 80
+        priority_var.set("low")
+
+        with pytest.raises(QuotaBudgetExceededError):
+            await service.get_live_chat_ids(["video_1"])
+        service.client.get_raw_with_retry.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_batch_charged_to_batch_client(self, service):
+        """マイクロバッチは最初の呼び出し元ではなくバッチ用のクライアントに計上する"""
+        service.live_chat_id_batcher.window = 0.01
+        service.key_pool.keys[0].used = 80
+
+        async def fetch(client_id, priority, video_id):
+            client_id_var.set(client_id)
+            priority_var.set(priority)
+            return await service.get_live_chat_id(video_id)
+
+        # 最初の呼び出し元が low でもバッチ全体は断られない
+        await asyncio.gather(
+            fetch("client-A", "low", "video_1"), fetch("client-B", "normal", "video_2")
+        )
+
+        stats = service.quota_stats()
+        assert stats["by_client"] == {BATCH_CLIENT_ID: 1}
+        service.client.get_raw_with_retry.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_not_recorded_when_throttled(self, service):
+        """レート制限で送らなかった呼び出しは計上しない"""
+        service._wait_for_rate_limit.side_effect = RateLimitExceededError(1.0)
+
+        with pytest.raises(RateLimitExceededError):
+            await service.get_live_chat_id("video_1")
+
+        stats = service.quota_stats()
+        assert stats["used"] == 0
+        assert stats["requests"] == 0
+        assert stats["by_client"] == {}
+        assert stats["by_video"] == {}
+
+
+class TestQuotaEndpoint:
+    """GET /api/youtube/quota"""
+
+    @patch("app.api.youtube.DEBUG", True)
+    def test_quota_stats(self):
+        response = TestClient(app).get("/api/youtube/quota")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert {"used", "projected", "by_endpoint", "by_video", "by_client", "keys"} <= set(data)
+        # APIキーそのものは返さない
+        assert "…" in data["keys"][0]["key"]
+
+    def test_hidden_outside_debug(self):
+        """開発・ステージング以外では返さない"""
+        assert TestClient(app).get("/api/youtube/quota").status_code == 404
@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from app.services.key_pool import ApiKeyPool
+from app.services.youtube import YouTubeService
+from app.utils.exceptions import RateLimitExceededError, handle_youtube_api_error
+from app.utils.rate_limiter import TokenBucket, RateLimiter
+
+
+class TestTokenBucket:
+    """TokenBucketのテスト"""
+
+    def test_burst_capacity(self, clock):
+        """容量分までは待たずに取得できる"""
+        bucket = TokenBucket(rate=1.0, capacity=3, clock=clock)
+
+        assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert bucket.try_acquire() == pytest.approx(1.0)
+
+    def test_refill(self, clock):
+        """時間経過でトークンが補充される（容量が上限）"""
+        bucket = TokenBucket(rate=2.0, capacity=2, clock=clock)
+        bucket.try_acquire()
+        bucket.try_acquire()
+
+        clock.now = 0.5
+        assert bucket.available == pytest.approx(1.0)
+        clock.now = 10
+        assert bucket.available == pytest.approx(2.0)
+
+    def test_reservations_are_fifo(self, clock):
+        """予約は到着順に待ち時間が伸びる"""
+        bucket = TokenBucket(rate=0.5, capacity=1, clock=clock)
+
+        waits = [bucket.reserve() for _ in range(4)]
+        assert waits == pytest.approx([0.0, 2.0, 4.0, 6.0])
+
+    def test_reserve_max_wait(self, clock):
+        """max_wait を超える待ちは予約せずに拒否"""
+        bucket = TokenBucket(rate=1.0, capacity=1, clock=clock)
+        bucket.reserve()
+
+        with pytest.raises(RateLimitExceededError):
+            bucket.reserve(max_wait=0.5)
+        assert bucket.reserve(max_wait=1.0) == pytest.approx(1.0)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_acquire_refunds(self):
+        """待機がキャンセルされたらトークンを返却"""
+        bucket = TokenBucket(rate=1.0, capacity=1)
+        await bucket.acquire()
+
+        task = asyncio.create_task(bucket.acquire())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert bucket.available > -0.5
+
+
+class TestRateLimiter:
+    """RateLimiterのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_buckets_per_key(self):
+        """キーごとに独立したバケットを持つ"""
+        limiter = RateLimiter(rate=0.1, capacity=1, reject=True)
+
+        await limiter.acquire(("key1", "videos"))
+        await limiter.acquire(("key1", "liveChat/messages"))
+        await limiter.acquire(("key2", "videos"))
+
+        with pytest.raises(RateLimitExceededError) as exc_info:
+            await limiter.acquire(("key1", "videos"))
+        assert exc_info.value.retry_after == pytest.approx(10.0, rel=0.1)
+
+    @pytest.mark.asyncio
+    async def test_secret_key_not_logged(self, caplog):
+        """APIキーを含むキーはログに出さず label を出す"""
+        limiter = RateLimiter(rate=0.1, capacity=1, reject=True)
+        key = ("AIzaSySECRETKEY123456", "videos")
+        await limiter.acquire(key, label="videos (AIza…3456)")
+
+        with pytest.raises(RateLimitExceededError):
+            await limiter.acquire(key, label="videos (AIza…3456)")
+
+        assert "videos (AIza…3456)" in caplog.text
+        assert "SECRETKEY" not in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_service_masks_key_in_logs(self, caplog):
+        """サービスはマスクしたAPIキーでレート制限をログに出す"""
+        service = YouTubeService(key_pool=ApiKeyPool(["AIzaSySECRETKEY123456"]))
+        service.rate_limiter = RateLimiter(rate=0.1, capacity=1, reject=True)
+
+        await service._wait_for_rate_limit("videos", "AIzaSySECRETKEY123456")
+        with pytest.raises(RateLimitExceededError):
+            await service._wait_for_rate_limit("videos", "AIzaSySECRETKEY123456")
+
+        assert "videos (AIza…3456)" in caplog.text
+        assert "SECRETKEY" not in caplog.text
+
+    def test_rejection_maps_to_429(self):
+        """拒否はRetry-After付きの429に変換される"""
+        result = handle_youtube_api_error(RateLimitExceededError(2.3))
+
+        assert result.status_code == 429
+        assert result.headers["Retry-After"] == "3"
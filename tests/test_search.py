@@ -0,0 +1,149 @@
+import pytest
+from unittest.mock import patch, Mock
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.youtube import LiveChatMessageItem
+from app.services.archive import ChatArchive, ChatArchiver
+from app.services.search import ChatSearchIndex, matches, parse_query, tokenize
+from tests.helpers import chat_message
+
+
+client = TestClient(app)
+
+MESSAGES = [
+    ("UC_alice", "アリス", "こんにちは！初見です"),
+    ("UC_bob", "ボブ", "ありがとうございます"),
+    ("UC_alice", "アリス", "Hello World"),
+    ("UC_carol", "キャロル", "ありがと"),
+    ("UC_bob", "ボブ", "草"),
+    ("UC_carol", "キャロル", "とうありが"),
+]
+
+
+def make_item(index: int) -> LiveChatMessageItem:
+    """MESSAGES[index] のチャットメッセージ（1秒ごと）"""
+    author_id, name, text = MESSAGES[index]
+    return LiveChatMessageItem.model_validate(
+        chat_message(
+            f"m{index}",
+            published_at=f"2024-01-01T12:00:{index:02d}Z",
+            author=author_id,
+            display_name=name,
+            text=text,
+        )
+    )
+
+
+class TestTokenizer:
+    """トークナイザーのテスト"""
+
+    def test_japanese_is_split_into_ngrams(self):
+        """日本語は bi-gram と unigram になる"""
+        assert {"あり", "りが", "がと", "あ", "と"} <= tokenize("ありがと")
+
+    def test_ascii_words_are_normalized(self):
+        """英数字は全角・大文字を正規化した単語単位"""
+        assert {"hello", "world"} <= tokenize("ＨＥＬＬＯ World!")
+
+    def test_query_must_match_contiguously(self):
+        """bi-gram が揃っていても語として含まれなければ一致しない"""
+        _, runs = parse_query("ありがと")
+
+        assert matches(runs, "ありがとうございます")
+        assert not matches(runs, "とうありが")
+
+
+class TestChatSearchIndex:
+    """ChatSearchIndexのテスト"""
+
+    def test_candidates_intersect_tokens_and_author(self):
+        """全トークンと作者の条件を満たす番号を返す"""
+        index = ChatSearchIndex()
+        for doc, (author_id, name, text) in enumerate(MESSAGES):
+            index.add(doc, doc, text, name, author_id)
+
+        tokens, _ = parse_query("ありが")
+        assert index.candidates(tokens) == [1, 3, 5]
+        assert index.candidates(tokens, author_id="UC_bob") == [1]
+        assert index.candidates(set(), author_id="UC_alice", since=1) == [2]
+
+
+class TestChatArchiveSearch:
+    """ChatArchive.search のテスト"""
+
+    @pytest.fixture
+    def archive(self, tmp_path):
+        archive = ChatArchive(str(tmp_path), segment_max_bytes=1024, index_interval=2)
+        archive.append([make_item(i) for i in range(4)])
+        yield archive
+        archive.close()
+
+    def test_search_excludes_false_positives(self, archive):
+        """部分一致するメッセージだけを返す"""
+        records, _ = archive.search("ありがと")
+
+        assert [r.id for r in records] == ["m1", "m3"]
+
+    def test_new_messages_are_indexed_incrementally(self, archive):
+        """インデックス作成後に追記したメッセージも検索できる"""
+        archive.search("草")
+        archive.append([make_item(4), make_item(5)])
+
+        assert [r.id for r in archive.search("草")[0]] == ["m4"]
+        assert [r.id for r in archive.search("ありがと")[0]] == ["m1", "m3"]
+
+    def test_author_name_and_pagination(self, archive):
+        """作者名でも検索でき、after_id で続きを取得できる"""
+        first, has_more = archive.search("アリス", limit=1)
+        rest, _ = archive.search("アリス", after_id=first[-1].id)
+
+        assert [r.id for r in first] == ["m0"]
+        assert has_more
+        assert [r.id for r in rest] == ["m2"]
+
+
+    def test_saved_index_is_reused(self, archive, tmp_path):
+        """閉じる時に保存したインデックスを読み込み、保存後の追記分だけ本文を解析する"""
+        archive.search("草")
+        archive.close()
+        reopened = ChatArchive(str(tmp_path), segment_max_bytes=1024, index_interval=2)
+        reopened.append([make_item(4), make_item(5)])
+
+        with patch.object(
+            LiveChatMessageItem,
+            "model_validate_json",
+            wraps=LiveChatMessageItem.model_validate_json,
+        ) as parse:
+            records, _ = reopened.search(author_id="UC_bob")
+
+        assert [r.id for r in records] == ["m1", "m4"]
+        # 保存後に追記した2件だけ
+        assert parse.call_count == 2
+        reopened.close()
+
+
+class TestLiveChatSearchAPI:
+    """GET /api/youtube/livechat/search のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_search(self, tmp_path):
+        """キーワードと作者IDで検索できる"""
+        archiver = ChatArchiver(str(tmp_path))
+        await archiver.append("chat_id_123", [make_item(i) for i in range(6)])
+
+        with patch("app.api.youtube.youtube_service", Mock(archiver=archiver)):
+            response = client.get(
+                "/api/youtube/livechat/search",
+                params={"live_chat_id": "chat_id_123", "q": "ありが", "author_id": "UC_carol"},
+            )
+
+        assert response.status_code == 200
+        assert [item["id"] for item in response.json()["items"]] == ["m3", "m5"]
+
+    def test_search_requires_query_or_author(self):
+        """q も author_id もない場合は400"""
+        response = client.get(
+            "/api/youtube/livechat/search", params={"live_chat_id": "chat_id_123"}
+        )
+
+        assert response.status_code == 400
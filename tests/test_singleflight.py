@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from app.utils.singleflight import SingleFlight, make_request_key
+
+
+class TestMakeRequestKey:
+    """make_request_keyのテスト"""
+
+    def test_ignores_api_key_and_order(self):
+        """APIキーとパラメータ順は結果に影響しない"""
+        key1 = make_request_key("https://x", {"id": "a", "part": "p", "key": "k1"})
+        key2 = make_request_key("https://x", {"key": "k2", "part": "p", "id": "a"})
+        assert key1 == key2
+
+    def test_different_params(self):
+        """パラメータが違えば別のキー"""
+        assert make_request_key("https://x", {"pageToken": "a"}) != make_request_key(
+            "https://x", {"pageToken": "b"}
+        )
+
+
+class TestSingleFlight:
+    """SingleFlightのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_result(self):
+        """同時の同一キー呼び出しは1回だけ実行される"""
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"items": []}
+
+        results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(10)))
+
+        assert len(calls) == 1
+        assert all(r is results[0] for r in results)
+        assert flight.shared == 9
+        assert len(flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_exception_is_shared(self):
+        """例外も全員に共有される"""
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise Exception("YouTube API Error")
+
+        results = await asyncio.gather(
+            flight.do("k", fail), flight.do("k", fail), return_exceptions=True
+        )
+        assert all(isinstance(r, Exception) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """呼び出し元の1つがキャンセルされても他は結果を受け取れる"""
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        first = asyncio.create_task(flight.do("k", fetch))
+        second = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == "ok"
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_run_again(self):
+        """完了後の呼び出しは再実行される"""
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return len(calls)
+
+        assert await flight.do("k", fetch) == 1
+        assert await flight.do("k", fetch) == 2
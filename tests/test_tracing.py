@@ -0,0 +1,207 @@
+import json
+import httpx
+import pytest
+from unittest.mock import AsyncMock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.services.youtube import YouTubeService
+from app.utils.http_client import RateLimitedHTTPClient
+from app.utils.tracing import (
+    NOOP_SPAN,
+    TRACER,
+    InMemoryExporter,
+    Tracer,
+    TracingMiddleware,
+    format_traceparent,
+    parse_traceparent,
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def exporter():
+    """アプリケーションのトレーサーを有効にしてスパンをメモリに集める"""
+    enabled, original = TRACER.enabled, TRACER.exporter
+    TRACER.enabled, TRACER.exporter = True, InMemoryExporter()
+    yield TRACER.exporter
+    TRACER.enabled, TRACER.exporter = enabled, original
+
+
+class TestTraceparent:
+    """W3C traceparent の解析と生成"""
+
+    def test_parse_valid(self):
+        assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (
+            TRACE_ID,
+            PARENT_ID,
+            True,
+        )
+        assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00")[2] is False
+        # 未知のバージョンは後ろに続きがあってもよい
+        assert parse_traceparent(f"01-{TRACE_ID}-{PARENT_ID}-01-extra") is not None
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            None,
+            "",
+            "garbage",
+            f"ff-{TRACE_ID}-{PARENT_ID}-01",
+            f"00-{TRACE_ID}-{PARENT_ID}-01-extra",
+            f"00-{'0' * 32}-{PARENT_ID}-01",
+            f"00-{TRACE_ID}-{'0' * 16}-01",
+        ],
+    )
+    def test_parse_invalid(self, value):
+        assert parse_traceparent(value) is None
+
+    def test_format(self):
+        assert format_traceparent(TRACE_ID, PARENT_ID, True) == f"00-{TRACE_ID}-{PARENT_ID}-01"
+
+
+class TestTracer:
+    """スパンの親子関係とサンプリング"""
+
+    def test_nested_spans(self):
+        exporter = InMemoryExporter()
+        tracer = Tracer(enabled=True, exporter=exporter)
+
+        with tracer.span("parent", video_id="abc") as parent:
+            with tracer.span("child") as child:
+                child.set_attribute("attempt", 1)
+
+        assert [span.name for span in exporter.spans] == ["child", "parent"]
+        assert child.trace_id == parent.trace_id
+        assert child.parent_id == parent.span_id
+        assert parent.parent_id is None
+        assert parent.attributes == {"video_id": "abc"}
+        assert child.attributes == {"attempt": 1}
+        assert parent.status == "ok"
+
+    def test_exception_marks_error(self):
+        exporter = InMemoryExporter()
+        tracer = Tracer(enabled=True, exporter=exporter)
+
+        with pytest.raises(ValueError):
+            with tracer.span("failing"):
+                raise ValueError("boom")
+
+        span = exporter.spans[0]
+        assert span.status == "error"
+        assert span.attributes["error.type"] == "ValueError"
+
+    def test_disabled(self):
+        exporter = InMemoryExporter()
+        tracer = Tracer(enabled=False, exporter=exporter)
+
+        with tracer.span("ignored") as span:
+            span.set_attribute("key", "value")
+
+        assert span is NOOP_SPAN
+        assert span.traceparent() is None
+        assert not exporter.spans
+
+    def test_unsampled_remote_is_propagated_but_not_exported(self):
+        exporter = InMemoryExporter()
+        tracer = Tracer(enabled=True, exporter=exporter)
+
+        with tracer.span("request", remote=(TRACE_ID, PARENT_ID, False)) as span:
+            with tracer.span("child") as child:
+                pass
+
+        assert not exporter.spans
+        assert child.parent_id == span.span_id
+        assert child.traceparent().startswith(f"00-{TRACE_ID}-")
+        assert child.traceparent().endswith("-00")
+
+
+class TestHTTPClientTracing:
+    """リトライの各試行とバックオフのスパン"""
+
+    @pytest.mark.asyncio
+    async def test_attempts_and_backoff(self, exporter):
+        requests = []
+        responses = iter(
+            [
+                httpx.Response(429, headers={"Retry-After": "0"}),
+                httpx.Response(200, json={"items": []}),
+            ]
+        )
+
+        def handler(request):
+            requests.append(request)
+            return next(responses)
+
+        client = RateLimitedHTTPClient(max_retries=2, base_delay=0)
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        with TRACER.span("caller") as caller:
+            await client.get_with_retry("https://example.com/videos", {"key": "secret"})
+        await client.close()
+
+        attempts = exporter.find("http.attempt")
+        assert [span.attributes["attempt"] for span in attempts] == [1, 2]
+        assert [span.attributes["http.status_code"] for span in attempts] == [429, 200]
+        assert [span.status for span in attempts] == ["error", "ok"]
+        assert attempts[0].attributes["http.url"] == "https://example.com/videos"
+        backoff = exporter.find("http.backoff")
+        assert len(backoff) == 1 and backoff[0].attributes["delay"] == 0
+        assert all(span.parent_id == caller.span_id for span in attempts + backoff)
+        # 上流には試行のスパンを親として伝える
+        assert [parse_traceparent(r.headers["traceparent"])[1] for r in requests] == [
+            span.span_id for span in attempts
+        ]
+
+
+class TestServiceTracing:
+    """サービスのスパン"""
+
+    @pytest.mark.asyncio
+    async def test_chat_messages_spans(self, exporter, mock_youtube_api_response):
+        service = YouTubeService()
+        page = {
+            **mock_youtube_api_response,
+            "pageInfo": {"totalResults": 1, "resultsPerPage": 1},
+        }
+        service.client.get_raw_with_retry = AsyncMock(
+            return_value=json.dumps(page).encode()
+        )
+
+        await service.get_chat_messages("chat_id_123")
+
+        (messages,) = exporter.find("youtube.get_chat_messages")
+        (wait,) = exporter.find("rate_limiter.wait")
+        assert messages.attributes["live_chat_id"] == "chat_id_123"
+        assert messages.attributes["messages"] == 1
+        assert wait.parent_id == messages.span_id
+        assert wait.attributes["endpoint"] == "liveChat/messages"
+        assert wait.attributes["wait"] >= 0
+
+
+class TestTracingMiddleware:
+    """HTTPリクエストのサーバースパン"""
+
+    def test_continues_inbound_trace(self):
+        exporter = InMemoryExporter()
+        app = FastAPI()
+        app.add_middleware(
+            TracingMiddleware, tracer=Tracer(enabled=True, exporter=exporter)
+        )
+
+        @app.get("/items/{item_id}")
+        async def read_item(item_id: str):
+            return {"id": item_id}
+
+        response = TestClient(app).get(
+            "/items/1", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"}
+        )
+
+        (span,) = exporter.spans
+        assert span.name == "GET /items/{item_id}"
+        assert span.kind == "server"
+        assert span.trace_id == TRACE_ID
+        assert span.parent_id == PARENT_ID
+        assert span.attributes["http.status_code"] == 200
+        assert response.headers["traceresponse"] == span.traceparent()
@@ -1,6 +1,7 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch, Mock
+from unittest.mock import patch, Mock, AsyncMock
 from app.main import app
 from app.models.youtube import LiveChatMessageListResponse
 
@@ -24,7 +25,7 @@ def mock_youtube_api_response():
 class TestYouTubeAPI:
     """YouTube API エンドポイントのテスト"""
 
-    @patch("app.api.youtube.youtube_service")
+    @patch("app.api.youtube.youtube_service", autospec=True)
     def test_get_livechat_success(self, mock_service, mock_youtube_api_response):
         """GET /api/youtube/livechat 成功のテスト"""
         # モックレスポンスを作成
@@ -54,7 +55,7 @@ class TestYouTubeAPI:
         data = response.json()
         assert "無効な動画ID" in data["detail"]
 
-    @patch("app.api.youtube.youtube_service")
+    @patch("app.api.youtube.youtube_service", autospec=True)
     def test_get_livechat_no_live_chat(self, mock_service):
         """ライブチャットが存在しない場合のテスト"""
         mock_service.get_live_chat_id.return_value = None
@@ -65,7 +66,7 @@ class TestYouTubeAPI:
         data = response.json()
         assert "ライブ配信が見つからない" in data["detail"]
 
-    @patch("app.api.youtube.youtube_service")
+    @patch("app.api.youtube.youtube_service", autospec=True)
     def test_post_livechat_success(self, mock_service, mock_youtube_api_response):
         """POST /api/youtube/livechat 成功のテスト"""
         mock_response = LiveChatMessageListResponse.model_validate(
@@ -117,7 +118,7 @@ class TestYouTubeAPI:
         response = client.get("/api/youtube/livechat?video_id=")
         assert response.status_code == 400
 
-    @patch("app.api.youtube.youtube_service")
+    @patch("app.api.youtube.youtube_service", autospec=True)
     def test_youtube_api_error(self, mock_service):
         """YouTube APIエラーのテスト"""
         from app.utils.exceptions import YouTubeAPIError
@@ -131,7 +132,7 @@ class TestYouTubeAPI:
         # エラーハンドリングによってステータスコードが決まる
         assert response.status_code in [429, 500]  # クォータエラーは429か500
 
-    @patch("app.api.youtube.youtube_service")
+    @patch("app.api.youtube.youtube_service", autospec=True)
     def test_with_page_token(self, mock_service, mock_youtube_api_response):
         """ページトークン付きのテスト"""
         mock_response = LiveChatMessageListResponse.model_validate(
@@ -151,7 +152,7 @@ class TestYouTubeAPI:
             "chat_id_123", "testtoken"
         )
 
-    @patch("app.api.youtube.youtube_service")
+    @patch("app.api.youtube.youtube_service", autospec=True)
     def test_cors_headers(self, mock_service):
         """CORSヘッダーのテスト"""
         # モックを設定してエラーを避ける
@@ -165,7 +166,7 @@ class TestYouTubeAPI:
         # CORSヘッダーが設定されてることを確認
         assert "access-control-allow-origin" in response.headers
 
-    @patch("app.api.youtube.youtube_service")
+    @patch("app.api.youtube.youtube_service", autospec=True)
     def test_sanitize_page_token(self, mock_service, mock_youtube_api_response):
         """ページトークンのサニタイズテスト"""
         mock_response = LiveChatMessageListResponse.model_validate(
@@ -187,7 +188,7 @@ class TestYouTubeAPI:
             "chat_id_123", "tokenscript"  # 危険な文字が除去される
         )
 
-    @patch("app.api.youtube.youtube_service")
+    @patch("app.api.youtube.youtube_service", autospec=True)
     def test_long_video_id(self, mock_service):
         """長すぎる動画IDのテスト"""
         long_video_id = "a" * 15  # 15文字（11文字を超える）
@@ -210,3 +211,231 @@ class TestYouTubeAPI:
 
         # OPTIONSリクエストが適切に処理される
         assert response.status_code in [200, 204]
+
+
+def to_raw(data):
+    """モックのレスポンスをAPIが返すバイト列に変換"""
+    return json.dumps(data).encode()
+
+
+class TestYouTubeServiceLiveChatIdCache:
+    """ライブチャットIDキャッシュのテスト"""
+
+    @pytest.fixture
+    def service(self):
+        from app.services.youtube import YouTubeService
+
+        service = YouTubeService()
+        service._wait_for_rate_limit = AsyncMock()
+        service.client = AsyncMock()
+        return service
+
+    @pytest.mark.asyncio
+    async def test_live_chat_id_is_cached(self, service, mock_video_response):
+        """2回目以降はAPIを呼ばない"""
+        service.client.get_raw_with_retry.return_value = to_raw(mock_video_response)
+
+        assert await service.get_live_chat_id("dQw4w9WgXcQ") == "test_chat_id_123"
+        assert await service.get_live_chat_id("dQw4w9WgXcQ") == "test_chat_id_123"
+        assert service.client.get_raw_with_retry.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_no_active_chat_is_negative_cached(self, service):
+        """アクティブなチャットがない結果もキャッシュされる"""
+        service.client.get_raw_with_retry.return_value = to_raw({"items": []})
+
+        assert await service.get_live_chat_id("dQw4w9WgXcQ") is None
+        assert await service.get_live_chat_id("dQw4w9WgXcQ") is None
+        assert service.client.get_raw_with_retry.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_chat_ended_invalidates_cache(self, service, mock_video_response):
+        """チャット終了エラーでキャッシュが破棄される"""
+        service.client.get_raw_with_retry.return_value = to_raw(mock_video_response)
+        await service.get_live_chat_id("dQw4w9WgXcQ")
+
+        service.client.get_raw_with_retry.side_effect = Exception(
+            "YouTube API Error: The live chat is no longer live. (liveChatEnded)"
+        )
+        with pytest.raises(Exception):
+            await service.get_chat_messages("test_chat_id_123")
+
+        assert len(service.live_chat_id_cache) == 0
+
+
+class TestYouTubeServiceBatchLookup:
+    """ライブチャットID一括取得のテスト"""
+
+    @pytest.fixture
+    def service(self):
+        from app.services.youtube import YouTubeService
+
+        service = YouTubeService()
+        service._wait_for_rate_limit = AsyncMock()
+        service.client = AsyncMock()
+
+        async def fake_videos(url, params):
+            return to_raw(
+                {
+                    "items": [
+                        {
+                            "id": vid,
+                            "liveStreamingDetails": {"activeLiveChatId": f"chat_{vid}"},
+                        }
+                        for vid in params["id"].split(",")
+                        if not vid.startswith("offline")
+                    ]
+                }
+            )
+
+        service.client.get_raw_with_retry.side_effect = fake_videos
+        return service
+
+    @pytest.mark.asyncio
+    async def test_chunks_of_50(self, service):
+        """50件ずつまとめて問い合わせる"""
+        video_ids = [f"video{i:06d}" for i in range(120)]
+
+        results = await service.get_live_chat_ids(video_ids)
+
+        assert service.client.get_raw_with_retry.call_count == 3
+        assert results["video000119"] == "chat_video000119"
+
+    @pytest.mark.asyncio
+    async def test_missing_videos_are_none(self, service):
+        """ライブチャットがない動画は None"""
+        results = await service.get_live_chat_ids(["video000001", "offline0001"])
+
+        assert results == {"video000001": "chat_video000001", "offline0001": None}
+
+    @pytest.mark.asyncio
+    async def test_concurrent_lookups_are_micro_batched(self, service):
+        """同時に届いた単発の問い合わせは1回にまとめられる"""
+        import asyncio
+
+        results = await asyncio.gather(
+            *(service.get_live_chat_id(f"video{i:06d}") for i in range(5)),
+            service.get_live_chat_id("video000000"),
+        )
+
+        assert results[0] == "chat_video000000"
+        assert results[-1] == "chat_video000000"
+        assert service.client.get_raw_with_retry.call_count == 1
+
+
+class TestYouTubeServiceSingleFlight:
+    """同一リクエストの集約のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_identical_message_requests_are_coalesced(
+        self, mock_youtube_api_response
+    ):
+        """同じページへの同時リクエストはAPIを1回だけ呼ぶ"""
+        import asyncio
+        from app.services.youtube import YouTubeService
+
+        service = YouTubeService()
+        service._wait_for_rate_limit = AsyncMock()
+        service.client = AsyncMock()
+
+        async def fake_messages(url, params):
+            await asyncio.sleep(0.01)
+            return to_raw(mock_youtube_api_response)
+
+        service.client.get_raw_with_retry.side_effect = fake_messages
+
+        pages = await asyncio.gather(
+            *(service.get_chat_messages("chat_id_123", "token") for _ in range(5))
+        )
+
+        assert service.client.get_raw_with_retry.call_count == 1
+        assert service._wait_for_rate_limit.call_count == 1
+        assert all(page.etag == "dummy_etag" for page in pages)
+
+
+class TestYouTubeServicePageCache:
+    """チャットページキャッシュのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_cached_page_skips_upstream(self, mock_youtube_api_response):
+        """キャッシュ済みのページはAPIを呼ばずに返す"""
+        from app.services.youtube import YouTubeService
+
+        service = YouTubeService()
+        service._wait_for_rate_limit = AsyncMock()
+        service.client = AsyncMock()
+        service.client.get_raw_with_retry.return_value = to_raw(mock_youtube_api_response)
+
+        first = await service.get_chat_messages("chat_id_123", "token")
+        second = await service.get_chat_messages("chat_id_123", "token")
+
+        assert first == second
+        assert service.client.get_raw_with_retry.call_count == 1
+
+
+class TestYouTubeServicePollScheduler:
+    """pollingIntervalMillis によるポーリング制御のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_early_poll_is_rejected(self, mock_youtube_api_response):
+        """間隔内に同じページを取り直すとAPIを呼ばずに PollTooEarlyError"""
+        from app.services.youtube import YouTubeService
+        from app.utils.exceptions import PollTooEarlyError
+
+        service = YouTubeService()
+        service.page_cache = None
+        service._wait_for_rate_limit = AsyncMock()
+        service.client = AsyncMock()
+        service.client.get_raw_with_retry.return_value = to_raw(mock_youtube_api_response)
+
+        await service.get_chat_messages("chat_id_123")
+        with pytest.raises(PollTooEarlyError) as exc_info:
+            await service.get_chat_messages("chat_id_123")
+
+        assert 0 < exc_info.value.retry_after <= 5
+        assert service.client.get_raw_with_retry.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_unfetched_page_is_not_rejected(self, mock_youtube_api_response):
+        """他のクライアントが直前にポーリングしても、まだ取得していないページは取得する"""
+        from app.services.youtube import YouTubeService
+
+        service = YouTubeService()
+        service._wait_for_rate_limit = AsyncMock()
+        service.client = AsyncMock()
+        service.client.get_raw_with_retry.return_value = to_raw(mock_youtube_api_response)
+
+        await service.get_chat_messages("chat_id_123")
+        await service.get_chat_messages("chat_id_123", "CAoQAA")
+
+        assert service.client.get_raw_with_retry.call_count == 2
+
+
+class TestYouTubeServiceArchive:
+    """チャットアーカイブへの保存のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_fetched_messages_are_archived(self, tmp_path):
+        """APIから取得したメッセージがアーカイブに保存される"""
+        from app.services.archive import ChatArchiver
+        from app.services.youtube import YouTubeService
+        from tests.helpers import make_item
+
+        service = YouTubeService(archiver=ChatArchiver(str(tmp_path)))
+        service._wait_for_rate_limit = AsyncMock()
+        service.client = AsyncMock()
+        service.client.get_raw_with_retry.return_value = to_raw(
+            {
+                "kind": "youtube#liveChatMessageListResponse",
+                "etag": "page_etag",
+                "pollingIntervalMillis": 5000,
+                "pageInfo": {"totalResults": 2, "resultsPerPage": 2},
+                "items": [make_item(i).model_dump() for i in range(2)],
+            }
+        )
+
+        await service.get_chat_messages("chat_id_123", "token")
+        records, _ = await service.archiver.read("chat_id_123")
+
+        assert [record.id for record in records] == ["m0000", "m0001"]
+        await service.close()